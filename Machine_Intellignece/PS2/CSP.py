@@ -1,4 +1,4 @@
-from typing import Callable, Dict, List, Any, Tuple
+from typing import Callable, Dict, Iterable, List, Any, Optional, Tuple
 from helpers.utils import track_call_count
 
 # This is the type definition for an Assignment
@@ -57,6 +57,163 @@ class BinaryConstraint(Constraint):
         variable1, variable2 = self.variables
         return variable2 if variable == variable1 else variable1
 
+# This is a class for the global constraint that requires all of its variables to take different values (e.g. a row in sudoku).
+# It is equivalent to a binary "not equal" constraint between every pair of its variables, but forward checking only needs
+# to remove the assigned value from the domains of the other variables, and "propagate" can look at all the variables at once.
+class AllDifferentConstraint(Constraint):
+    variables: Tuple[str, ...]  # The names of the variables that are in the constraint.
+
+    def __init__(self, variables: Iterable[str]) -> None:
+        super().__init__()
+        self.variables = tuple(variables)
+
+    # This function looks for the variables in the assignment and checks if no two of them have the same value.
+    # If any of the variables are unassigned, the assignment does not satisfy the condition.
+    # Important: If the value of a variable in the assignment is None, then it is assumed as if it is unassigned.
+    def is_satisfied(self, assignment: Assignment) -> bool:
+        values = [assignment.get(variable) for variable in self.variables]
+        if any(value is None for value in values): return False
+        return len(set(values)) == len(values)
+
+    # Given the name of a variable in the constraint, this function returns the other variables.
+    def get_others(self, variable: str) -> List[str]:
+        return [other for other in self.variables if other != variable]
+
+    # Removes from the given domains every value that cannot be part of any assignment where the variables have different values.
+    # Only the variables that have a domain are considered (the values of the assigned variables should already be removed).
+    # This is Regin's filtering: a maximum matching between the variables and the values is found by augmenting paths,
+    # then a value is kept for a variable only if it is matched to it, or if the edge between them lies on an alternating cycle
+    # (the variable and the value are in the same strongly connected component of the residual graph), or on an alternating path
+    # that starts from an unmatched value. This also detects the Hall sets (e.g. two variables that share the same two values).
+    # The function returns False if the variables cannot take different values (some domain would become empty), and True otherwise.
+    def propagate(self, domains: Dict[str, set]) -> bool:
+        variables = [variable for variable in self.variables if variable in domains]
+        matched_value: Dict[str, Any] = {}
+        matched_variable: Dict[Any, str] = {}
+
+        def augment(variable: str, visited: set) -> bool:
+            for value in domains[variable]:
+                if value in visited: continue
+                visited.add(value)
+                owner = matched_variable.get(value)
+                if owner is None or augment(owner, visited):
+                    matched_value[variable], matched_variable[value] = value, variable
+                    return True
+            return False
+
+        for variable in variables:
+            if not augment(variable, set()): return False
+
+        # The residual graph: each variable points to its matched value, and each value points to the other variables that can take it
+        # The variables are the nodes [0, n) and the values are the nodes [n, n + number of values)
+        values = list(dict.fromkeys(value for variable in variables for value in domains[variable]))
+        value_nodes = {value: node for node, value in enumerate(values, len(variables))}
+        size = len(variables) + len(values)
+        graph: List[List[int]] = [[] for _ in range(size)]
+        for node, variable in enumerate(variables):
+            matched = matched_value[variable]
+            graph[node].append(value_nodes[matched])
+            for value in domains[variable]:
+                if value != matched: graph[value_nodes[value]].append(node)
+
+        # The nodes reachable from the unmatched values
+        frontier = [value_nodes[value] for value in values if value not in matched_variable]
+        reachable = [False] * size
+        for node in frontier: reachable[node] = True
+        while frontier:
+            for child in graph[frontier.pop()]:
+                if not reachable[child]:
+                    reachable[child] = True
+                    frontier.append(child)
+
+        # The strongly connected components (Tarjan's algorithm with an explicit stack)
+        index, lowlink, component, on_stack = [-1] * size, [0] * size, [0] * size, [False] * size
+        stack, counter = [], 0
+        for root in range(size):
+            if index[root] >= 0: continue
+            index[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            work = [(root, iter(graph[root]))]
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if index[child] < 0:
+                        index[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack[child] = True
+                        work.append((child, iter(graph[child])))
+                        break
+                    if on_stack[child] and index[child] < lowlink[node]: lowlink[node] = index[child]
+                else:
+                    work.pop()
+                    if work and lowlink[node] < lowlink[work[-1][0]]: lowlink[work[-1][0]] = lowlink[node]
+                    if lowlink[node] == index[node]:
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            component[member] = node
+                            if member == node: break
+
+        for node, variable in enumerate(variables):
+            domain, matched = domains[variable], matched_value[variable]
+            for value in list(domain):
+                value_node = value_nodes[value]
+                if value == matched or reachable[value_node] or component[node] == component[value_node]: continue
+                domain.remove(value)
+        return True
+
+# A domain of small non-negative integers can be stored as a bitset (an int where the bit "v" is set if "v" is in the domain).
+# Then removing the values that are not supported by another value is a bitwise AND, the domain size is the number of set bits,
+# and copying a domain is copying an int. The values must be in the range [0, BITSET_LIMIT).
+BITSET_LIMIT = 64
+
+# Returns True if all the values of all the domains can be stored in bitsets
+def can_use_bitsets(domains: Dict[str, set]) -> bool:
+    return all(type(value) is int and 0 <= value < BITSET_LIMIT for domain in domains.values() for value in domain)
+
+# Converts a domain to a bitset
+def to_bitset(domain: Iterable[int]) -> int:
+    bits = 0
+    for value in domain: bits |= 1 << value
+    return bits
+
+# Returns the values in a bitset in ascending order
+def bitset_values(bits: int) -> List[int]:
+    values = []
+    while bits:
+        lowest = bits & -bits
+        values.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return values
+
+# Returns the number of values in a bitset
+popcount: Callable[[int], int] = getattr(int, "bit_count", None) or (lambda bits: bin(bits).count("1"))
+
+# A dictionary that maps each value of a variable to the bitset of the values of the other variable in a binary constraint
+# that satisfy the constraint with it. The bitset of a value is computed the first time it is requested.
+class SupportTable(dict):
+    def __init__(self, constraint: BinaryConstraint, variable: str, other_domain: set) -> None:
+        super().__init__()
+        self.constraint = constraint
+        self.variable = variable
+        self.other = constraint.get_other(variable)
+        self.other_domain = sorted(other_domain)
+
+    def __missing__(self, value: int) -> int:
+        constraint, variable, other = self.constraint, self.variable, self.other
+        bits = self[value] = to_bitset(other_value for other_value in self.other_domain
+                                       if constraint.is_satisfied({variable: value, other: other_value}))
+        return bits
+
+# Returns the variables of a constraint, or None if the constraint does not say which variables it involves
+def constraint_scope(constraint: Constraint) -> Optional[Tuple[str, ...]]:
+    if isinstance(constraint, UnaryConstraint): return (constraint.variable,)
+    variables = getattr(constraint, "variables", None)
+    return None if variables is None else tuple(variables)
+
 # This defines a generic CSP problem
 class Problem:
     variables: List[str]            # A list of the variable names in the problem
@@ -65,10 +222,84 @@ class Problem:
     constraints: List[Constraint]   # A list of constraints in the problem.
 
     # Returns True if the assignment is complete (all the variables has an value in the given assignment).
+    # An assignment with fewer values than variables is rejected in O(1) (so a solver that only assigns the variables
+    # of the problem only checks every variable once the assignment is complete).
     @track_call_count
     def is_complete(self, assignment: Assignment) -> bool:
-        return all(var in assignment for var in self.variables)
+        return len(assignment) >= len(self.variables) and all(var in assignment for var in self.variables)
     
     # Return True if the assignment satisfies all the constraints.
     def satisfies_constraints(self, assignment: Assignment) -> bool:
         return all(constraint.is_satisfied(assignment) for constraint in self.constraints)
+
+    # Returns the constraints that involve the given variable (in the same order as in "constraints")
+    def constraints_of(self, variable: str) -> List[Constraint]:
+        return self.__constraint_index()[2].get(variable, [])
+
+    # Returns the constraints that cannot be indexed by their variables (the ones whose variables are unknown
+    # or are not all variables of the problem), so they are not returned by "constraints_of" for any variable
+    def unindexed_constraints(self) -> List[Constraint]:
+        return self.__constraint_index()[3]
+
+    # Returns the binary constraints that involve the given variable (in the same order as in "constraints")
+    # paired with the other variable in each constraint.
+    # The index is built once for all the variables and built again only if the constraints list is replaced or resized
+    # (e.g. when 1-Consistency removes the unary constraints) or if the variables list is replaced.
+    # If a constraint is replaced in place (e.g. "problem.constraints[i] = constraint"), "invalidate" must be called.
+    def binary_constraints(self, variable: str) -> List[Tuple[BinaryConstraint, str]]:
+        return self.__constraint_index()[0].get(variable, [])
+
+    # Returns the all-different constraints that involve the given variable (in the same order as in "constraints")
+    # paired with the other variables in each constraint (using the same index as "binary_constraints").
+    def all_different_constraints(self, variable: str) -> List[Tuple[AllDifferentConstraint, List[str]]]:
+        return self.__constraint_index()[1].get(variable, [])
+
+    # The index contains the binary constraints, the all-different constraints and all the constraints of each variable,
+    # and the constraints that cannot be indexed by their variables
+    def __constraint_index(self) -> Tuple[Dict[str, list], Dict[str, list], Dict[str, list], List[Constraint]]:
+        index = getattr(self, "_constraint_index", None)
+        if index is None or index[0] is not self.constraints or index[1] != len(self.constraints) or index[2] is not self.variables:
+            arcs: Dict[str, List[Tuple[BinaryConstraint, str]]] = {}
+            groups: Dict[str, List[Tuple[AllDifferentConstraint, List[str]]]] = {}
+            scopes: Dict[str, List[Constraint]] = {}
+            unindexed: List[Constraint] = []
+            variables = set(self.variables)
+            for constraint in self.constraints:
+                scope = constraint_scope(constraint)
+                if scope and variables.issuperset(scope):
+                    for constrained in dict.fromkeys(scope): scopes.setdefault(constrained, []).append(constraint)
+                else:
+                    unindexed.append(constraint)
+                if isinstance(constraint, BinaryConstraint):
+                    for constrained in dict.fromkeys(constraint.variables):
+                        arcs.setdefault(constrained, []).append((constraint, constraint.get_other(constrained)))
+                elif isinstance(constraint, AllDifferentConstraint):
+                    for constrained in dict.fromkeys(constraint.variables):
+                        groups.setdefault(constrained, []).append((constraint, constraint.get_others(constrained)))
+            index = self._constraint_index = (self.constraints, len(self.constraints), self.variables, (arcs, groups, scopes, unindexed))
+        return index[3]
+
+    # Drops the constraint index and the caches built from the constraints and the domains (the supports, and the residues of AC-3),
+    # so they are built again when they are next needed. The index is only rebuilt automatically when the constraints list is replaced
+    # or resized, so this must be called after changing the constraints in place or the domains after the supports were requested.
+    def invalidate(self) -> None:
+        for name in ("_constraint_index", "_supports", "_residues"):
+            self.__dict__.pop(name, None)
+
+    # Returns a dictionary that maps each value of the given variable to the bitset of the values
+    # in the domain of the other variable that satisfy the binary constraint with it.
+    # Each bitset is computed from the problem domains when it is first requested, so the domains should not change
+    # after the first request (e.g. the supports should be requested after 1-Consistency).
+    def supports(self, constraint: BinaryConstraint, variable: str) -> Dict[int, int]:
+        cache = self.__dict__.setdefault("_supports", {})
+        supports = cache.get((constraint, variable))
+        if supports is None:
+            supports = cache[(constraint, variable)] = SupportTable(constraint, variable, self.domains[constraint.get_other(variable)])
+        return supports
+
+    # Returns the variables that share a binary or an all-different constraint with the given variable
+    # (in the order of their first constraint)
+    def neighbors(self, variable: str) -> List[str]:
+        others = [other for _, other in self.binary_constraints(variable)]
+        for _, group in self.all_different_constraints(variable): others.extend(group)
+        return list(dict.fromkeys(others))
@@ -1,7 +1,19 @@
-from typing import Any, Dict, List, Optional
-from CSP import Assignment, BinaryConstraint, Problem, UnaryConstraint
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+from collections import OrderedDict
+from CSP import Assignment, AllDifferentConstraint, BinaryConstraint, Constraint, Problem, UnaryConstraint, bitset_values, can_use_bitsets, popcount, to_bitset
 from helpers.utils import NotImplemented
 import math
+
+# The trail records the values removed from the domains during the search, so that they can be put back when the search backtracks
+# instead of copying the domains for every node. Each entry is (variable, removed values) where the removed values are stored
+# like the domains (a set or a bitset).
+Trail = List[Tuple[str, Any]]
+
+# Puts back the values removed after the trail had the length "mark" (the trail is truncated to that length)
+def undo(domains: Dict[str, Any], trail: Trail, mark: int) -> None:
+    while len(trail) > mark:
+        variable, removed = trail.pop()
+        domains[variable] |= removed
 # This function should apply 1-Consistency to the problem.
 # In other words, it should modify the domains to only include values that satisfy their variables' unary constraints.
 # Then all unary constraints should be removed from the problem (they are no longer needed).
@@ -23,6 +35,8 @@ def one_consistency(problem: Problem) -> bool:
 
     # remove all of the unary constraints from the problemn constraints
     problem.constraints = [constraint for constraint in problem.constraints if not isinstance(constraint, UnaryConstraint)]
+    # The domains changed, so the supports computed from them (if any) are dropped with the constraint index
+    problem.invalidate()
 
     # If any if the domain of any variable emptied, then there is no solution available, then return False
     for var in problem.variables:
@@ -40,26 +54,32 @@ def one_consistency(problem: Problem) -> bool:
 #   - If any variable's domain becomes empty, return False. Otherwise, return True.
 # IMPORTANT: Don't use the domains inside the problem, use and modify the ones given by the "domains" argument 
 #            since they contain the current domains of unassigned variables only.
-def forward_checking(problem: Problem, assigned_variable: str, assigned_value: Any, domains: Dict[str, set]) -> bool:
-
-    for constraint in problem.constraints:
-        # the constraint must be binary
-        if not isinstance(constraint, BinaryConstraint): continue
-        # the variable must be involved in the current constraint 
-        if assigned_variable not in constraint.variables: continue
-        # get the other variable involved
-        other_variable = constraint.get_other(assigned_variable)
+# If a trail is given, the removed values are recorded in it (see "undo").
+def forward_checking(problem: Problem, assigned_variable: str, assigned_value: Any, domains: Dict[str, set], trail: Optional[Trail] = None) -> bool:
+
+    # loop over the binary constraints that involve the assigned variable (using the constraint index of the problem)
+    for constraint, other_variable in problem.binary_constraints(assigned_variable):
         # if the other involved variable is already assigned, skip it
         if other_variable not in domains: continue 
 
         # remove any value from the other_variable's domain that doesn't satisfy the current constraint that 
         # this variable involved in 
-        for val in domains[other_variable].copy():
-            if not constraint.is_satisfied({ assigned_variable: assigned_value, other_variable: val }):
-                domains[other_variable].remove(val)
+        removed = {val for val in domains[other_variable] if not constraint.is_satisfied({ assigned_variable: assigned_value, other_variable: val })}
+        if removed:
+            domains[other_variable] -= removed
+            if trail is not None: trail.append((other_variable, removed))
         
         # If any if the domain of the other involved variable emptied, then there is no solution available, then return False
         if not domains[other_variable]: return False # if the domain of other_variable is empty
+
+    # for the all-different constraints, the only value that doesn't satisfy the constraint is the assigned value itself
+    for _, other_variables in problem.all_different_constraints(assigned_variable):
+        for other_variable in other_variables:
+            domain = domains.get(other_variable)
+            if domain is None or assigned_value not in domain: continue
+            domain.remove(assigned_value)
+            if trail is not None: trail.append((other_variable, {assigned_value}))
+            if not domain: return False
     return True
 
         
@@ -83,13 +103,8 @@ def least_restraining_values(problem: Problem, variable_to_assign: str, domains:
     # Then return a list of domain's values sorted descendigaly
     for var_to_assign_val in domains[variable_to_assign]:
         lrv_domain[var_to_assign_val] = 0
-        for constraint in problem.constraints:
-            # the constraint must be binary
-            if not isinstance(constraint, BinaryConstraint): continue
-            # the variable must be involved in the current constraint
-            if variable_to_assign not in constraint.variables: continue
-            # get the other variable involved
-            other_variable = constraint.get_other(variable_to_assign)
+        # loop over the binary constraints that involve the variable (using the constraint index of the problem)
+        for constraint, other_variable in problem.binary_constraints(variable_to_assign):
             # if the other involved variable is already assigned, skip it
             if other_variable not in domains: continue 
 
@@ -99,6 +114,12 @@ def least_restraining_values(problem: Problem, variable_to_assign: str, domains:
                 if constraint.is_satisfied({ variable_to_assign: var_to_assign_val, other_variable: other_var_val }):
                     lrv_domain[var_to_assign_val] += 1
 
+        # for the all-different constraints, every value of the other variables satisfies the constraint except the same value
+        for _, other_variables in problem.all_different_constraints(variable_to_assign):
+            for other_variable in other_variables:
+                if other_variable not in domains: continue
+                lrv_domain[var_to_assign_val] += len(domains[other_variable]) - (var_to_assign_val in domains[other_variable])
+
     # Sort the values ascendingaly to preserve the stability in case of equal count values
     lrv_domain = { val: lrv for val, lrv in sorted(lrv_domain.items(), key = lambda k: k[0]) } # to preserve the stability
     lrv_domain = [val for val, _ in sorted(lrv_domain.items(), key = lambda k: k[1], reverse = True)]
@@ -138,32 +159,328 @@ def minimum_remaining_values(problem: Problem, domains: Dict[str, set]) -> str:
 #            Also, if 1-Consistency deems the whole problem unsolvable, you shouldn't call "problem.is_complete" at all.
 
 
-def solve_rec(problem: Problem, assignment: Assignment) -> Optional[Assignment]:
-    # As a base case, return assignemnt if it is complete and consisitent with all constraints
-    if problem.is_complete(assignment) and problem.satisfies_constraints(assignment): return assignment
-    # Get all unassigned variables
-    unassigned_variables_domains = { var: domain for var, domain in problem.domains.items() if var not in assignment }
+# The following functions are the same as forward checking, least restraining values and minimum remaining values
+# but the domains are bitsets (see CSP.py). They are used by the solver when all the domain values are small non-negative integers
+# (e.g. in sudoku). They make the same choices as the functions above, so the solver explores the same nodes.
+def forward_checking_bitset(problem: Problem, assigned_variable: str, assigned_value: int, domains: Dict[str, int], trail: Optional[Trail] = None) -> bool:
+    for constraint, other_variable in problem.binary_constraints(assigned_variable):
+        domain = domains.get(other_variable)
+        if domain is None: continue
+        removed = domain & ~problem.supports(constraint, assigned_variable)[assigned_value]
+        if not removed: continue
+        domain = domains[other_variable] = domain ^ removed
+        if trail is not None: trail.append((other_variable, removed))
+        if not domain: return False
+    bit = 1 << assigned_value
+    for _, other_variables in problem.all_different_constraints(assigned_variable):
+        for other_variable in other_variables:
+            domain = domains.get(other_variable)
+            if domain is None or not domain & bit: continue
+            domain = domains[other_variable] = domain ^ bit
+            if trail is not None: trail.append((other_variable, bit))
+            if not domain: return False
+    return True
+
+def least_restraining_values_bitset(problem: Problem, variable_to_assign: str, domains: Dict[str, int]) -> List[int]:
+    arcs = [(problem.supports(constraint, variable_to_assign), domains[other_variable])
+            for constraint, other_variable in problem.binary_constraints(variable_to_assign) if other_variable in domains]
+    groups = [domains[other_variable] for _, other_variables in problem.all_different_constraints(variable_to_assign)
+              for other_variable in other_variables if other_variable in domains]
+    total = sum(popcount(domain) for domain in groups)
+    values = bitset_values(domains[variable_to_assign])
+    # the values are already in ascending order, and the sort is stable
+    counts = {value: sum(popcount(supports[value] & domain) for supports, domain in arcs) + total - sum((domain >> value) & 1 for domain in groups)
+              for value in values}
+    return sorted(values, key = lambda value: counts[value], reverse = True)
+
+def minimum_remaining_values_bitset(problem: Problem, domains: Dict[str, int]) -> str:
+    mrv = None
+    min_domain = math.inf
+    for var in problem.variables:
+        if var not in domains: continue
+        domain_len = popcount(domains[var])
+        if domain_len < min_domain:
+            min_domain = domain_len
+            mrv = var
+    return mrv
+
+# Applies the propagation of the all-different constraints (see "AllDifferentConstraint.propagate") to the given domains
+# until no domain changes: each constraint is propagated once, then again only if the domain of one of its variables is changed
+# by another constraint. The domains are modified in place (they can be sets or bitsets).
+# If a trail is given, the removed values are recorded in it (see "undo").
+# The function returns False if any domain becomes empty. Otherwise, it returns True.
+def all_different_propagation(problem: Problem, domains: Dict[str, Any], bitsets: bool = False, trail: Optional[Trail] = None) -> bool:
+    pending = dict.fromkeys(constraint for constraint in problem.constraints if isinstance(constraint, AllDifferentConstraint))
+    while pending:
+        constraint = next(iter(pending))
+        del pending[constraint]
+        involved = {var: set(bitset_values(domains[var])) if bitsets else set(domains[var]) for var in constraint.variables if var in domains}
+        if not constraint.propagate(involved): return False
+        for var, domain in involved.items():
+            removed = domains[var] ^ to_bitset(domain) if bitsets else domains[var] - domain
+            if not removed: continue
+            if bitsets: domains[var] ^= removed
+            else: domains[var] -= removed
+            if trail is not None: trail.append((var, removed))
+            for other, _ in problem.all_different_constraints(var):
+                if other is not constraint: pending[other] = None
+    return True
+
+# AC-3: makes every binary constraint arc consistent (every value in the domain of a variable is supported by a value
+# in the domain of the other variable). An all-different constraint counts as a "not equal" constraint between each pair
+# of its variables, so a value is only removed from the other variables when it is the last value in a domain.
+# The queue holds the variables whose domains have changed: when a variable is taken from the queue, the domains of its neighbors
+# are revised against its domain, and the neighbors whose domains change are added to the queue.
+# "variables" are the variables in the initial queue (all the variables that have domains if None).
+# With set domains, the last support found for each value is remembered and checked first next time (the residual supports of AC-2001).
+# The domains are modified in place, and if a trail is given, the removed values are recorded in it (see "undo").
+# The function returns False if any domain becomes empty. Otherwise, it returns True.
+def ac3(problem: Problem, domains: Dict[str, Any], bitsets: bool = False, trail: Optional[Trail] = None,
+        variables: Optional[List[str]] = None) -> bool:
+    queue = dict.fromkeys(domains if variables is None else variables)
+    residues = problem.__dict__.setdefault("_residues", {})
+
+    # Removes the values from the domain of a variable and adds it to the queue, returns False if the domain becomes empty
+    def prune(variable: str, removed: Any) -> bool:
+        if bitsets: domains[variable] ^= removed
+        else: domains[variable] -= removed
+        if trail is not None: trail.append((variable, removed))
+        queue[variable] = None
+        return bool(domains[variable])
+
+    while queue:
+        variable = next(iter(queue))
+        del queue[variable]
+        domain = domains.get(variable)
+        if domain is None: continue
+        for constraint, other in problem.binary_constraints(variable):
+            other_domain = domains.get(other)
+            if other_domain is None or other == variable: continue
+            if bitsets:
+                supports = problem.supports(constraint, other)
+                removed = 0
+                for value in bitset_values(other_domain):
+                    if not supports[value] & domain: removed |= 1 << value
+            else:
+                removed = set()
+                for value in other_domain:
+                    support = residues.get((constraint, other, value))
+                    if support is not None and support in domain: continue
+                    for support in domain:
+                        if constraint.is_satisfied({other: value, variable: support}):
+                            residues[(constraint, other, value)] = support
+                            break
+                    else:
+                        removed.add(value)
+            if removed and not prune(other, removed): return False
+        if (popcount(domain) if bitsets else len(domain)) != 1: continue
+        value = domain if bitsets else next(iter(domain))
+        for _, others in problem.all_different_constraints(variable):
+            for other in others:
+                other_domain = domains.get(other)
+                if other_domain is None or not (other_domain & value if bitsets else value in other_domain): continue
+                if not prune(other, value if bitsets else {value}): return False
+    return True
+
+# Returns True if forward checking ensures that all the constraints of the variable are satisfied
+# (they are binary or all-different constraints with other variables)
+def is_forward_checked(problem: Problem, variable: str) -> bool:
+    return all(isinstance(constraint, AllDifferentConstraint) or (isinstance(constraint, BinaryConstraint) and constraint.get_other(variable) != variable)
+               for constraint in problem.constraints_of(variable))
+
+# Returns the constraints that forward checking does not enforce, so they must be checked once the assignment is complete:
+# the constraints of the variables that are not forward checked and the constraints that are not indexed by their variables
+def leaf_constraints(problem: Problem) -> List[Constraint]:
+    constraints = dict.fromkeys(problem.unindexed_constraints())
+    for variable in problem.variables:
+        if not is_forward_checked(problem, variable): constraints.update(dict.fromkeys(problem.constraints_of(variable)))
+    return list(constraints)
+
+# Returns True if a complete assignment satisfies the given constraints (or all the constraints of the problem if they are None)
+def _satisfies_leaf_constraints(problem: Problem, assignment: Assignment, constraints: Optional[List[Constraint]]) -> bool:
+    if constraints is None: return problem.satisfies_constraints(assignment)
+    return all(constraint.is_satisfied(assignment) for constraint in constraints)
+
+# Backtracking search with forward checking
+# "domains" contains the current domains of the unassigned variables only. They are modified in place: each level picks a variable
+# and removes its domain, then for each value, forward checking records the values it removes in the trail, and they are put back
+# (by "undo") before the next value is tried. The domain of the variable is put back before returning to the previous level.
+# So no domains are copied during the search.
+# If "bitsets" is True, the domains are bitsets.
+# The search only assigns the variables of the problem, so checking if the assignment is complete takes O(1) until it is
+# (see "Problem.is_complete"). If "constraints" is given (see "leaf_constraints"), a complete assignment is only checked against
+# these constraints, since forward checking already enforces the others (so the check is O(1) if there are none, e.g. in sudoku).
+# Otherwise, it is checked against all the constraints.
+# If "mac" is True, arc consistency is maintained after forward checking (AC-3 starting from the variables pruned by forward checking).
+# If "propagate" is True, the all-different constraints are also propagated after forward checking.
+# Both prune more nodes, so the number of explored nodes is smaller than the one expected by the autograder.
+def solve_rec(problem: Problem, assignment: Assignment, domains: Dict[str, Any], bitsets: bool = False, propagate: bool = False,
+              trail: Optional[Trail] = None, mac: bool = False, constraints: Optional[List[Constraint]] = None) -> Optional[Assignment]:
+    if trail is None: trail = []
+    # As a base case, return the assignemnt if it is complete and satisfies the constraints
+    if problem.is_complete(assignment): return assignment if _satisfies_leaf_constraints(problem, assignment, constraints) else None
     # Choose the variable to assign based on MRV heuristic
-    variable = minimum_remaining_values(problem, unassigned_variables_domains)
-    
+    if bitsets:
+        variable = minimum_remaining_values_bitset(problem, domains)
+        values = least_restraining_values_bitset(problem, variable, domains)
+    else:
+        variable = minimum_remaining_values(problem, domains)
+        values = least_restraining_values(problem, variable, domains)
+
+    domain = domains.pop(variable)
     # Try all possible assignemnt values based on LRV heuristic 
-    for value in least_restraining_values(problem, variable, unassigned_variables_domains):
-        assignment[variable] = value
-        # del unassigned_variables_domains[variable]
-        
+    for value in values:
+        mark = len(trail)
         # By applying forward checking on every possible value from lrv list, you will check
         # if this assignment will lead to no solution or not, if it will, then it continues checking for other values
-        if forward_checking(problem, variable, value, unassigned_variables_domains.copy()):
-            rec_assignment = solve_rec(problem, assignment)
+        if (forward_checking_bitset(problem, variable, value, domains, trail) if bitsets else forward_checking(problem, variable, value, domains, trail)) \
+            and (not mac or ac3(problem, domains, bitsets, trail, [var for var, _ in trail[mark:]])) \
+            and (not propagate or all_different_propagation(problem, domains, bitsets, trail)):
+            assignment[variable] = value
+            rec_assignment = solve_rec(problem, assignment, domains, bitsets, propagate, trail, mac, constraints)
             if rec_assignment is not None: return rec_assignment
-        
-        # unassigned_variables_domains[variable] = problem.domains[variable].copy()
-        del assignment[variable]
+            del assignment[variable]
+        undo(domains, trail, mark)
+    domains[variable] = domain
     # if all values will lead to no solution, then return None
     return None
 
+# A nogood is a set of (variable, value) pairs that cannot be extended to a solution. It is stored as the pair that failed
+# (the value that the search tried) and the frozenset of the other pairs (the values of the conflict set at that time).
+Nogood = Tuple[Tuple[str, Any], FrozenSet[Tuple[str, Any]]]
+
+# A bounded store of the nogoods learned by the search. When it is full, the least recently used nogood is evicted
+# (a nogood is used when it is added or when it prunes a value).
+# The nogoods are indexed by the pair that failed only, so a nogood prunes that value when the other pairs are assigned
+# (and not another of its values when the search assigns them in another order). This keeps the lookups short.
+class NogoodStore:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.nogoods: OrderedDict[Nogood, None] = OrderedDict()
+        # The index uses dicts instead of sets so that the nogoods are checked in a deterministic order
+        self.index: Dict[Tuple[str, Any], Dict[FrozenSet[Tuple[str, Any]], None]] = {}
+
+    def __len__(self) -> int:
+        return len(self.nogoods)
+
+    def add(self, variable: str, value: Any, others: FrozenSet[Tuple[str, Any]]) -> None:
+        if self.capacity <= 0: return
+        nogood = ((variable, value), others)
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        if len(self.nogoods) >= self.capacity:
+            (pair, evicted), _ = self.nogoods.popitem(last=False)
+            del self.index[pair][evicted]
+            if not self.index[pair]: del self.index[pair]
+        self.nogoods[nogood] = None
+        self.index.setdefault((variable, value), {})[others] = None
+
+    # Returns the other pairs of a nogood that assigning the value to the variable would complete
+    # (all of them are in the assignment) or None if there is no such nogood
+    def find(self, assignment: Assignment, variable: str, value: Any) -> Optional[FrozenSet[Tuple[str, Any]]]:
+        candidates = self.index.get((variable, value))
+        if not candidates: return None
+        items = assignment.items()
+        for others in candidates:
+            if others <= items:
+                self.nogoods.move_to_end(((variable, value), others))
+                return others
+        return None
+
+# Backtracking search with forward checking and conflict-directed backjumping (FC-CBJ)
+# The domains, the trail and the heuristics are the same as in "solve_rec", in addition:
+#   - "pruners" stores for each unassigned variable the assigned variables whose forward checking removed values from its domain
+#     (in the order in which they were assigned). They are the reason why the values are missing from the domain.
+#   - The conflict set of a variable is the set of assigned variables that caused its values to fail: if forward checking empties
+#     the domain of another variable, the pruners of that variable are added to it, and if the search below a value fails,
+#     the conflict set returned by that search is added to it.
+# When all the values of a variable fail, the function returns its conflict set (and its pruners). The previous levels return
+# immediately until they reach the deepest variable in that set, since changing the variables in between cannot fix the failure
+# (this is the backjump). Then, that variable adds the conflict set to its own and tries its next value.
+# Every failure of the search below a value also teaches a nogood: the value with the current values of the conflict set.
+# It is stored in the nogood store (if one is given) and prunes the same value later if the search reaches the same values
+# of the conflict set again (e.g. when the MRV heuristic assigns the variables in another order after a backjump).
+# The function returns (the solution, an empty set) or (None, the conflict set).
+def solve_cbj_rec(problem: Problem, assignment: Assignment, domains: Dict[str, Any], bitsets: bool, trail: Trail,
+                  pruners: Dict[str, List[str]], nogoods: Optional[NogoodStore] = None,
+                  constraints: Optional[List[Constraint]] = None) -> Tuple[Optional[Assignment], Set[str]]:
+    if problem.is_complete(assignment):
+        # The constraints that forward checking does not handle can involve any assigned variable
+        return (assignment, set()) if _satisfies_leaf_constraints(problem, assignment, constraints) else (None, set(assignment))
+    if bitsets:
+        variable = minimum_remaining_values_bitset(problem, domains)
+        values = least_restraining_values_bitset(problem, variable, domains)
+    else:
+        variable = minimum_remaining_values(problem, domains)
+        values = least_restraining_values(problem, variable, domains)
+
+    domain = domains.pop(variable)
+    # The values missing from the domain were removed because of the pruners, so they are part of the conflict
+    conflict = set(pruners[variable])
+    for value in values:
+        if nogoods is not None:
+            others = nogoods.find(assignment, variable, value)
+            if others is not None:
+                conflict.update(var for var, _ in others)
+                continue
+        mark = len(trail)
+        consistent = forward_checking_bitset(problem, variable, value, domains, trail) if bitsets else forward_checking(problem, variable, value, domains, trail)
+        pruned = list(dict.fromkeys(var for var, _ in trail[mark:]))
+        for var in pruned: pruners[var].append(variable)
+        if consistent:
+            assignment[variable] = value
+            solution, child_conflict = solve_cbj_rec(problem, assignment, domains, bitsets, trail, pruners, nogoods, constraints)
+            if solution is not None: return solution, child_conflict
+            del assignment[variable]
+            if variable not in child_conflict:
+                # This variable did not cause the failure, so jump back over it
+                for var in pruned: pruners[var].pop()
+                undo(domains, trail, mark)
+                domains[variable] = domain
+                return None, child_conflict
+            child_conflict.discard(variable)
+        else:
+            # The domain of the last pruned variable became empty
+            child_conflict = {var for var in pruners[trail[-1][0]] if var != variable}
+        # Forward checking finds its own failures again at the cost of one step, so only the failures below a value are learned
+        if nogoods is not None and consistent:
+            nogoods.add(variable, value, frozenset([(var, assignment[var]) for var in child_conflict]))
+        conflict |= child_conflict
+        for var in pruned: pruners[var].pop()
+        undo(domains, trail, mark)
+    domains[variable] = domain
+    return None, conflict
+
 # This function used to apply one consistincy before recursivly backtracking the solution
 # it also initializes the backtracking algorithm with empy assignment
-def solve(problem: Problem) -> Optional[Assignment]:
+# The domains are stored as bitsets if all their values are small non-negative integers
+# The search modifies a copy of the domains, so the domains of the problem are not changed (except by 1-Consistency)
+# The inference used after each assignment is one of:
+#   - "fc": forward checking only (the default, which explores the nodes expected by the autograder).
+#   - "ac3": AC-3 is applied once before the search, then forward checking is used during the search.
+#   - "mac": AC-3 is applied before the search, then arc consistency is maintained during the search (see "solve_rec").
+# The search strategy is one of:
+#   - "backtrack": chronological backtracking (see "solve_rec").
+#   - "cbj": conflict-directed backjumping with a nogood store that keeps at most "nogood_capacity" nogoods (see "solve_cbj_rec").
+#     It only supports forward checking during the search (so the inference is "fc" or "ac3" and "propagate" is False), since the
+#     values removed by the other inferences do not record which assignments caused them.
+INFERENCES = ["fc", "ac3", "mac"]
+STRATEGIES = ["backtrack", "cbj"]
+
+def solve(problem: Problem, propagate: bool = False, inference: str = "fc", strategy: str = "backtrack",
+          nogood_capacity: int = 10000) -> Optional[Assignment]:
+    if inference not in INFERENCES: raise ValueError(f"unknown inference {inference!r}, expected one of {INFERENCES}")
+    if strategy not in STRATEGIES: raise ValueError(f"unknown strategy {strategy!r}, expected one of {STRATEGIES}")
+    if strategy == "cbj" and (inference == "mac" or propagate):
+        raise ValueError("the cbj strategy only supports forward checking during the search (no mac or propagation)")
     if not one_consistency(problem): return None
-    return solve_rec(problem, {})
+    bitsets = can_use_bitsets(problem.domains)
+    domains = {var: to_bitset(domain) if bitsets else domain.copy() for var, domain in problem.domains.items()}
+    if inference != "fc" and not ac3(problem, domains, bitsets): return None
+    if propagate and not all_different_propagation(problem, domains, bitsets): return None
+    constraints = leaf_constraints(problem)
+    if strategy == "cbj":
+        pruners = {var: [] for var in problem.variables}
+        return solve_cbj_rec(problem, {}, domains, bitsets, [], pruners, NogoodStore(nogood_capacity), constraints)[0]
+    return solve_rec(problem, {}, domains, bitsets, propagate, mac = inference == "mac", constraints = constraints)
@@ -0,0 +1,166 @@
+from typing import List, Optional, Tuple
+from CSP import Assignment
+from sudoku import SudokuProblem
+
+# This file contains a sudoku solver based on Knuth's Algorithm X with Dancing Links (DLX).
+# Sudoku is an exact cover problem: every (variable, value) pair is a row that covers 4 columns: the cell, the value in the row,
+# the value in the column and the value in the square. A solution is a set of rows that covers every column exactly once.
+# The columns that are already covered by the clues are left out, and so are the rows that conflict with the clues.
+# The matrix is stored as circular doubly linked lists in flat arrays (one entry per node), so covering a column
+# (removing it and all its rows) and uncovering it (putting them back in the reverse order) only relinks the neighbors.
+# It works for any sudoku size (4x4, 9x9, 16x16, 25x25, ...) and returns the same assignment format as "CSP_solver.solve".
+
+# The sparse exact cover matrix
+class ExactCover:
+    def __init__(self, column_count: int) -> None:
+        # The node 0 is the root, the nodes [1, column_count] are the column headers
+        headers = range(column_count + 1)
+        self.left = [column - 1 for column in headers]
+        self.right = [column + 1 for column in headers]
+        self.left[0], self.right[column_count] = column_count, 0
+        self.up = list(headers)
+        self.down = list(headers)
+        self.column = list(headers)
+        self.row = [-1] * (column_count + 1)      # the row of each node (-1 for the headers)
+        self.size = [0] * (column_count + 1)
+
+    # Adds rows to the matrix, each row is the list of the columns (numbered from 1) that it covers
+    # The rows are numbered in the order in which they are added
+    def add_rows(self, rows: List[List[int]]) -> None:
+        left, right, up, down, columns, size = self.left, self.right, self.up, self.down, self.column, self.size
+        # The nodes of each column in order (starting from the current last node of the column)
+        chains = [[up[column]] for column in range(len(size))]
+        first_row = self.row[-1] + 1
+        for row, row_columns in enumerate(rows, first_row):
+            first, count = len(left), len(row_columns)
+            left.extend([first + count - 1, *range(first, first + count - 1)])
+            right.extend([*range(first + 1, first + count), first])
+            columns.extend(row_columns)
+            self.row.extend([row] * count)
+            for node, column in enumerate(row_columns, first): chains[column].append(node)
+        up.extend([0] * (len(left) - len(up)))
+        down.extend([0] * (len(left) - len(down)))
+        for column, chain in enumerate(chains):
+            if len(chain) == 1: continue
+            chain.append(column)
+            for above, below in zip(chain, chain[1:]):
+                down[above] = below
+                up[below] = above
+            size[column] += len(chain) - 2
+
+    # Removes a column from the header list and removes its rows from the other columns
+    def cover(self, column: int) -> None:
+        left, right, up, down, columns, size = self.left, self.right, self.up, self.down, self.column, self.size
+        right[left[column]], left[right[column]] = right[column], left[column]
+        i = down[column]
+        while i != column:
+            j = right[i]
+            while j != i:
+                down[up[j]], up[down[j]] = down[j], up[j]
+                size[columns[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    # Undoes "cover" (the nodes are put back in the reverse order in which they were removed)
+    def uncover(self, column: int) -> None:
+        left, right, up, down, columns, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[column]
+        while i != column:
+            j = left[i]
+            while j != i:
+                size[columns[j]] += 1
+                down[up[j]] = up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[column]] = column
+        left[right[column]] = column
+
+    # Returns the column with the fewest rows (Knuth's "S" heuristic), the first one if there is a tie
+    def choose_column(self) -> int:
+        right, size = self.right, self.size
+        best, best_size = 0, None
+        column = right[0]
+        while column != 0:
+            if best_size is None or size[column] < best_size:
+                best, best_size = column, size[column]
+                if best_size <= 1: break
+            column = right[column]
+        return best
+
+    # Returns the rows of the first exact cover found (or None if there is none)
+    # The search is iterative (a stack of the chosen nodes), so there is no recursion limit on the number of rows in a solution
+    def search(self) -> Optional[List[int]]:
+        left, right, down, columns = self.left, self.right, self.down, self.column
+        chosen: List[int] = []
+        forward = True
+        while True:
+            if forward:
+                if right[0] == 0: return [self.row[node] for node in chosen]
+                column = self.choose_column()
+                self.cover(column)
+                node = down[column]
+            else:
+                if not chosen: return None
+                node = chosen.pop()
+                j = left[node]
+                while j != node:
+                    self.uncover(columns[j])
+                    j = left[j]
+                column = columns[node]
+                node = down[node]
+            if node == column:
+                # All the rows of the column were tried, so backtrack
+                self.uncover(column)
+                forward = False
+                continue
+            chosen.append(node)
+            j = right[node]
+            while j != node:
+                self.cover(columns[j])
+                j = right[j]
+            forward = True
+
+# Returns the (row, column) of a sudoku variable such as "(2, 5)"
+def parse_cell(variable: str) -> Tuple[int, int]:
+    row, column = variable.strip("()").split(",")
+    return int(row), int(column)
+
+# Solve a sudoku problem using DLX and return the assignment of its variables (or None if there is no solution)
+# The values of each variable are taken from its domain in the problem (after excluding the values that conflict with the clues)
+def solve(problem: SudokuProblem) -> Optional[Assignment]:
+    size = problem.size
+    cell_dim = int(size ** 0.5)
+    area = size * size
+    # The 4 columns covered by placing the value v in the cell (r, c): the cell, the value in the row, in the column and in the square
+    columns_of = lambda r, c, v: [1 + r * size + c, 1 + area + r * size + v - 1, 1 + 2 * area + c * size + v - 1,
+                                  1 + 3 * area + ((r // cell_dim) * cell_dim + c // cell_dim) * size + v - 1]
+
+    # The values used by the clues in each row, column and square
+    used = [set() for _ in range(3 * size)]
+    covered = set()
+    for variable, value in problem.clues.items():
+        r, c = parse_cell(variable)
+        columns = columns_of(r, c, value)
+        if not covered.isdisjoint(columns): return None # Two clues conflict
+        covered.update(columns)
+        for group in (r, size + c, 2 * size + (r // cell_dim) * cell_dim + c // cell_dim): used[group].add(value)
+
+    # The options are the values in the domain of each variable that do not conflict with the clues
+    options: List[Tuple[str, int]] = []
+    rows: List[List[int]] = []
+    for variable in problem.variables:
+        r, c = parse_cell(variable)
+        values = problem.domains[variable] - used[r] - used[size + c] - used[2 * size + (r // cell_dim) * cell_dim + c // cell_dim]
+        for value in sorted(values):
+            options.append((variable, value))
+            rows.append(columns_of(r, c, value))
+    matrix = ExactCover(4 * area)
+    matrix.add_rows(rows)
+    # The columns covered by the clues are removed (they have no rows), every other column must be covered exactly once
+    # (a column that no option can cover has no rows, so the search fails immediately)
+    for column in covered: matrix.cover(column)
+
+    rows = matrix.search()
+    if rows is None: return None
+    values = dict(options[index] for index in rows)
+    return {variable: values[variable] for variable in problem.variables}
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Callable, Generic
-from game import HeuristicFunction, Game, S, A
+from game import HeuristicFunction, Game, S, A, zero_heuristic
 from helpers.mt19937 import RandomGenerator
 
 # This is an abstract class for all agents
@@ -26,7 +26,7 @@ class HumanAgent(Agent[S, A]):
 class SearchAgent(Agent[S, A]):
     def __init__(self,
         search_fn: Callable[[Game[S, A], S, HeuristicFunction, int], A],
-        heuristic: HeuristicFunction = (lambda *_: 0), 
+        heuristic: HeuristicFunction = zero_heuristic, 
         search_depth: int = -1) -> None:
         super().__init__()
         self.search_fn = search_fn
@@ -37,6 +37,23 @@ class SearchAgent(Agent[S, A]):
         _, action = self.search_fn(game, state, self.heuristic, self.search_depth)
         return action
 
+# The MCTS agent requests the action from a Monte Carlo Tree Search (see mcts.py for the available options)
+# Unlike the search agent, it has no depth limit, and its budget is a number of simulations (and/or a time limit) per action
+class MCTSAgent(Agent[S, A]):
+    def __init__(self, heuristic: HeuristicFunction = zero_heuristic, **options) -> None:
+        super().__init__()
+        from mcts import MonteCarloTreeSearch
+        self.search = MonteCarloTreeSearch(**options)
+        self.heuristic = heuristic
+
+    def act(self, game: Game[S, A], state: S) -> A:
+        _, action = self.search(game, state, self.heuristic)
+        return action
+    
+    # Stop the worker processes used by the search (if any)
+    def close(self) -> None:
+        self.search.close()
+
 # The random agent selects actions randomly
 class RandomAgent(Agent[S, A]):
     def __init__(self, seed: int = None) -> None:
@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dungeon import DungeonGame, MonsterAgent
+from agents import SearchAgent, MCTSAgent
+from helpers.mt19937 import RandomGenerator
+from helpers.utils import fetch_tracked_call_count
+from play_dungeon import create_agent, create_parser
+import argparse, csv, shlex, sys, time
+
+# This script plays many dungeon games without drawing them and reports how well the agents play.
+# Every episode is identified by a seed which decides the seeds of the monsters (and of the agents that make random choices),
+# so the same seed replays the same game for the same agent. The episodes are spread across a pool of processes, and the
+# result of each episode is written to a CSV file as soon as it finishes. At the end, a summary is printed for each agent
+# configuration and level, and if two configurations are given, they are compared on the same seeds (head-to-head).
+# Each configuration is a string of play_dungeon.py options, e.g.:
+#   python batch_dungeon.py dungeons/dungeon1.txt dungeons/dungeon2.txt -A "-a alphabeta -hf heuristic -d 3" -n 100 -o results.csv
+#   python batch_dungeon.py dungeons/dungeon3.txt -A "-a alphabeta -hf heuristic -d 3" -B "-a greedy -hf heuristic" -n 200 -w 4
+# Note: the time per move is measured inside the worker processes, so it grows if there are more workers than CPUs.
+
+CSV_FIELDS = ["config", "level", "seed", "won", "value", "score", "moves", "truncated", "explored", "mean_move_time", "max_move_time"]
+
+# The games loaded by each worker process (a game is reused by all the episodes played on the same level)
+_games: Dict[str, DungeonGame] = {}
+
+# Plays one episode and returns its result as a CSV row
+# The game stops after "max_steps" player moves (if given) and the episode is counted as a loss
+def play_episode(name: str, options: argparse.Namespace, level: str, seed: int, max_steps: Optional[int] = None) -> Dict[str, Any]:
+    game = _games.get(level)
+    if game is None: game = _games[level] = DungeonGame.from_file(level)
+    seed_gen = RandomGenerator(seed)
+    agent = create_agent(options, seed_gen.generate())
+    agents = [agent, *(MonsterAgent(seed_gen.generate()) for _ in range(game.agent_count - 1))]
+
+    state = game.get_initial_state()
+    moves, explored, move_times = 0, 0, []
+    while True:
+        terminal, values = game.is_terminal(state)
+        if terminal or (max_steps is not None and moves >= max_steps): break
+        turn = game.get_turn(state)
+        if turn == 0:
+            moves += 1
+            # Like play_dungeon.py, only the calls made by the agent during its move are counted
+            fetch_tracked_call_count(DungeonGame.is_terminal) # Clear the call counter
+            start = time.perf_counter()
+            action = agent.act(game, state)
+            move_times.append(time.perf_counter() - start)
+            explored += fetch_tracked_call_count(DungeonGame.is_terminal)
+        else:
+            action = agents[turn].act(game, state)
+        state = game.get_successor(state, action)
+
+    if isinstance(agent, SearchAgent) and hasattr(agent.search_fn, "close"): agent.search_fn.close()
+    if isinstance(agent, MCTSAgent): agent.close()
+
+    won = terminal and values[0] > 0
+    return {
+        "config": name, "level": level, "seed": seed, "won": int(won),
+        "value": values[0] if terminal else None, "score": state.score(), "moves": moves, "truncated": int(not terminal),
+        "explored": explored, "mean_move_time": sum(move_times) / len(move_times) if move_times else 0,
+        "max_move_time": max(move_times, default = 0)
+    }
+
+# Prints the win rate, the mean score, the mean number of moves and the time per move of each configuration on each level
+def print_summary(rows: List[Dict[str, Any]]) -> None:
+    print(f"{'config':<8} {'level':<24} {'episodes':>8} {'win rate':>8} {'score':>9} {'moves':>7} {'truncated':>9} {'ms/move':>9}")
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for row in rows: groups.setdefault((row["config"], row["level"]), []).append(row)
+    for (name, level), group in sorted(groups.items()):
+        count, moves = len(group), sum(row["moves"] for row in group)
+        move_time = sum(row["mean_move_time"] * row["moves"] for row in group) / moves if moves else 0
+        print(f"{name:<8} {level:<24} {count:>8} {sum(row['won'] for row in group)/count:>8.1%} {sum(row['score'] for row in group)/count:>9.2f} "
+              f"{moves/count:>7.1f} {sum(row['truncated'] for row in group):>9} {1000*move_time:>9.2f}")
+
+# Compares two configurations on the seeds they both played: a configuration is better on a seed if it won and the other lost,
+# or if both had the same outcome and it got a higher score
+def print_head_to_head(rows: List[Dict[str, Any]], first: str, second: str) -> None:
+    results = {(row["config"], row["level"], row["seed"]): row for row in rows}
+    print(f"Head-to-head ({first} vs {second}):")
+    print(f"{'level':<24} {'seeds':>6} {first+' better':>9} {second+' better':>9} {'ties':>6}")
+    for level in sorted({row["level"] for row in rows}):
+        seeds = sorted({seed for name, lvl, seed in results if lvl == level and name == first and (second, level, seed) in results})
+        wins = [0, 0, 0]
+        for seed in seeds:
+            a, b = results[(first, level, seed)], results[(second, level, seed)]
+            key_a, key_b = (a["won"], a["score"]), (b["won"], b["score"])
+            wins[0 if key_a > key_b else 1 if key_b > key_a else 2] += 1
+        print(f"{level:<24} {len(seeds):>6} {wins[0]:>9} {wins[1]:>9} {wins[2]:>6}")
+
+def main(args: argparse.Namespace):
+    configs = {"A": args.config_a}
+    if args.config_b is not None: configs["B"] = args.config_b
+    parser = create_parser()
+    options = {}
+    for name, config in configs.items():
+        options[name] = parser.parse_args([args.levels[0], *shlex.split(config)])
+        if options[name].agent == "human": parser.error("the batch runner cannot play with a human agent")
+        print(f"{name}: {config}")
+    seeds = range(args.first_seed, args.first_seed + args.episodes)
+    tasks = [(name, level, seed) for level in args.levels for seed in seeds for name in configs]
+
+    rows = []
+    output = open(args.output, "w", newline="") if args.output else None
+    writer = csv.DictWriter(output or sys.stdout, fieldnames = CSV_FIELDS) if output or not args.quiet else None
+    if writer is not None: writer.writeheader()
+    start = time.time()
+    with ProcessPoolExecutor(args.workers) as executor:
+        futures = [executor.submit(play_episode, name, options[name], level, seed, args.max_steps) for name, level, seed in tasks]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                (output or sys.stdout).flush()
+    if output is not None: output.close()
+
+    print()
+    print_summary(rows)
+    if len(configs) == 2:
+        print()
+        print_head_to_head(rows, "A", "B")
+    print(f"Elapsed time: {time.time() - start} seconds")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play many seeded dungeon games in parallel and summarize the results")
+    parser.add_argument("levels", nargs="+", help="paths to the dungeons to play")
+    parser.add_argument("--config-a", "-A", required=True, help="the options of the first agent (as given to play_dungeon.py)")
+    parser.add_argument("--config-b", "-B", default=None, help="the options of a second agent to compare with the first one on the same seeds")
+    parser.add_argument("--episodes", "-n", type=int, default=100, help="the number of episodes (seeds) played on each level")
+    parser.add_argument("--first-seed", "-fs", type=int, default=0, help="the seed of the first episode (the seeds are consecutive)")
+    parser.add_argument("--max-steps", "-ms", type=int, default=None,
+                        help="stop an episode (and count it as a loss) after this number of player moves")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="the number of processes (default: the number of CPUs)")
+    parser.add_argument("--output", "-o", default=None, help="the CSV file to which the result of each episode is written")
+    parser.add_argument("--quiet", "-q", action="store_true", help="do not print the result of each episode if there is no output file")
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
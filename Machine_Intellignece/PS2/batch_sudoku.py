@@ -0,0 +1,150 @@
+from typing import Deque, Iterator, List, TextIO, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from array import array
+from sudoku import SudokuProblem
+import CSP_solver, DLX_solver
+import argparse, itertools, os, sys, time
+
+# This script solves many sudoku puzzles from a file using a pool of processes and writes the solutions in the same order.
+# The puzzles are either one per line (N*N characters where the empty cells are '.' or '0' and the values above 9 are letters,
+# e.g. 81 characters for a 9x9 puzzle), or in the format of the files in the "sudoku" folder (separated by empty lines).
+# The file is read as a stream and the puzzles are sent to the workers in chunks, and only a few chunks are in flight at a time,
+# so the memory does not grow with the number of puzzles. At the end, the throughput and the latency percentiles are printed.
+# Example:
+#   python batch_sudoku.py puzzles.txt -o solutions.txt -w 4
+#   python batch_sudoku.py sudoku/sudoku_9x9_1.txt -s backtrack
+# Note: the latency of a puzzle is measured inside the worker process (reading the puzzle and solving it).
+# A puzzle that cannot be read (e.g. an unknown character, or a value larger than the size of the puzzle) does not stop the batch:
+# "Invalid puzzle" is written instead of its solution and it is counted as unsolved.
+
+SOLVERS = {"dlx": DLX_solver.solve, "backtrack": CSP_solver.solve}
+CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Returns True if a line is a puzzle written in one line (its length is the square of a square and it has no spaces)
+def is_one_line(line: str) -> bool:
+    size = round(len(line) ** 0.5)
+    return len(line) > 1 and size * size == len(line) and round(size ** 0.5) ** 2 == size and ' ' not in line
+
+# Reads the puzzles from a file one at a time, yields (True, line) for one-line puzzles and (False, text) for the other format
+def read_puzzles(file: TextIO) -> Iterator[Tuple[bool, str]]:
+    block: List[str] = []
+    for line in file:
+        line = line.strip()
+        if block and (not line or is_one_line(line)):
+            yield False, '\n'.join(block)
+            block = []
+        if is_one_line(line):
+            yield True, line
+        elif line:
+            block.append(line)
+    if block: yield False, '\n'.join(block)
+
+# Converts a one-line puzzle to the format read by "SudokuProblem.from_text"
+# Raises a ValueError if a character is not a value between 1 and the size of the puzzle (or an empty cell)
+def one_line_to_text(line: str) -> str:
+    size = round(len(line) ** 0.5)
+    cells = []
+    for char in line:
+        if char in '.0':
+            cells.append('.')
+            continue
+        value = CHARACTERS.find(char.upper())
+        if not 1 <= value <= size: raise ValueError(f"invalid character {char!r} in a {size}x{size} puzzle")
+        cells.append(str(value))
+    return '\n'.join(' '.join(cells[row * size:(row + 1) * size]) for row in range(size))
+
+# Raises a ValueError if the problem read by "SudokuProblem.from_text" is not a valid puzzle
+# (the size is not a square, the rows do not all have one cell per column, or a clue is not a value between 1 and the size)
+def check_puzzle(problem: SudokuProblem) -> None:
+    size = problem.size
+    if size == 0 or round(size ** 0.5) ** 2 != size: raise ValueError(f"the size of a puzzle must be a square, got {size}")
+    if len(problem.variables) + len(problem.clues) != size * size:
+        raise ValueError(f"a {size}x{size} puzzle must have {size} cells in each row")
+    for variable, value in problem.clues.items():
+        row, column = DLX_solver.parse_cell(variable)
+        if not (0 <= row < size and 0 <= column < size and 1 <= value <= size):
+            raise ValueError(f"invalid clue {value} at {variable} in a {size}x{size} puzzle")
+
+# Converts the solution of a problem to one line (in the same format as the one-line puzzles)
+def solution_to_line(problem: SudokuProblem, solution: dict) -> str:
+    values = {**problem.clues, **solution}
+    return ''.join(CHARACTERS[values[str((r, c))]] for r in range(problem.size) for c in range(problem.size))
+
+# Solves a chunk of puzzles and returns for each puzzle: whether it was solved, the text written to the output and the time it took
+# The solution of a one-line puzzle is written in one line, and the solution of a puzzle in the other format is written in that format
+# followed by an empty line. If a puzzle has no solution, "No solution" is written instead, and if it cannot be read, "Invalid puzzle".
+def solve_chunk(solver: str, puzzles: List[Tuple[bool, str]]) -> List[Tuple[bool, str, float]]:
+    solve_fn = SOLVERS[solver]
+    results = []
+    for one_line, text in puzzles:
+        start = time.perf_counter()
+        solution = None
+        try:
+            problem = SudokuProblem.from_text(one_line_to_text(text) if one_line else text)
+            check_puzzle(problem)
+        except (ValueError, IndexError):
+            text = "Invalid puzzle"
+        else:
+            solution = solve_fn(problem)
+            if solution is None:
+                text = "No solution"
+            else:
+                text = solution_to_line(problem, solution) if one_line else problem.format_assignment(solution)
+        elapsed = time.perf_counter() - start
+        results.append((solution is not None, text + ("\n" if one_line else "\n\n"), elapsed))
+    return results
+
+# Returns the value at the given percentile of the sorted values (nearest rank)
+def percentile(values: List[float], percent: float) -> float:
+    if not values: return 0
+    return values[min(len(values) - 1, max(0, round(percent / 100 * len(values)) - 1))]
+
+def main(args: argparse.Namespace):
+    output = open(args.output, "w") if args.output else None
+    writer = output or (None if args.quiet else sys.stdout)
+    latencies, solved, count = array('d'), 0, 0
+    workers = args.workers or os.cpu_count() or 1
+    start = time.time()
+    with open(args.puzzles, 'r') as file, ProcessPoolExecutor(workers) as executor:
+        puzzles = read_puzzles(file)
+        if args.limit is not None: puzzles = itertools.islice(puzzles, args.limit)
+        in_flight: Deque[Future] = deque()
+
+        # Writes the results of the oldest chunk (waiting for it if needed), so the solutions are written in order
+        def write_oldest():
+            nonlocal solved, count
+            for ok, text, elapsed in in_flight.popleft().result():
+                count += 1
+                solved += ok
+                latencies.append(elapsed)
+                if writer is not None: writer.write(text)
+
+        while True:
+            chunk = list(itertools.islice(puzzles, args.chunk_size))
+            if not chunk: break
+            if len(in_flight) >= 2 * workers: write_oldest()
+            in_flight.append(executor.submit(solve_chunk, args.solver, chunk))
+        while in_flight: write_oldest()
+    if output is not None: output.close()
+    elapsed = time.time() - start
+
+    ordered = sorted(latencies)
+    print(f"Solved {solved} of {count} puzzles in {elapsed:.3f} seconds ({count / elapsed if elapsed else 0:.1f} puzzles per second)")
+    print("Latency (ms): " + ", ".join(f"p{p:g} {1000 * percentile(ordered, p):.3f}" for p in (50, 90, 99, 99.9)) +
+          f", max {1000 * (ordered[-1] if ordered else 0):.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve many sudoku puzzles in parallel")
+    parser.add_argument("puzzles", help="path to the file of puzzles (one per line, or in the format of the sudoku folder)")
+    parser.add_argument("--output", "-o", default=None, help="the file to which the solutions are written (in the order of the puzzles)")
+    parser.add_argument("--solver", "-s", default="dlx", choices=list(SOLVERS), help="the solver used for each puzzle")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="the number of processes (default: the number of CPUs)")
+    parser.add_argument("--chunk-size", "-c", type=int, default=64, help="the number of puzzles sent to a worker at a time")
+    parser.add_argument("--limit", "-n", type=int, default=None, help="solve only the first n puzzles")
+    parser.add_argument("--quiet", "-q", action="store_true", help="do not print the solutions if there is no output file")
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
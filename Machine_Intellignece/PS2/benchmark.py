@@ -0,0 +1,80 @@
+from typing import Callable, Tuple
+from dungeon import DungeonGame, dungeon_heuristic
+from tree import TreeGame, tree_heuristic
+from compact_tree import CompactTreeGame
+from game import Game, HeuristicFunction
+from transposition import TranspositionTable
+from ordering import MoveOrderer
+from helpers.utils import fetch_tracked_call_count, fetch_recorded_calls
+import argparse, importlib, inspect, time
+
+# This script measures the explored nodes and the wall time of the search functions on dungeons and trees
+# Example:
+#   python benchmark.py dungeons/dungeon1.txt dungeons/dungeon4.txt -f alphabeta expectimax -d 2 4 6 --tt-size 100000
+#   python benchmark.py dungeons/dungeon4.txt -f iterative_deepening -d 4 6 -tt 100000 --history
+#   python benchmark.py trees/tree2.json dungeons/dungeon3.txt -f alphabeta parallel_alphabeta -d 6 8 -w 1 2 4
+#   python benchmark.py dungeons/dungeon2.txt -f minimax stack_search.minimax alphabeta stack_search.alphabeta -d 3 5
+# Note: the nodes explored by the worker processes of the parallel search are not counted
+
+# Load a dungeon (.txt), a tree (.json) or a compact tree cache (.ctree) and return the game and its heuristic
+def load_game(path: str) -> Tuple[Game, HeuristicFunction]:
+    if path.endswith(".json"):
+        return TreeGame.from_file(path), tree_heuristic
+    if path.endswith(".ctree"):
+        return CompactTreeGame.from_file(path), tree_heuristic
+    return DungeonGame.from_file(path), dungeon_heuristic
+
+# Return the number of nodes explored since the last call (the number of calls to "is_terminal")
+def fetch_explored(game: Game) -> int:
+    if isinstance(game, TreeGame):
+        return len(fetch_recorded_calls(TreeGame.is_terminal))
+    return fetch_tracked_call_count(DungeonGame.is_terminal)
+
+# Run a search function and return the value, the action, the number of explored nodes and the elapsed time
+def measure(game: Game, heuristic: HeuristicFunction, search_fn: Callable, depth: int, **kwargs):
+    state = game.get_initial_state()
+    fetch_explored(game) # Clear the call counter
+    start = time.perf_counter()
+    value, action = search_fn(game, state, heuristic, depth, **kwargs)
+    elapsed = time.perf_counter() - start
+    return value, action, fetch_explored(game), elapsed
+
+# Return a search function given its name in search.py or its qualified name in another module (e.g. "stack_search.alphabeta")
+def load_search_function(name: str) -> Callable:
+    module, _, function = name.rpartition(".")
+    return getattr(importlib.import_module(module or "search"), function)
+
+def main(args: argparse.Namespace):
+    print(f"{'level':<24} {'function':<30} {'depth':>5} {'mode':<8} {'value':>14} {'action':<16} {'nodes':>9} {'time (s)':>9}")
+    for path in args.levels:
+        game, heuristic = load_game(path)
+        for name in args.functions:
+            search_fn = load_search_function(name)
+            for depth in args.depths:
+                parameters = inspect.signature(search_fn).parameters
+                modes = [("plain", {})]
+                if args.workers and "workers" in parameters:
+                    modes = [(f"{workers} proc", {"workers": workers}) for workers in args.workers]
+                if args.tt_size > 0 and "transposition_table" in parameters:
+                    modes.append(("tt", {"transposition_table": TranspositionTable(args.tt_size)}))
+                if args.history and "move_orderer" in parameters:
+                    modes.append(("history", {"move_orderer": MoveOrderer()}))
+                    if args.tt_size > 0 and "transposition_table" in parameters:
+                        modes.append(("tt+hist", {"transposition_table": TranspositionTable(args.tt_size), "move_orderer": MoveOrderer()}))
+                for mode, kwargs in modes:
+                    value, action, explored, elapsed = measure(game, heuristic, search_fn, depth, **kwargs)
+                    print(f"{path:<24} {name:<30} {depth:>5} {mode:<8} {value:>14.4f} {str(action):<16} {explored:>9} {elapsed:>9.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the search functions on dungeons (.txt) and trees (.json)")
+    parser.add_argument("levels", nargs="+", help="paths to the dungeons and/or trees")
+    parser.add_argument("--functions", "-f", nargs="+", default=["alphabeta"], help="the search functions to benchmark (from search.py, or qualified by their module such as stack_search.alphabeta)")
+    parser.add_argument("--depths", "-d", nargs="+", type=int, default=[2, 4, 6], help="the search depths")
+    parser.add_argument("--tt-size", "-tt", type=int, default=0,
+                        help="if positive, also run each search with a transposition table of this size")
+    parser.add_argument("--history", "-hist", action="store_true",
+                        help="also run the move ordering search functions with killer moves and history instead of heuristic ordering")
+    parser.add_argument("--workers", "-w", type=int, nargs="+", default=None,
+                        help="the numbers of worker processes to run the parallel search functions with")
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,81 @@
+from typing import Callable, List, Tuple
+from CSP import BinaryConstraint, Problem
+from CSP_solver import INFERENCES, STRATEGIES, solve
+from sudoku import SudokuProblem
+from helpers.utils import fetch_tracked_call_count
+import min_conflicts_solver
+import argparse, time
+
+# This script measures the explored nodes and the wall time of the CSP solver with each inference and strategy (see "CSP_solver.solve")
+# on sudoku puzzles and on N-Queens problems (which have general binary constraints instead of all-different constraints)
+# Example:
+#   python benchmark_csp.py sudoku/sudoku_9x9_1.txt sudoku/sudoku_9x9_3.txt -i fc ac3 mac
+#   python benchmark_csp.py sudoku/sudoku_9x9_3.txt -q 8 16 24 -i fc mac --propagate
+#   python benchmark_csp.py sudoku/sudoku_9x9_3.txt -q 24 -i fc -s backtrack cbj
+# The cbj strategy is skipped for the inferences that it does not support.
+# With "--local-search", the min-conflicts solver is also run on each problem (its nodes are the number of steps):
+#   python benchmark_csp.py -q 100 200 -i fc -l --restarts 5 --tabu 3 --seed 1
+
+# Create an N-Queens problem: the variable "c" is the column of the queen in the row c, and no two queens can attack each other
+def queens_problem(n: int) -> Problem:
+    problem = Problem()
+    problem.variables = [str(row) for row in range(n)]
+    problem.domains = {variable: set(range(n)) for variable in problem.variables}
+    not_attacking = lambda distance: (lambda a, b: a != b and abs(a - b) != distance)
+    problem.constraints = [BinaryConstraint((str(row), str(other)), not_attacking(other - row)) for row in range(n) for other in range(row + 1, n)]
+    return problem
+
+# Solve a problem and return the solution, the number of explored nodes (the number of calls to "is_complete") and the elapsed time
+def measure(problem: Problem, **kwargs):
+    fetch_tracked_call_count(Problem.is_complete) # Clear the call counter
+    start = time.perf_counter()
+    solution = solve(problem, **kwargs)
+    elapsed = time.perf_counter() - start
+    return solution, fetch_tracked_call_count(Problem.is_complete), elapsed
+
+# Solve a problem using the min-conflicts solver and return the solution, the number of steps and the elapsed time
+def measure_local_search(problem: Problem, max_steps: int, restarts: int, tabu: int, seed: int):
+    start = time.perf_counter()
+    if not min_conflicts_solver.one_consistency(problem): return None, 0, time.perf_counter() - start
+    search = min_conflicts_solver.MinConflicts(problem, seed)
+    solution = search.solve(max_steps, restarts, tabu)
+    return solution, search.steps, time.perf_counter() - start
+
+def main(args: argparse.Namespace):
+    # Each problem is created again for every run since 1-Consistency modifies it
+    problems: List[Tuple[str, Callable[[], Problem]]] = [(path, lambda path=path: SudokuProblem.from_file(path)) for path in args.puzzles]
+    problems.extend((f"{n}-queens", lambda n=n: queens_problem(n)) for n in args.queens)
+    propagations = [False, True] if args.propagate else [False]
+
+    print(f"{'problem':<36} {'inference':<9} {'propagate':<9} {'strategy':<9} {'solved':<6} {'valid':<5} {'nodes':>9} {'time (s)':>9}")
+    for name, create in problems:
+        for inference in args.inferences:
+            for propagate in propagations:
+                for strategy in args.strategies:
+                    if strategy == "cbj" and (inference == "mac" or propagate): continue
+                    solution, explored, elapsed = measure(create(), propagate = propagate, inference = inference, strategy = strategy)
+                    valid = solution is not None and create().satisfies_constraints(solution)
+                    print(f"{name:<36} {inference:<9} {propagate!s:<9} {strategy:<9} {solution is not None!s:<6} {valid!s:<5} {explored:>9} {elapsed:>9.3f}")
+        if args.local_search:
+            solution, steps, elapsed = measure_local_search(create(), args.max_steps, args.restarts, args.tabu, args.seed)
+            valid = solution is not None and create().satisfies_constraints(solution)
+            print(f"{name:<36} {'-':<9} {'-':<9} {'minconf':<9} {solution is not None!s:<6} {valid!s:<5} {steps:>9} {elapsed:>9.3f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the CSP solver on sudoku puzzles and N-Queens problems")
+    parser.add_argument("puzzles", nargs="*", help="paths to the sudoku puzzles")
+    parser.add_argument("--queens", "-q", nargs="+", type=int, default=[], help="the sizes of the N-Queens problems")
+    parser.add_argument("--inferences", "-i", nargs="+", choices=INFERENCES, default=INFERENCES, help="the inferences to compare")
+    parser.add_argument("--strategies", "-s", nargs="+", choices=STRATEGIES, default=["backtrack"], help="the search strategies to compare")
+    parser.add_argument("--propagate", "-p", action="store_true",
+                        help="also run each inference with the propagation of the all-different constraints")
+    parser.add_argument("--local-search", "-l", action="store_true", help="also run the min-conflicts local search on each problem")
+    parser.add_argument("--max-steps", "-m", type=int, default=100000, help="the steps of the local search before each restart")
+    parser.add_argument("--restarts", "-r", type=int, default=0, help="the number of restarts of the local search")
+    parser.add_argument("--tabu", "-t", type=int, default=0, help="the number of steps a variable cannot take back its old value")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the local search")
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
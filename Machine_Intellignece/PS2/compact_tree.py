@@ -0,0 +1,272 @@
+from array import array
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from tree import TreeGame, TreeStats, recursive_str
+from game import Game
+import json, math, os, re, struct, sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# This file contains a compact representation of the game trees for trees that are too large to be stored as TreeNode objects.
+# The nodes are stored in flat arrays in preorder (depth first order), so the subtree of node "i" is the range [i, end[i])
+# and the children of node "i" are found by jumping from its first child (i+1) to the end of each child's subtree.
+# The arrays are built by a streaming JSON reader (the JSON file is never loaded as nested dictionaries) and saved to
+# a binary cache file. If NumPy is installed, the cache is memory-mapped when the tree is loaded again, so only the visited parts
+# of the tree are read from disk. Otherwise, the arrays are read entirely into arrays of the "array" module.
+
+# The layout of the cache file: a header (magic, node count, size of the labels in bytes), then the arrays in the order below, then the labels (JSON)
+CACHE_MAGIC = b"CTREE001"
+CACHE_HEADER = struct.Struct("<8sqq")
+CACHE_ARRAYS: List[Tuple[str, str]] = [
+    ("end", "<i8"),         # one past the last node of the subtree
+    ("parent", "<i8"),      # the parent node (-1 for the root)
+    ("value", "<f8"),       # the value of terminal nodes (0 for nonterminal nodes)
+    ("leaves", "<i8"),      # the stats of the subtree (see TreeStats)
+    ("mean", "<f8"),
+    ("lowest", "<f8"),
+    ("highest", "<f8"),
+    ("depth", "<i4"),       # the number of edges from the root
+    ("label", "<i4"),       # the index of the node's key (the last part of its name) in the labels
+    ("terminal", "|u1"),    # 1 if the node is terminal
+    ("integer", "|u1"),     # 1 if the value was written as an integer in the JSON file (so it is printed the same way)
+]
+# The typecode of the "array" module for each type in the cache
+ARRAY_TYPECODES = {"i8": "q", "f8": "d", "i4": "i", "u1": "B"}
+
+# Matches one JSON token (after skipping the whitespace): a punctuation, a string or a number
+JSON_TOKEN = re.compile(r'\s*(?:([{}\[\]:,])|"((?:[^"\\]|\\.)*)"|(-?Infinity|NaN|-?(?:0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?))')
+
+# Reads the JSON tokens from a file one chunk at a time
+# Yields (kind, value) where kind is "punctuation", "string" or "number"
+def json_tokens(file: TextIO, chunk_size: int = 1 << 16) -> Iterator[Tuple[str, object]]:
+    buffer, position, eof = "", 0, False
+    while True:
+        match = JSON_TOKEN.match(buffer, position)
+        # A token that reaches the end of the buffer may continue in the next chunk
+        if not eof and (match is None or match.end() == len(buffer)):
+            chunk = file.read(chunk_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+        if match is None:
+            if buffer[position:].strip():
+                raise ValueError(f"Invalid JSON near: {buffer[position:position+32]!r}")
+            return
+        position = match.end()
+        punctuation, string, number, fraction, exponent = match.groups()
+        if punctuation is not None:
+            yield "punctuation", punctuation
+        elif string is not None:
+            yield "string", json.loads(f'"{string}"') if '\\' in string else string
+        elif fraction is None and exponent is None and number[-1].isdigit():
+            yield "number", int(number)
+        else:
+            yield "number", float(number)
+
+# Converts a tree JSON file to the arrays of a compact tree and writes them to a cache file
+# The stats are accumulated while the file is read: when a node is closed, all of its children are already complete
+# The children's means are summed in order starting from 0 (like "sum"), so the stats match the ones computed by "compute_stats" in tree.py exactly
+def convert_tree(json_path: str, cache_path: str) -> None:
+    columns = {name: array(ARRAY_TYPECODES[dtype[1:]]) for name, dtype in CACHE_ARRAYS}
+    labels: List[str] = []
+    label_ids: Dict[str, int] = {}
+    # The open (nonterminal) nodes from the root: [index, sum of the children's means, child count, leaves, lowest, highest]
+    stack: List[list] = []
+
+    def add_node(key: str, terminal: bool, value) -> int:
+        index = len(columns["end"])
+        label = label_ids.get(key)
+        if label is None:
+            label = label_ids[key] = len(labels)
+            labels.append(key)
+        columns["end"].append(index + 1)
+        columns["parent"].append(stack[-1][0] if stack else -1)
+        columns["value"].append(value if terminal else 0)
+        columns["depth"].append(len(stack))
+        columns["label"].append(label)
+        columns["terminal"].append(terminal)
+        columns["integer"].append(terminal and isinstance(value, int))
+        for name in ("leaves", "mean", "lowest", "highest"): columns[name].append(0)
+        return index
+
+    def set_stats(index: int, mean, leaves: int, lowest, highest) -> None:
+        columns["mean"][index], columns["leaves"][index] = mean, leaves
+        columns["lowest"][index], columns["highest"][index] = lowest, highest
+        if stack:
+            frame = stack[-1]
+            frame[1] = frame[1] + mean
+            frame[2] += 1
+            frame[3] += leaves
+            frame[4] = lowest if frame[2] == 1 else min(frame[4], lowest)
+            frame[5] = highest if frame[2] == 1 else max(frame[5], highest)
+
+    with open(json_path, 'r') as file:
+        tokens = json_tokens(file)
+        expected, key = "value", "root"
+        for kind, token in tokens:
+            if expected == "value":
+                if token == "{":
+                    stack.append([add_node(key, False, 0), 0, 0, 0, math.inf, -math.inf])
+                    expected = "key"
+                elif kind == "number":
+                    set_stats(add_node(key, True, token), token, 1, token, token)
+                    expected = "separator"
+                else:
+                    raise ValueError(f"Expected a number or an object, found {token!r}")
+            elif expected == "key" and kind == "string":
+                key = token
+                if next(tokens, (None, None))[1] != ":": raise ValueError(f"Expected ':' after the key {key!r}")
+                expected = "value"
+            elif (expected == "key" and token == "}") or (expected == "separator" and token in ",}"):
+                if token == ",":
+                    expected = "key"
+                    continue
+                index, total, count, leaves, lowest, highest = stack.pop()
+                columns["end"][index] = len(columns["end"])
+                set_stats(index, total/count if count else math.nan, leaves, lowest, highest)
+                expected = "separator"
+            else:
+                raise ValueError(f"Unexpected token {token!r}")
+            if expected == "separator" and not stack: break
+        if expected != "separator" or stack or next(tokens, None) is not None:
+            raise ValueError("The tree file is incomplete or has trailing data")
+
+    encoded_labels = json.dumps(labels).encode()
+    # The cache is written to a temporary file first, so an interrupted conversion never leaves a broken cache behind
+    temporary_path = f"{cache_path}.tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(CACHE_HEADER.pack(CACHE_MAGIC, len(columns["end"]), len(encoded_labels)))
+        for name, _ in CACHE_ARRAYS:
+            column = columns[name]
+            if sys.byteorder == "big": column.byteswap() # The cache is little-endian
+            file.write(column.tobytes())
+        file.write(encoded_labels)
+    os.replace(temporary_path, cache_path)
+
+# A game tree stored as flat arrays (memory-mapped from a cache file)
+class CompactTree:
+    size: int           # the number of nodes
+    labels: List[str]   # the keys of the nodes (each node stores the index of its key)
+
+    def __init__(self, cache_path: str) -> None:
+        with open(cache_path, "rb") as file:
+            magic, self.size, labels_size = CACHE_HEADER.unpack(file.read(CACHE_HEADER.size))
+            if magic != CACHE_MAGIC: raise ValueError(f"{cache_path} is not a compact tree cache")
+            offset = CACHE_HEADER.size
+            for name, dtype in CACHE_ARRAYS:
+                if np is None:
+                    column = array(ARRAY_TYPECODES[dtype[1:]])
+                    file.seek(offset)
+                    column.fromfile(file, self.size)
+                    if sys.byteorder == "big": column.byteswap()
+                else:
+                    # The memory map is viewed as a plain array since indexing a memmap object is slower
+                    column = np.memmap(file, dtype=dtype, mode="r", offset=offset, shape=(self.size,)).view(np.ndarray)
+                setattr(self, name, column)
+                offset += self.size * array(ARRAY_TYPECODES[dtype[1:]]).itemsize
+            file.seek(offset)
+            self.labels = json.loads(file.read(labels_size).decode())
+
+    def root(self) -> 'CompactTreeNode':
+        return CompactTreeNode(self, 0)
+
+    # Returns the indices of the children of a node
+    def children_of(self, index: int) -> List[int]:
+        children, child, end = [], index + 1, int(self.end[index])
+        while child < end:
+            children.append(child)
+            child = int(self.end[child])
+        return children
+
+    # Reads a tree from a JSON file using the cache file next to it (the cache is rebuilt if it is missing or older than the JSON file)
+    @staticmethod
+    def from_file(path: str, cache_path: Optional[str] = None) -> 'CompactTree':
+        cache_path = cache_path or f"{os.path.splitext(path)[0]}.ctree"
+        if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(path):
+            convert_tree(path, cache_path)
+        return CompactTree(cache_path)
+
+# A lightweight view of a node in a compact tree
+# It has the same attributes as a TreeNode (name, children, value and stats), so it can be used wherever a TreeNode is expected
+class CompactTreeNode:
+    __slots__ = ("tree", "index", "_children")
+
+    def __init__(self, tree: CompactTree, index: int) -> None:
+        self.tree = tree
+        self.index = index
+        self._children = None
+
+    @property
+    def name(self) -> str:
+        tree, index, keys = self.tree, self.index, []
+        while index >= 0:
+            keys.append(tree.labels[tree.label[index]])
+            index = int(tree.parent[index])
+        return '/'.join(reversed(keys))
+
+    @property
+    def children(self) -> Optional[Dict[str, 'CompactTreeNode']]:
+        tree = self.tree
+        if tree.terminal[self.index]: return None
+        if self._children is None:
+            self._children = {tree.labels[tree.label[child]]: CompactTreeNode(tree, child) for child in tree.children_of(self.index)}
+        return self._children
+
+    @property
+    def value(self) -> float:
+        tree, index = self.tree, self.index
+        value = float(tree.value[index])
+        return int(value) if tree.integer[index] else value
+
+    @property
+    def depth(self) -> int:
+        return int(self.tree.depth[self.index])
+
+    @property
+    def stats(self) -> TreeStats:
+        tree, index = self.tree, self.index
+        if tree.terminal[index]:
+            value = self.value
+            return TreeStats(value, 1, value, value)
+        return TreeStats(float(tree.mean[index]), int(tree.leaves[index]), float(tree.lowest[index]), float(tree.highest[index]))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompactTreeNode) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash(self.index)
+
+    def __repr__(self) -> str:
+        return f"CompactTreeNode(name={self.name!r}, index={self.index})"
+
+    # draw a tree as a string
+    def __str__(self) -> str:
+        return '\n'.join(recursive_str(self, True))
+
+# A tree game played on a compact tree
+# The game rules are inherited from TreeGame (so "is_terminal" is still recorded), but the turn is read from the depth array
+class CompactTreeGame(TreeGame):
+
+    tree: CompactTree
+
+    def __init__(self, tree: CompactTree) -> None:
+        Game.__init__(self) # The stats are already stored in the tree, so TreeGame's constructor is skipped
+        self.tree = tree
+        self.root = tree.root()
+
+    def get_initial_state(self) -> CompactTreeNode:
+        return self.root
+
+    def get_turn(self, state: CompactTreeNode) -> int:
+        return state.depth % 2
+
+    # Every node has a unique index in the tree
+    def get_hash(self, state: CompactTreeNode) -> int:
+        return state.index
+
+    # create a tree game from a path to a tree file (or to its cache file)
+    @staticmethod
+    def from_file(path: str, cache_path: Optional[str] = None) -> 'CompactTreeGame':
+        if path.endswith(".ctree"): return CompactTreeGame(CompactTree(path))
+        return CompactTreeGame(CompactTree.from_file(path, cache_path))
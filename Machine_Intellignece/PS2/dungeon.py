@@ -1,13 +1,14 @@
-from dataclasses import dataclass
-from copy import deepcopy
-from typing import Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass, replace
+from typing import FrozenSet, Iterable, List, Optional, Set, Tuple
 from enum import Enum
+from collections import OrderedDict, deque
 
 from mathutils import Direction, Point
 from game import Game
 from helpers.utils import track_call_count
 from helpers.mt19937 import RandomGenerator
 from agents import Agent
+from transposition import ZobristKeys
 
 # This file contains the definition for the Dungeon Crawler game
 # In this problem, the agent can move Up, Down, Left, Right or stay idle
@@ -35,10 +36,13 @@ class DungeonLayout:
     def __deepcopy__(self, memo):
         return self
 
+# All the classes that make up the state are immutable (frozen), so a successor state is created by replacing the parts
+# that changed while sharing all the other parts (e.g. the coin set or the unchanged monsters) with its parent state.
+
 # The state of a player contains its position, whether it is alive or not and its inventory
-@dataclass
+@dataclass(frozen=True)
 class Player:
-    @dataclass
+    @dataclass(frozen=True)
     class Inventory:
         daggers: int
         coins: int
@@ -49,32 +53,40 @@ class Player:
     inventory: Inventory
 
 # The state of a monster contains its position and whether it is alive or not
-@dataclass
+@dataclass(frozen=True)
 class Monster:
     position: Point
     alive: bool
 
+# return the turn that follows the given turn (it ignore all the dead monsters)
+def next_turn(turn: int, monsters: Tuple[Monster, ...]) -> int:
+    while turn < len(monsters):
+        if monsters[turn].alive:
+            return turn+1
+        turn += 1
+    return 0
+
 # This will contain a reference to the dungeon layout and it will contain environment details that change across states such as:
 #   The player location and the locations of the monsters, remaining coins, daggers, key, etc. 
-@dataclass
+@dataclass(frozen=True)
 class DungeonState:
     time: int
     turn: int
     layout: DungeonLayout
     player: Player
-    coins: Set[Point]
-    daggers: Set[Point]
-    keys: Set[Point]
-    monsters: List[Monster]
+    coins: FrozenSet[Point]
+    daggers: FrozenSet[Point]
+    keys: FrozenSet[Point]
+    monsters: Tuple[Monster, ...]
+    zobrist: int = 0 # The zobrist hash of the state (it is updated incrementally by DungeonGame.get_successor)
 
     # return the next turn (it ignore all the dead monsters)
     def next_turn(self) -> int:
-        turn = self.turn
-        while turn < len(self.monsters):
-            if self.monsters[turn].alive:
-                return turn+1
-            turn += 1
-        return 0
+        return next_turn(self.turn, self.monsters)
+    
+    # since the state is immutable, the deepcopy should not clone it
+    def __deepcopy__(self, memo):
+        return self
     
     # The score is 1 point for each coin, 10 points for each monster, -0.1 points for each passing second.
     def score(self) -> int:
@@ -107,6 +119,7 @@ class DungeonGame(Game[DungeonState, Direction]):
     # The problem will contain the dungeon layout and the inital state
     layout: DungeonLayout
     initial_state: DungeonState
+    zobrist_keys: ZobristKeys # The random keys used to compute the zobrist hashes of the states
 
     def get_initial_state(self) -> DungeonState:
         return self.initial_state
@@ -153,55 +166,94 @@ class DungeonGame(Game[DungeonState, Direction]):
             return [direction for direction, position in positions if position in state.layout.walkable and position not in monster_locations]
 
     def get_successor(self, state: DungeonState, action: Direction) -> DungeonState:
-        state = deepcopy(state)
+        zobrist_keys = self.zobrist_keys
+        position, alive, inventory = state.player.position, state.player.alive, state.player.inventory
+        coins, daggers, keys, monsters = state.coins, state.daggers, state.keys, state.monsters
+        # Remove the features that may change from the hash, they will be added back after the action is applied
+        zobrist = state.zobrist ^ zobrist_keys["turn", state.turn] ^ zobrist_keys["time", state.time] ^ zobrist_keys["daggers", inventory.daggers]
         current_turn = state.turn
         if current_turn == 0:
             # This action is done by the player
-            new_position = state.player.position + action.to_vector()
-            state.player.position = new_position
-            if new_position in state.coins:
+            new_position = position + action.to_vector()
+            zobrist ^= zobrist_keys["player", position] ^ zobrist_keys["player", new_position]
+            position = new_position
+            if new_position in coins:
                 # If we walk over a coin, we take it
-                state.coins.remove(new_position)
-                state.player.inventory.coins += 1
-            if new_position in state.daggers:
+                coins = coins - {new_position}
+                inventory = Player.Inventory(inventory.daggers, inventory.coins + 1, inventory.keys)
+                zobrist ^= zobrist_keys["coin", new_position]
+            if new_position in daggers:
                 # If we walk over a dagger, we take it
-                state.daggers.remove(new_position)
-                state.player.inventory.daggers += 1
-            if new_position in state.keys:
+                daggers = daggers - {new_position}
+                inventory = Player.Inventory(inventory.daggers + 1, inventory.coins, inventory.keys)
+                zobrist ^= zobrist_keys["dagger", new_position]
+            if new_position in keys:
                 # If we walk over a dagger, we take it
-                state.keys.remove(new_position)
-                state.player.inventory.keys += 1
+                keys = keys - {new_position}
+                inventory = Player.Inventory(inventory.daggers, inventory.coins, inventory.keys + 1)
+                zobrist ^= zobrist_keys["key", new_position]
             # Find the monsters at the player position
-            monsters_at_player = [monster for monster in state.monsters if monster.position == new_position and monster.alive]
+            monsters_at_player = [index for index, monster in enumerate(monsters) if monster.position == new_position and monster.alive]
             if monsters_at_player:
-                if state.player.inventory.daggers < len(monsters_at_player):
+                if inventory.daggers < len(monsters_at_player):
                     # If we encounter a monster and we don't have a dagger, we die
-                    state.player.inventory.daggers = 0
-                    state.player.alive = False
+                    inventory = Player.Inventory(0, inventory.coins, inventory.keys)
+                    alive = False
+                    zobrist ^= zobrist_keys["dead"]
                 else:
                     # If we encounter a monster and we have a dagger, we kill it
-                    state.player.inventory.daggers -= len(monsters_at_player)
-                    for monster in monsters_at_player:
-                        monster.alive = False
+                    inventory = Player.Inventory(inventory.daggers - len(monsters_at_player), inventory.coins, inventory.keys)
+                    monsters = list(monsters)
+                    for index in monsters_at_player:
+                        monsters[index] = Monster(new_position, False)
+                        zobrist ^= zobrist_keys["monster", index, new_position]
+                    monsters = tuple(monsters)
         else:
             # This action is done by a monster
-            monster = state.monsters[current_turn - 1]
+            index = current_turn - 1
+            monster = monsters[index]
             new_position = monster.position + action.to_vector()
-            monster.position = new_position
-            if new_position == state.player.position:
-                if state.player.inventory.daggers != 0:
+            zobrist ^= zobrist_keys["monster", index, monster.position]
+            monster_alive = monster.alive
+            if new_position == position:
+                if inventory.daggers != 0:
                     # If we encounter a player and they have a dagger, we die
-                    monster.alive = False
-                    state.player.inventory.daggers -= 1
+                    monster_alive = False
+                    inventory = Player.Inventory(inventory.daggers - 1, inventory.coins, inventory.keys)
                 else:
                     # If we encounter a player and they don't have a dagger, we eat them
-                    state.player.alive = False
+                    alive = False
+                    zobrist ^= zobrist_keys["dead"]
+            if monster_alive:
+                zobrist ^= zobrist_keys["monster", index, new_position]
+            monsters = monsters[:index] + (Monster(new_position, monster_alive),) + monsters[index+1:]
+        # Only create a new player if something about the player changed
+        player = state.player
+        if position != player.position or alive != player.alive or inventory is not player.inventory:
+            player = Player(position, alive, inventory)
         # Advance the turn
-        state.turn = state.next_turn()
-        if state.turn == 0:
-            # if the new turn is 0 (the player's turn), we advance the clock 
-            state.time += 1
-        return state
+        turn = next_turn(current_turn, monsters)
+        # if the new turn is 0 (the player's turn), we advance the clock 
+        time = state.time + 1 if turn == 0 else state.time
+        zobrist ^= zobrist_keys["turn", turn] ^ zobrist_keys["time", time] ^ zobrist_keys["daggers", inventory.daggers]
+        return DungeonState(time, turn, state.layout, player, coins, daggers, keys, monsters, zobrist)
+
+    # The zobrist hash is maintained by get_successor, so it is returned directly
+    def get_hash(self, state: DungeonState) -> int:
+        return state.zobrist
+
+    # Computes the zobrist hash of a state from scratch by combining the keys of all its features
+    # Dead monsters are not included since they do not affect the game anymore
+    def compute_hash(self, state: DungeonState) -> int:
+        keys = self.zobrist_keys
+        zobrist = keys["turn", state.turn] ^ keys["time", state.time] ^ keys["daggers", state.player.inventory.daggers]
+        zobrist ^= keys["player", state.player.position]
+        if not state.player.alive: zobrist ^= keys["dead"]
+        for index, monster in enumerate(state.monsters):
+            if monster.alive: zobrist ^= keys["monster", index, monster.position]
+        for name, items in (("coin", state.coins), ("dagger", state.daggers), ("key", state.keys)):
+            for position in items: zobrist ^= keys[name, position]
+        return zobrist
 
     # Read a dungeon problem from text containing a grid of tiles
     @staticmethod
@@ -230,8 +282,10 @@ class DungeonGame(Game[DungeonState, Direction]):
                         exit = Point(x, y)
         problem = DungeonGame()
         problem.layout = DungeonLayout(width, height, walkable, exit)
+        problem.zobrist_keys = ZobristKeys()
         player = Player(player, True, Player.Inventory(0, 0, 0))
-        problem.initial_state = DungeonState(0, 0, problem.layout, player, coins, daggers, keys, monsters)
+        initial_state = DungeonState(0, 0, problem.layout, player, frozenset(coins), frozenset(daggers), frozenset(keys), tuple(monsters))
+        problem.initial_state = replace(initial_state, zobrist=problem.compute_hash(initial_state))
         return problem
 
     # Read a dungeon problem from file containing a grid of tiles
@@ -280,47 +334,149 @@ class MonsterAgent(Agent):
 def path_length(path) -> int:
     return 0xffffffff if path is None else len(path)-1
 
-# Return the path between two points in the dungeom
+# A grid of integers stored as a list of rows (indexed by [y][x])
+Grid = List[List[int]]
+
+# Splits a list of values numbered by cell index into the rows of a grid
+def to_grid(layout: DungeonLayout, values: List[int]) -> Grid:
+    width = layout.width
+    return [values[y * width:(y + 1) * width] for y in range(layout.height)]
+
+# Return the distance stored in a distance field or a very large number if the point is unreachable
+def field_distance(distances: Grid, point: Point) -> int:
+    distance = distances[point.y][point.x]
+    return 0xffffffff if distance < 0 else distance
+
+# The cells of a grid are numbered row by row (index = y * width + x) so that the breadth first searches
+# can work on flat lists of integers instead of points
+def cell_index(layout: DungeonLayout, point: Point) -> int:
+    return point.y * layout.width + point.x
+
+def cell_point(layout: DungeonLayout, index: int) -> Point:
+    return Point(index % layout.width, index // layout.width)
+
+# Return, for every cell, the list of walkable cells that can be reached from it in one move (in the order of the directions)
+# The result is cached inside the game object since it only depends on the layout
+def walkable_neighbors(game: DungeonGame) -> List[List[int]]:
+    cache = game.cache()
+    if "neighbors" not in cache:
+        layout = game.layout
+        neighbors = [[] for _ in range(layout.width * layout.height)]
+        for point in layout.walkable:
+            for direction in Direction:
+                child = point + direction.to_vector()
+                if child != point and child in layout.walkable:
+                    neighbors[cell_index(layout, point)].append(cell_index(layout, child))
+        cache["neighbors"] = neighbors
+    return cache["neighbors"]
+
+# Computes the distance from a point to every cell in the dungeon using a breadth first search
+# Returns 2 grids (indexed by [y][x]):
+# - the distance of each cell from the source (-1 if the cell is unreachable)
+# - the index of the cell that precedes each cell on its shortest path from the source (-1 for the source and the unreachable cells)
 # The result is cached inside the game object
-def compute_path(game: DungeonGame, p1: Point, p2: Point) -> List[Point]:
+def distance_field(game: DungeonGame, source: Point) -> Tuple[Grid, Grid]:
     cache = game.cache()
-    if p1 not in cache:
-        from collections import deque
-        path_map = {p1: [p1]}
-        queue = deque([p1])
+    key = ("distance", source)
+    if key not in cache:
+        layout = game.layout
+        neighbors = walkable_neighbors(game)
+        distances = [-1] * (layout.width * layout.height)
+        parents = [-1] * (layout.width * layout.height)
+        start = cell_index(layout, source)
+        distances[start] = 0
+        queue = deque([start])
         while queue:
             parent = queue.popleft()
-            path = path_map[parent]
-            for direction in Direction:
-                child = parent + direction.to_vector()
-                if child in path_map or child not in game.layout.walkable:
+            for child in neighbors[parent]:
+                if distances[child] != -1:
                     continue
-                path_map[child] = path + [child]
+                distances[child] = distances[parent] + 1
+                parents[child] = parent
                 queue.append(child)
-        cache[p1] = path_map
-    return cache[p1].get(p2, None)
-
-# Finds the shortest path from a point to a path in the dungeon
-def path_to_path(game: DungeonGame, p1: Point, path: List[Point]):
-    if path is None: return None
-    paths = [compute_path(game, p1, p2) for p2 in path]
-    _, _, shortest = min((path_length(path), index, path) for index, path in enumerate(paths))
-    return shortest
+        cache[key] = (to_grid(layout, distances), to_grid(layout, parents))
+    return cache[key]
+
+# Return the path between two points in the dungeom (or None if there is no path)
+# The path is rebuilt from the parents in the distance field of the first point
+def compute_path(game: DungeonGame, p1: Point, p2: Point) -> Optional[List[Point]]:
+    distances, parents = distance_field(game, p1)
+    if distances[p2.y][p2.x] < 0:
+        return None
+    path = [p2]
+    index = parents[p2.y][p2.x]
+    while index >= 0:
+        point = cell_point(game.layout, index)
+        path.append(point)
+        index = parents[point.y][point.x]
+    path.reverse()
+    return path
+
+# Computes the shortest path between two points and, for every cell in the dungeon, the nearest cell on that path
+# using a breadth first search that starts from all the path cells at once
+# Returns None if there is no path, otherwise it returns:
+# - the path
+# - a grid (indexed by [y][x]) of the distance from each cell to the path (-1 if the path is unreachable from the cell)
+# - a grid (indexed by [y][x]) of the position on the path of the nearest path cell (if many are equally near, the earliest one on the path)
+# The result is cached inside the game object. There is one field for each pair of points, so only the PATH_FIELD_CACHE_SIZE
+# most recently used fields are kept (the distance fields are cached per source point, so they are bounded by the number of cells).
+PATH_FIELD_CACHE_SIZE = 1024
+
+def path_field(game: DungeonGame, p1: Point, p2: Point) -> Optional[Tuple[List[Point], Grid, Grid]]:
+    cache = game.cache().setdefault("paths", OrderedDict())
+    key = (p1, p2)
+    if key in cache:
+        cache.move_to_end(key)
+    else:
+        if len(cache) >= PATH_FIELD_CACHE_SIZE: cache.popitem(last=False)
+        path = compute_path(game, p1, p2)
+        if path is None:
+            cache[key] = None
+            return None
+        layout = game.layout
+        neighbors = walkable_neighbors(game)
+        distances = [-1] * (layout.width * layout.height)
+        nearest = [-1] * (layout.width * layout.height)
+        queue = deque()
+        for position, point in enumerate(path):
+            index = cell_index(layout, point)
+            distances[index] = 0
+            nearest[index] = position
+            queue.append(index)
+        # The queue is processed one distance at a time, so all the cells that can discover a child are processed
+        # before the child itself, which lets the child keep the earliest path position among all of them
+        while queue:
+            parent = queue.popleft()
+            distance = distances[parent] + 1
+            for child in neighbors[parent]:
+                if distances[child] == -1:
+                    distances[child] = distance
+                    nearest[child] = nearest[parent]
+                    queue.append(child)
+                elif distances[child] == distance and nearest[parent] < nearest[child]:
+                    nearest[child] = nearest[parent]
+        cache[key] = (path, to_grid(layout, distances), to_grid(layout, nearest))
+    return cache[key]
 
 # Checks if monsters can reach the player while traversing the shortest path to a goal point
 # Returns the number of monster that endanger the player and the length of the player's path
+# If the goal is unreachable, no monster can endanger the player on the way and the length is a very large number
 def path_safety(game: DungeonGame, state: DungeonState, goal: Point):
-    path = compute_path(game, state.player.position, goal)
-    length = path_length(path)
-    # For each alive monster, find the shortest path from the the monster to the player's path
-    monster_paths = [path_to_path(game, monster.position, path) for monster in state.monsters if monster.alive]
-    # Find how long the monster will take to reach the player's path
-    monster_path_lengths = [path_length(monster_path) for monster_path in monster_paths]
-    # Find how it will take the player to get past the monster encounter position
-    monster_encounter_distance = [path.index(monster_path[-1]) for monster_path in monster_paths]
-    # Count dangerous monsters (the ones that can reach the player path before the player can outpace them)
-    danger = sum(encounter >= distance for encounter, distance in zip(monster_encounter_distance, monster_path_lengths))
-    return danger, length
+    field = path_field(game, state.player.position, goal)
+    if field is None:
+        return 0, path_length(None)
+    path, distances, nearest = field
+    danger = 0
+    for monster in state.monsters:
+        if not monster.alive: continue
+        # Find how long the monster will take to reach the player's path
+        distance = distances[monster.position.y][monster.position.x]
+        # Find how it will take the player to get past the monster encounter position
+        encounter = nearest[monster.position.y][monster.position.x]
+        # Count dangerous monsters (the ones that can reach the player path before the player can outpace them)
+        if distance >= 0 and encounter >= distance:
+            danger += 1
+    return danger, path_length(path)
 
 # Returns a heuristic value for the dungeon game state
 # Argument:
@@ -352,7 +508,8 @@ def dungeon_heuristic(game: DungeonGame, state: DungeonState, agent: int) -> flo
 
     # find the distance to the nearest monster
     if alive_monsters:
-        nearest_monster = min(path_length(compute_path(game, state.player.position, monster.position)) for monster in alive_monsters)
+        distances, _ = distance_field(game, state.player.position)
+        nearest_monster = min(field_distance(distances, monster.position) for monster in alive_monsters)
     else:
         nearest_monster = area
     
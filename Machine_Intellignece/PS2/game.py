@@ -48,6 +48,16 @@ class Game(ABC, Generic[S, A], CacheContainer):
     def get_successor(self, state: S, action: A) -> S:
         pass
 
+    # This function returns a hash of the given state which is used to detect transpositions
+    # (the same state reached through different sequences of actions).
+    # Two states with the same hash are assumed to be the same state.
+    def get_hash(self, state: S) -> int:
+        return hash(state)
+
 # A heuristic function which estimates the value of a given state for a certain agent within a certain game.
 # E.g. if the heuristic function returns a high value for a certain agent, it should return low values for their enemies.
-HeuristicFunction = Callable[[Game[S, A], S, int], float]
\ No newline at end of file
+HeuristicFunction = Callable[[Game[S, A], S, int], float]
+# A heuristic function that returns 0 for every state (equivalent to having no heuristic)
+# Unlike a lambda, it is defined at the module level, so it can be sent to other processes (e.g. by the parallel search)
+def zero_heuristic(game: Game[S, A], state: S, agent: int) -> float:
+    return 0
@@ -2,4 +2,6 @@ from helpers import test_tools
 from tree import TreeGame
 from dungeon import DungeonGame
 from sudoku import SudokuProblem
-from mathutils import *
\ No newline at end of file
+from mathutils import *
+from transposition import TranspositionTable
+from ordering import MoveOrderer
\ No newline at end of file
@@ -1,3 +1,4 @@
+import itertools, os, shutil, tempfile
 from typing import Any, Dict, List, Optional, Tuple
 from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_function
 
@@ -5,7 +6,7 @@ from .utils import Result, fetch_recorded_calls, fetch_tracked_call_count, load_
 ##                  PART 2: CSP                     ##
 ########################################################
 
-from CSP import UnaryConstraint, Assignment
+from CSP import UnaryConstraint, Assignment, bitset_values, to_bitset
 from sudoku import SudokuProblem
 
 # A Utility function to verify the type of domains in a Sudoku Problem
@@ -153,6 +154,62 @@ def compare_forward_checking_results(
     
     return Result(True, 1, "")
 
+###################################################
+## Forward Checking with a Trail Runner and Comparator
+
+# Runs forward checking like "run_forward_checking", but like the backtracking search does: the domains are modified in place
+# (as sets or as bitsets) and the removed values are recorded in a trail. After the last assignment, the assignments are undone using the trail.
+# Returns the results of each assignment, the domains before the assignments and the domains after undoing the trail (as sets)
+def run_forward_checking_with_trail(
+    function_path: str,
+    problem: SudokuProblem,
+    assignments: List[Tuple[str, Any]],
+    bitsets: bool) -> Tuple[List[Tuple[str, Any, bool, Dict[str, set]]], Dict[str, set], Dict[str, set]]:
+
+    load_function("CSP_solver.one_consistency")(problem) # Run 1-Consistency first to eliminate unary constraints.
+
+    forward_checking = load_function(function_path)
+    undo = load_function("CSP_solver.undo")
+    to_sets = lambda ds: {variable: set(bitset_values(domain)) if bitsets else set(domain) for variable, domain in ds.items()}
+
+    domains = {variable: to_bitset(domain) if bitsets else domain.copy() for variable, domain in problem.domains.items()}
+    initial_domains = to_sets(domains)
+    trail, assigned_domains, results = [], [], []
+
+    for assigned_variable, assigned_value in assignments:
+        assigned_domains.append((assigned_variable, domains.pop(assigned_variable), len(trail)))
+        ok = forward_checking(problem, assigned_variable, assigned_value, domains, trail)
+        results.append((assigned_variable, assigned_value, ok, to_sets(domains)))
+
+    # The assignments are undone in the reverse order (like returning from each level of the search)
+    for variable, domain, mark in reversed(assigned_domains):
+        undo(domains, trail, mark)
+        domains[variable] = domain
+
+    return results, initial_domains, to_sets(domains)
+
+# The results are compared like "compare_forward_checking_results", then the domains must be the same after undoing the trail
+def compare_forward_checking_with_trail(
+    output: Tuple[List[Tuple[str, Any, bool, Dict[str, set]]], Dict[str, set], Dict[str, set]],
+    problem: SudokuProblem,
+    *expected: Tuple[bool, Dict[str, set]]) -> Result:
+
+    results, initial_domains, restored_domains = output
+    result = compare_forward_checking_results(results, problem, *expected)
+    if not result.success: return result
+
+    if restored_domains != initial_domains:
+        nl = '\n'
+        message = "The domains are not restored after undoing the trail\n"
+        for variable in {*initial_domains.keys(), *restored_domains.keys()}:
+            initial_domain = initial_domains.get(variable, "No Domain")
+            restored_domain = restored_domains.get(variable, "No Domain")
+            if initial_domain != restored_domain:
+                message += f" - For the variable {variable}, Expected: {initial_domain}, Got: {restored_domain}{nl}"
+        return Result(False, 0, message)
+
+    return Result(True, 1, "")
+
 #################################################
 ## Least Restraining Values Runner and Comparator
 
@@ -226,12 +283,13 @@ def compare_minimum_remaining_values(
 
 def run_csp_solve(
     function_path: str,
-    problem: SudokuProblem) -> Tuple[int, Optional[Assignment]]:
+    problem: SudokuProblem,
+    **options: Any) -> Tuple[int, Optional[Assignment]]:
     
     fetch_tracked_call_count(SudokuProblem.is_complete) # Clear the recorded calls
 
     solve = load_function(function_path)
-    solution = solve(problem)
+    solution = solve(problem, **options)
 
     # get the count of nodes that have been explored by the search function
     explored = fetch_tracked_call_count(SudokuProblem.is_complete)
@@ -259,13 +317,186 @@ def compare_csp_solve(
     message = f"Puzzle:{nl}{problem.format_assignment({})}{nl}Expected:{nl}{repr(expected)}{nl}Got:{nl}- Result: {format_solution(solution)}{nl}- Explored {explored} nodes"
     return Result(False, 0, message)
 
+#####################################################
+## Backtracking CSP Solve with Inference Comparator
+
+# The stronger inferences (e.g. AC-3 or MAC) remove more values, so the search must find one of the expected solutions
+# while exploring at most as many nodes as expected with forward checking only
+def compare_csp_solve_with_inference(
+    output: Tuple[int, Optional[Assignment]],
+    problem: SudokuProblem,
+    possible_outputs: List[Tuple[int, Optional[Assignment]]]) -> Result:
+
+    explored, solution = output
+    failure_message = check_sudoku_solution_type(solution)
+    if failure_message is not None:
+        return Result(False, 0, "Incorrect Function Output Type: " + failure_message)
+    for expected_explored, expected_solution in possible_outputs:
+        if explored <= expected_explored and solution == expected_solution:
+            return Result(True, 1, f"Explored {explored} nodes (at most {expected_explored})")
+
+    # Since it is not a success, create and return a failure result with a failure message
+    nl = '\n'
+    format_solution = lambda s: ("No Solution" if s is None else "\n" + problem.format_assignment(s))
+    expected = '\nor\n'.join(f'- Result: {format_solution(expected_solution)}{nl}- Explored at most {expected_explored} nodes' for expected_explored, expected_solution in possible_outputs)
+    message = f"Puzzle:{nl}{problem.format_assignment({})}{nl}Expected:{nl}{expected}{nl}Got:{nl}- Result: {format_solution(solution)}{nl}- Explored {explored} nodes"
+    return Result(False, 0, message)
+
+#########################################################
+## Backtracking Search with Set or Bitset Domains Runner
+
+# Runs the backtracking search (solve_rec) like "CSP_solver.solve", but with the domains stored as sets or as bitsets (see "CSP.to_bitset")
+# Both representations must explore the same nodes and find the same solution (so it is compared using "compare_csp_solve")
+def run_csp_solve_with_domains(
+    function_path: str,
+    problem: SudokuProblem,
+    bitsets: bool) -> Tuple[int, Optional[Assignment]]:
+
+    one_consistency = load_function("CSP_solver.one_consistency")
+    solve_rec = load_function(function_path)
+
+    fetch_tracked_call_count(SudokuProblem.is_complete) # Clear the recorded calls
+
+    solution = None
+    if one_consistency(problem):
+        domains = {var: to_bitset(domain) if bitsets else domain.copy() for var, domain in problem.domains.items()}
+        solution = solve_rec(problem, {}, domains, bitsets)
+
+    # get the count of nodes that have been explored by the search function
+    explored = fetch_tracked_call_count(SudokuProblem.is_complete)
+
+    return explored, solution
+
+##################################################
+## All-Different Propagation Runner and Comparator
+
+def run_all_different_propagation(
+    class_path: str,
+    domains: Dict[str, set]) -> Tuple[bool, Dict[str, set]]:
+
+    constraint_class = load_function(class_path)
+    domains = {variable: domain.copy() for variable, domain in domains.items()}
+    ok = constraint_class(domains.keys()).propagate(domains)
+
+    return ok, domains
+
+def compare_all_different_propagation(
+    output: Tuple[bool, Dict[str, set]],
+    domains: Dict[str, set]) -> Result:
+
+    ok, pruned = output
+    nl = '\n'
+    format_domains = lambda ds: nl.join(f' - {var}: {d}' for var, d in ds.items())
+
+    # The expected domains are found by brute force: a value is kept if it is part of an assignment where all the values are different
+    variables = list(domains.keys())
+    expected_domains = {variable: set() for variable in variables}
+    for values in itertools.product(*(domains[variable] for variable in variables)):
+        if len(set(values)) == len(values):
+            for variable, value in zip(variables, values): expected_domains[variable].add(value)
+    expected_ok = all(expected_domains.values())
+
+    failure_message = None
+    if not isinstance(ok, bool):
+        failure_message = f"Incorrect Function Output Type - Expected: bool, Got: {type(ok).__name__} (value: {repr(ok)})"
+    elif ok != expected_ok:
+        failure_message = f"Expected Function Output: {repr(expected_ok)}, Got: {repr(ok)}"
+    elif ok and pruned != expected_domains:
+        failure_message = "Domain Mismatch\n"
+        for variable in variables:
+            expected_domain = expected_domains[variable]
+            domain = pruned.get(variable, "No Domain")
+            if expected_domain != domain:
+                failure_message += f" - For the variable {variable}, Expected: {expected_domain}, Got: {domain}{nl}"
+
+    if failure_message is not None:
+        message = "Given the domains:\n" + format_domains(domains) + "\n"
+        message += failure_message
+        return Result(False, 0, message)
+
+    return Result(True, 1, "")
+
+#####################################
+## Sudoku Solve Runner and Comparator
+
+# A Utility function to verify that a sudoku solution is valid (or None if the puzzle has no solution)
+def check_sudoku_solution(problem: SudokuProblem, solution: Optional[Assignment], solvable: bool) -> Optional[str]:
+    failure_message = check_sudoku_solution_type(solution)
+    if failure_message is not None:
+        return "Incorrect Function Output Type: " + failure_message
+    if not solvable and solution is not None:
+        return "Expected: No Solution, Got:\n" + problem.format_assignment(solution)
+    if solvable and solution is None:
+        return "Expected a solution, Got: No Solution"
+    if solvable and not (problem.is_complete(solution) and problem.satisfies_constraints(solution)):
+        return "The solution does not satisfy the constraints:\n" + problem.format_assignment(solution)
+    return None
+
+def run_sudoku_solve(
+    function_path: str,
+    problem: SudokuProblem,
+    **options: Any) -> Optional[Assignment]:
+
+    solve = load_function(function_path)
+    return solve(problem, **options)
+
+def compare_sudoku_solve(
+    output: Optional[Assignment],
+    problem: SudokuProblem,
+    solvable: bool) -> Result:
+
+    failure_message = check_sudoku_solution(problem, output, solvable)
+    if failure_message is not None:
+        message = "For the puzzle:\n" + problem.format_assignment({}) + "\n"
+        message += failure_message
+        return Result(False, 0, message)
+
+    return Result(True, 1, "")
+
+########################################
+## Min-Conflicts Runner and Comparator
+
+def run_min_conflicts_twice(
+    function_path: str,
+    puzzle_path: str,
+    **options: Any) -> Tuple[Optional[Assignment], Optional[Assignment]]:
+
+    solve = load_function(function_path)
+    # The puzzle is loaded again for the second search since the solver changes the problem (1-Consistency)
+    first = solve(SudokuProblem.from_file(puzzle_path), **options)
+    second = solve(SudokuProblem.from_file(puzzle_path), **options)
+
+    return first, second
+
+# The seeds in the testcases are chosen so that the search finds a solution, so a solver that always gives up fails
+def compare_min_conflicts(
+    output: Tuple[Optional[Assignment], Optional[Assignment]],
+    problem: SudokuProblem) -> Result:
+
+    first, second = output
+    nl = '\n'
+    format_solution = lambda s: ("No Solution" if s is None else "\n" + problem.format_assignment(s))
+
+    failure_message = check_sudoku_solution(problem, first, True)
+    if failure_message is None and first != second:
+        failure_message = f"The same seed gave different results:{nl}- First: {format_solution(first)}{nl}- Second: {format_solution(second)}"
+
+    if failure_message is not None:
+        message = "For the puzzle:\n" + problem.format_assignment({}) + "\n"
+        message += failure_message
+        return Result(False, 0, message)
+
+    return Result(True, 1, "")
+
 ########################################################
 ##                  PART 2: Games                     ##
 ########################################################
 
 from tree import TreeGame, TreeNode, tree_heuristic
+from compact_tree import CompactTreeGame
 from dungeon import DungeonGame, Direction, dungeon_heuristic
 from .pruned_tree import pruned_tree_string
+from .mt19937 import RandomGenerator
 
 # Checks if two floating point numbers are almost equal
 def approx_eq(output, expected):
@@ -350,4 +581,136 @@ def compare_search_results_for_dungeon(
     expected = '\nor\n'.join(f'- Value: {value} / Action: {str(action)}{nl}- Explored {explored} nodes' for value, action, explored in possible_outputs)
     level = open(level_path, 'r').read()
     message = f"Level:{nl}{level}{nl}Expected:{nl}{expected}{nl}Got:{nl}- Value: {output[0]} / Action: {str(output[1])}{nl}- Explored {output[2]} nodes"
-    return Result(False, 0, message)
\ No newline at end of file
+    return Result(False, 0, message)
+
+############################################################
+## Search Equivalence Runners and Comparator
+
+SearchResult = Tuple[float, Any, Any]
+
+# Runs a search and a reference search on a tree game and records the explored nodes of each
+# The options are only given to the search (e.g. a transposition table)
+def run_search_pair_for_tree(
+    function_path: str,
+    reference_path: str,
+    game: TreeGame,
+    max_search_depth: int,
+    **options: Any) -> Tuple[SearchResult, SearchResult]:
+
+    results = []
+    for path, kwargs in ((function_path, options), (reference_path, {})):
+        fetch_recorded_calls(TreeGame.is_terminal) # Clear the recorded calls
+        search_fn = load_function(path)
+        value, action = search_fn(game, game.get_initial_state(), tree_heuristic, max_search_depth, **kwargs)
+        explored = [call["args"][1].name for call in fetch_recorded_calls(TreeGame.is_terminal)]
+        results.append((value, action, explored))
+
+    return tuple(results)
+
+# Runs a search and a reference search on a dungeon game and counts the explored nodes of each
+# The options are only given to the search (e.g. a transposition table)
+def run_search_pair_for_dungeon(
+    function_path: str,
+    reference_path: str,
+    game: DungeonGame,
+    max_search_depth: int,
+    **options: Any) -> Tuple[SearchResult, SearchResult]:
+
+    results = []
+    for path, kwargs in ((function_path, options), (reference_path, {})):
+        fetch_tracked_call_count(DungeonGame.is_terminal) # Clear the recorded calls
+        search_fn = load_function(path)
+        value, action = search_fn(game, game.get_initial_state(), dungeon_heuristic, max_search_depth, **kwargs)
+        explored = fetch_tracked_call_count(DungeonGame.is_terminal)
+        results.append((value, action, explored))
+
+    return tuple(results)
+
+# Compare the result of a search with the result of the reference search
+# The explored nodes are only compared if "same_nodes" is True, since most of the searches are expected to explore fewer nodes
+def compare_search_pair(
+    output: Tuple[SearchResult, SearchResult],
+    same_nodes: bool) -> Result:
+
+    (value, action, explored), (expected_value, expected_action, expected_explored) = output
+    if (value == expected_value or approx_eq(value, expected_value)) and action == expected_action \
+        and (not same_nodes or explored == expected_explored):
+        return Result(True, 1, "")
+
+    # Since it is not a success, create and return a failure result with a failure message
+    nl = '\n'
+    explored_to_str = lambda e: f"{len(e)} Nodes: {repr(e)}" if isinstance(e, list) else f"{e} nodes"
+    out_to_str = lambda v, a, e: f"- Value: {v} / Action: {str(a)}{nl}- Explored {explored_to_str(e)}"
+    message = f"Expected (the reference search):{nl}{out_to_str(expected_value, expected_action, expected_explored)}{nl}Got:{nl}{out_to_str(value, action, explored)}"
+    return Result(False, 0, message)
+
+# Runs a search on the compact version of a tree (see "compact_tree.py") and on the tree game read from the same file,
+# and records the explored nodes of each
+# The cache of the compact tree is written to a temporary directory, so the testcase does not leave a cache next to the tree
+def run_search_on_compact_tree(
+    function_path: str,
+    tree_path: str,
+    max_search_depth: int) -> Tuple[SearchResult, SearchResult]:
+
+    cache_directory = tempfile.mkdtemp()
+    try:
+        games = [CompactTreeGame.from_file(tree_path, os.path.join(cache_directory, "tree.ctree")), TreeGame.from_file(tree_path)]
+        results = []
+        for game in games:
+            fetch_recorded_calls(TreeGame.is_terminal) # Clear the recorded calls
+            search_fn = load_function(function_path)
+            value, action = search_fn(game, game.get_initial_state(), tree_heuristic, max_search_depth)
+            explored = [call["args"][1].name for call in fetch_recorded_calls(TreeGame.is_terminal)]
+            results.append((value, action, explored))
+    finally:
+        # The cache may still be memory-mapped, so it is removed on a best-effort basis
+        shutil.rmtree(cache_directory, ignore_errors=True)
+
+    return tuple(results)
+
+##############################################
+## Random Generator Runner and Comparator
+
+# Generates the first "count" numbers of a seeded generator twice: one by one (with "generate") and in batches (with "generate_many")
+# If "reseed" is given, the generator is seeded again with it in the middle of the sequence (before the number at count // 2)
+def run_random_generator(
+    seed: int,
+    count: int,
+    batch_size: int,
+    reseed: Optional[int] = None) -> Tuple[List[int], List[int]]:
+
+    half = count // 2 if reseed is not None else count
+    rng = RandomGenerator(seed)
+    one_by_one = [rng.generate() for _ in range(half)]
+    if reseed is not None: rng.seed(reseed)
+    one_by_one += [rng.generate() for _ in range(count - half)]
+
+    rng = RandomGenerator(seed)
+    batched = []
+    for end in (half, count):
+        while len(batched) < end: batched += rng.generate_many(min(batch_size, end - len(batched)))
+        if reseed is not None and end == half: rng.seed(reseed)
+
+    return one_by_one, batched
+
+# Compare the generated numbers with the numbers of the original generator (which twisted and tempered one number at a time)
+# The expected numbers are given by their positions in the sequence, they include the numbers around each twist (every 624 numbers)
+def compare_random_generator(
+    output: Tuple[List[int], List[int]],
+    expected: Dict[int, int]) -> Result:
+
+    one_by_one, batched = output
+    failure_message = None
+    if len(one_by_one) != len(batched) or any(a != b for a, b in zip(one_by_one, batched)):
+        index = next((i for i, (a, b) in enumerate(zip(one_by_one, batched)) if a != b), min(len(one_by_one), len(batched)))
+        failure_message = f"generate and generate_many differ at the number {index}"
+    else:
+        for index, expected_number in expected.items():
+            number = one_by_one[index] if index < len(one_by_one) else None
+            if number != expected_number:
+                failure_message = f"The number {index} is different - Expected: {expected_number}, Got: {number}"
+                break
+
+    if failure_message is not None:
+        return Result(False, 0, failure_message)
+    return Result(True, 1, "")
\ No newline at end of file
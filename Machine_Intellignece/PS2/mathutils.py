@@ -36,6 +36,10 @@ class Point:
     def __deepcopy__(self, memo):
         return self
 
+    # the default pickling of frozen classes with slots fails (it tries to assign the fields), so rebuild it using the constructor
+    def __reduce__(self):
+        return Point, (self.x, self.y)
+
 # This is a helper function to compute the manhattan distance between 2 points
 def manhattan_distance(p1: Point, p2: Point) -> int:
     return abs(p1.x - p2.x) + abs(p1.y - p2.y)
@@ -0,0 +1,196 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from game import HeuristicFunction, Game, S, A, zero_heuristic
+from helpers.mt19937 import RandomGenerator
+import math, os, time
+
+# This file contains a Monte Carlo Tree Search (MCTS) using the UCT (Upper Confidence bounds applied to Trees) selection rule.
+# Instead of searching all the actions to a fixed depth, MCTS grows a search tree one node at a time (a simulation):
+# 1- Selection: starting from the root, pick the child with the highest UCT score until a node with untried actions is reached.
+# 2- Expansion: add a child for one of the untried actions.
+# 3- Rollout: play the game from the new child for a few steps using a fast policy, then estimate the value using the heuristic.
+# 4- Backpropagation: add the value to all the nodes on the path from the new child to the root.
+# So the search spends its budget on the most promising actions instead of a full-width tree whose size grows with every monster ply.
+# Like the search functions, the player (turn 0) maximizes the value and the other agents (turn > 0) minimize it,
+# unless the other agents are treated as random (chance) agents.
+
+# A node in the Monte Carlo search tree
+@dataclass(eq=False)
+class MCTSNode:
+    state: Any
+    turn: int # the agent whose turn it is at this node
+    terminal_value: Optional[float] # the value of the state if it is terminal, otherwise None
+    untried: List[Any] # the actions that do not have a child yet
+    children: Dict[Any, 'MCTSNode'] = field(default_factory=dict)
+    parent: Optional['MCTSNode'] = None
+    visits: int = 0 # the number of simulations that passed through the node (including the pending ones)
+    value_sum: float = 0 # the sum of the values of these simulations (for the player)
+
+    @property
+    def mean(self) -> float:
+        return self.value_sum / self.visits
+
+# Plays the game from the given state for a number of steps using an epsilon-greedy policy:
+# each agent picks a random action with a probability of "epsilon", otherwise it picks the action whose successor has
+# the best heuristic value for it. Returns the terminal value (if a terminal state is reached) or the heuristic value of the last state.
+# The seed makes the rollout reproducible regardless of the process it runs in.
+def rollout(game: Game[S, A], state: S, heuristic: HeuristicFunction, depth: int, epsilon: float, seed: int) -> float:
+    rng = RandomGenerator(seed)
+    for _ in range(depth):
+        terminal, values = game.is_terminal(state)
+        if terminal: return values[0]
+        actions = game.get_actions(state)
+        if rng.float() < epsilon:
+            action = actions[rng.int(0, len(actions)-1)]
+        else:
+            turn = game.get_turn(state)
+            action = max(actions, key = lambda action: heuristic(game, game.get_successor(state, action), turn))
+        state = game.get_successor(state, action)
+    terminal, values = game.is_terminal(state)
+    return values[0] if terminal else heuristic(game, state, 0)
+
+# The game of each worker process (set once when the process starts)
+_worker_game: Optional[Game] = None
+
+def _init_worker(game: Game) -> None:
+    global _worker_game
+    _worker_game = game
+
+def _rollout_task(state: S, heuristic: HeuristicFunction, depth: int, epsilon: float, seed: int) -> float:
+    return rollout(_worker_game, state, heuristic, depth, epsilon, seed)
+
+# A search function (usable by the SearchAgent and the MCTSAgent) that applies Monte Carlo Tree Search and returns
+# the mean value of the chosen action (for the player) and the action itself (the most visited action at the root).
+# Arguments:
+# - simulations: the number of simulations (the search budget) for each call (at least 1).
+# - time_limit: if given, the search also stops when this time (in seconds) passes (after the first batch).
+# - exploration: the exploration constant of UCT (higher values explore the less visited actions more).
+# - rollout_depth: how many steps each rollout plays before estimating the value using the heuristic.
+# - epsilon: the probability of choosing a random action during the rollouts.
+# - adversarial: if True, the agents other than the player minimize the value, otherwise they act randomly (like in expectimax).
+# - batch_size: how many leaves are selected before their rollouts are run together. The nodes on the path of a pending
+#               simulation receive a virtual loss, so the other simulations in the batch are steered to other leaves.
+# - workers: if the batch size is larger than 1, the rollouts of each batch are run by this number of processes
+#            (by default, the number of CPUs). The heuristic must be picklable in this case.
+# - seed: the seed of the random generator (the search is reproducible for the same seed and batch size).
+# The values are normalized to [0, 1] using the lowest and the highest values seen so far in the search since the values
+# of the games are not bounded (e.g. winning a dungeon is worth 1e8 while the heuristic values are much smaller).
+class MonteCarloTreeSearch:
+    def __init__(self, simulations: int = 1000, time_limit: Optional[float] = None, exploration: float = math.sqrt(2),
+                 rollout_depth: int = 10, epsilon: float = 0.25, adversarial: bool = True,
+                 batch_size: int = 1, workers: Optional[int] = None, seed: int = 0) -> None:
+        self.simulations = simulations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_depth = rollout_depth
+        self.epsilon = epsilon
+        self.adversarial = adversarial
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count()
+        self.rng = RandomGenerator(seed)
+        self.game = self.executor = None
+
+    def __enter__(self) -> 'MonteCarloTreeSearch':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    # Stop the worker processes (if any)
+    def close(self) -> None:
+        if self.executor is not None: self.executor.shutdown()
+        self.game = self.executor = None
+
+    def __call__(self, game: Game[S, A], state: S, heuristic: HeuristicFunction = zero_heuristic, max_depth: int = -1) -> Tuple[float, A]:
+        root = self.create_node(game, state)
+        if root.terminal_value is not None: return root.terminal_value, None
+        self.lowest, self.highest = math.inf, -math.inf
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+
+        # At least one batch is always run (even if the time limit is too small), so the root has a child to choose
+        budget = max(1, self.simulations)
+        simulations = 0
+        while simulations < budget and (simulations == 0 or deadline is None or time.perf_counter() < deadline):
+            batch = max(1, min(self.batch_size, budget - simulations))
+            # Select and expand a leaf for each simulation in the batch
+            leaves, losses = zip(*(self.select(game, root) for _ in range(batch)))
+            # Evaluate the leaves (terminal leaves do not need a rollout)
+            seeds = [self.rng.generate() for _ in leaves]
+            values = self.evaluate(game, heuristic, leaves, seeds)
+            for leaf, leaf_losses, value in zip(leaves, losses, values):
+                self.backpropagate(leaf, leaf_losses, value)
+            simulations += batch
+
+        # Play the most visited action since its value is the most reliable
+        _, _, action, child = max((child.visits, -index, action, child) for index, (action, child) in enumerate(root.children.items()))
+        return child.mean, action
+
+    def create_node(self, game: Game[S, A], state: S, parent: Optional[MCTSNode] = None) -> MCTSNode:
+        terminal, values = game.is_terminal(state)
+        if terminal: return MCTSNode(state, game.get_turn(state), values[0], [], parent = parent)
+        return MCTSNode(state, game.get_turn(state), None, list(game.get_actions(state)), parent = parent)
+
+    # Returns the normalized value of a child for the agent that chooses it
+    def normalized(self, node: MCTSNode, child: MCTSNode) -> float:
+        value = 0.5 if self.highest <= self.lowest else (child.mean - self.lowest) / (self.highest - self.lowest)
+        return value if node.turn == 0 else 1 - value
+
+    # Follows the UCT scores from the root to a node with untried actions (or a terminal node), then expands a child
+    # A virtual loss is added to every node on the path until the simulation is backpropagated
+    # Returns the leaf and the virtual losses added on the path (from the root to the leaf)
+    def select(self, game: Game[S, A], node: MCTSNode) -> Tuple[MCTSNode, List[float]]:
+        losses = []
+        while True:
+            losses.append(self.add_virtual_loss(node))
+            if node.terminal_value is not None: return node, losses
+            if node.turn != 0 and not self.adversarial:
+                # Random agents pick any action with the same probability
+                actions = node.untried + list(node.children.keys())
+                action = actions[self.rng.int(0, len(actions)-1)]
+                if action in node.children:
+                    node = node.children[action]
+                    continue
+                node.untried.remove(action)
+            elif node.untried:
+                action = node.untried.pop(0)
+            else:
+                log_visits = math.log(node.visits)
+                node = max(node.children.values(),
+                           key = lambda child: self.normalized(node, child) + self.exploration * math.sqrt(log_visits / child.visits))
+                continue
+            child = self.create_node(game, game.get_successor(node.state, action), node)
+            node.children[action] = child
+            losses.append(self.add_virtual_loss(child))
+            return child, losses
+
+    # A virtual loss is a pending visit with the worst value (seen so far) for the agent that chose the node
+    # Returns the value of the virtual loss
+    def add_virtual_loss(self, node: MCTSNode) -> float:
+        loss = 0
+        if node.parent is not None and self.lowest <= self.highest:
+            loss = self.lowest if node.parent.turn == 0 else self.highest
+        node.visits += 1
+        node.value_sum += loss
+        return loss
+
+    # Returns the value of each leaf (the terminal value or the result of a rollout)
+    def evaluate(self, game: Game[S, A], heuristic: HeuristicFunction, leaves: List[MCTSNode], seeds: List[int]) -> List[float]:
+        pending = [(leaf, seed) for leaf, seed in zip(leaves, seeds) if leaf.terminal_value is None]
+        if len(pending) > 1 and self.batch_size > 1:
+            if self.game is not game:
+                self.close()
+                self.executor = ProcessPoolExecutor(self.workers, initializer = _init_worker, initargs = (game,))
+                self.game = game
+            futures = [self.executor.submit(_rollout_task, leaf.state, heuristic, self.rollout_depth, self.epsilon, seed) for leaf, seed in pending]
+            rollouts = iter([future.result() for future in futures])
+        else:
+            rollouts = iter([rollout(game, leaf.state, heuristic, self.rollout_depth, self.epsilon, seed) for leaf, seed in pending])
+        return [leaf.terminal_value if leaf.terminal_value is not None else next(rollouts) for leaf in leaves]
+
+    # Replaces the virtual losses on the path from the leaf to the root with the value of the simulation
+    def backpropagate(self, node: MCTSNode, losses: List[float], value: float) -> None:
+        for loss in reversed(losses):
+            node.value_sum += value - loss
+            node = node.parent
+        self.lowest, self.highest = min(self.lowest, value), max(self.highest, value)
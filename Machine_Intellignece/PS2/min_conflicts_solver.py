@@ -0,0 +1,182 @@
+from typing import Any, Dict, List, Optional, Tuple
+from CSP import Assignment, AllDifferentConstraint, BinaryConstraint, Problem
+from CSP_solver import one_consistency
+from helpers.mt19937 import RandomGenerator
+
+# This file contains a local search solver for CSPs using the min-conflicts heuristic.
+# It starts from a complete assignment (each variable takes the value with the fewest conflicts with the variables assigned
+# before it), then at each step it picks a random variable that is in conflict and gives it the value with the fewest conflicts
+# (ties are broken randomly). It is incomplete: it can find a solution much faster than backtracking on large or loosely
+# constrained problems (e.g. N-Queens with thousands of queens), but it returns None if it does not find one, even if there is one.
+# The number of violated constraints of each variable is kept up to date after each step, so a step only looks at the constraints
+# of the changed variable (its neighbors) instead of checking all the constraints:
+#   - a binary constraint is checked with the current value of the other variable.
+#   - an all-different constraint counts as a "not equal" constraint between every pair of its variables, and the variables of
+#     each value are stored for each constraint, so the number of conflicts of a value is known without looking at the others.
+# Options:
+#   - tabu: the chosen variable must change its value at each step (even if no other value has fewer conflicts), and it cannot
+#     take the old value again for this number of steps (unless that value has no conflicts), so the search can leave a local
+#     minimum without going back and forth between the same assignments.
+#   - restarts: if no solution is found after "max_steps" steps, the search starts again from a new assignment this number of times.
+#     Without tabu, it also starts again early when no variable in conflict can change its value (a strict local minimum).
+#   - seed: the seed of the random generator (the same seed gives the same search).
+# The problem can only have unary, binary and all-different constraints (the unary constraints are applied to the domains first).
+
+class MinConflicts:
+    def __init__(self, problem: Problem, seed: Optional[int] = None) -> None:
+        if not all(isinstance(constraint, (BinaryConstraint, AllDifferentConstraint)) for constraint in problem.constraints):
+            raise ValueError("min-conflicts only supports binary and all-different constraints (after 1-Consistency)")
+        self.problem = problem
+        self.random = RandomGenerator(seed)
+        self.variables = list(problem.variables)
+        self.domains = {variable: sorted(problem.domains[variable]) for variable in self.variables}
+        # For each variable: (condition, other variable, whether the variable is the first argument of the condition)
+        self.arcs = {variable: [(constraint.condition, other, constraint.variables[0] == variable)
+                                for constraint, other in problem.binary_constraints(variable)] for variable in self.variables}
+        groups = {constraint: index for index, constraint in enumerate(c for c in problem.constraints if isinstance(c, AllDifferentConstraint))}
+        self.groups = {variable: [groups[constraint] for constraint, _ in problem.all_different_constraints(variable)] for variable in self.variables}
+        self.group_count = len(groups)
+        self.steps = 0      # The total number of steps of the last call to "solve"
+        self.restarts = 0   # The number of restarts of the last call to "solve"
+
+    # Clears the assignment and the conflict counts
+    def reset(self) -> None:
+        self.assignment: Assignment = {}
+        self.conflicts = {variable: 0 for variable in self.variables}
+        # The variables of each value in each all-different constraint (dicts are used as ordered sets)
+        self.members: List[Dict[Any, Dict[str, None]]] = [{} for _ in range(self.group_count)]
+        # The variables with conflicts in a list (to pick one randomly) and their positions in the list (to remove one in O(1))
+        self.conflicted: List[str] = []
+        self.positions: Dict[str, int] = {}
+        self.tabu: Dict[Tuple[str, Any], int] = {}
+
+    # Returns the number of constraints that would be violated if the variable took the value
+    # (only the constraints with assigned variables are counted)
+    def count_conflicts(self, variable: str, value: Any) -> int:
+        assignment = self.assignment
+        count = 0
+        for condition, other, first in self.arcs[variable]:
+            other_value = value if other == variable else assignment.get(other)
+            if other_value is None: continue
+            if not (condition(value, other_value) if first else condition(other_value, value)): count += 1
+        current = assignment.get(variable)
+        for group in self.groups[variable]:
+            count += len(self.members[group].get(value, ())) - (current == value)
+        return count
+
+    # Adds the variable to the conflicted list or removes it from the list according to its conflict count
+    def update_conflicted(self, variable: str) -> None:
+        if self.conflicts[variable] > 0:
+            if variable not in self.positions:
+                self.positions[variable] = len(self.conflicted)
+                self.conflicted.append(variable)
+        elif variable in self.positions:
+            index = self.positions.pop(variable)
+            last = self.conflicted.pop()
+            if last != variable:
+                self.conflicted[index] = last
+                self.positions[last] = index
+
+    # Assigns the value to the variable and updates the conflict counts of the variable and its neighbors
+    def assign(self, variable: str, value: Any) -> None:
+        assignment, conflicts = self.assignment, self.conflicts
+        old = assignment.get(variable)
+        changed = [variable]
+        for condition, other, first in self.arcs[variable]:
+            if other == variable: continue
+            other_value = assignment.get(other)
+            if other_value is None: continue
+            before = old is not None and not (condition(old, other_value) if first else condition(other_value, old))
+            after = not (condition(value, other_value) if first else condition(other_value, value))
+            if before != after:
+                delta = after - before
+                conflicts[other] += delta
+                conflicts[variable] += delta
+                changed.append(other)
+        for group in self.groups[variable]:
+            members = self.members[group]
+            if old is not None:
+                del members[old][variable]
+                for other in members[old]:
+                    conflicts[other] -= 1
+                    conflicts[variable] -= 1
+                    changed.append(other)
+            for other in members.get(value, ()):
+                conflicts[other] += 1
+                conflicts[variable] += 1
+                changed.append(other)
+            members.setdefault(value, {})[variable] = None
+        # A binary constraint between the variable and itself only depends on its new value
+        for condition, other, _ in self.arcs[variable]:
+            if other != variable: continue
+            conflicts[variable] += (not condition(value, value)) - (old is not None and not condition(old, old))
+        assignment[variable] = value
+        for other in changed: self.update_conflicted(other)
+
+    # Returns the values of the variable with the fewest conflicts (in the order of the domain)
+    # The values that are tabu are skipped unless they have no conflicts, or all the values are tabu
+    # If "excluded" is given, this value is skipped (so the returned list is empty if it is the only value in the domain)
+    def best_values(self, variable: str, excluded: Any = None) -> List[Any]:
+        best: List[Any] = []
+        best_count = None
+        tabu_best: List[Any] = []
+        tabu_count = None
+        for value in self.domains[variable]:
+            if excluded is not None and value == excluded: continue
+            count = self.count_conflicts(variable, value)
+            if count > 0 and self.tabu.get((variable, value), -1) > self.steps:
+                if tabu_count is None or count < tabu_count: tabu_best, tabu_count = [value], count
+                elif count == tabu_count: tabu_best.append(value)
+            elif best_count is None or count < best_count: best, best_count = [value], count
+            elif count == best_count: best.append(value)
+        return best or tabu_best
+
+    # Returns a random element of a non-empty list
+    def choice(self, values: List[Any]) -> Any:
+        return values[self.random.int(0, len(values) - 1)]
+
+    # Creates a new complete assignment: the variables are assigned in a random order, each one to the value
+    # with the fewest conflicts with the variables assigned before it
+    def initialize(self) -> None:
+        self.reset()
+        order = list(self.variables)
+        for index in range(len(order) - 1, 0, -1):
+            other = self.random.int(0, index)
+            order[index], order[other] = order[other], order[index]
+        for variable in order:
+            self.assign(variable, self.choice(self.best_values(variable)))
+
+    # Runs the search and returns a solution (or None if none is found after "restarts" restarts of "max_steps" steps each)
+    def solve(self, max_steps: int = 100000, restarts: int = 0, tabu: int = 0) -> Optional[Assignment]:
+        self.steps = self.restarts = 0
+        for attempt in range(restarts + 1):
+            self.restarts = attempt
+            self.initialize()
+            # The conflicted variables whose current value is the only best one since the last change (dict used as an ordered set)
+            stuck: Dict[str, None] = {}
+            for _ in range(max_steps):
+                if not self.conflicted: break
+                self.steps += 1
+                variable = self.choice(self.conflicted)
+                old = self.assignment[variable]
+                # With tabu, the current value is not a candidate, so the variable always moves
+                values = self.best_values(variable, old if tabu > 0 else None)
+                if not values or values == [old]:
+                    stuck[variable] = None
+                    # The conflicted list only changes after a move, so no variable in it can move anymore
+                    if len(stuck) == len(self.conflicted): break
+                    continue
+                value = self.choice(values)
+                if value == old: continue
+                stuck.clear()
+                if tabu > 0: self.tabu[(variable, old)] = self.steps + tabu
+                self.assign(variable, value)
+            if not self.conflicted:
+                return {variable: self.assignment[variable] for variable in self.variables}
+        return None
+
+# Solve a problem using the min-conflicts local search and return the assignment of its variables (or None if no solution is found)
+# Like "CSP_solver.solve", 1-Consistency is applied to the problem first (so its unary constraints are removed)
+def solve(problem: Problem, max_steps: int = 100000, restarts: int = 0, tabu: int = 0, seed: Optional[int] = None) -> Optional[Assignment]:
+    if not one_consistency(problem): return None
+    return MinConflicts(problem, seed).solve(max_steps, restarts, tabu)
@@ -0,0 +1,49 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# This file contains a move orderer for alpha beta search that does not need to evaluate the heuristic of every successor.
+# It orders the actions using what was learned from the previous searches:
+# 1- The best action (e.g. the best action stored in the transposition table or found by the previous iteration)
+# 2- The killer moves: the last actions that caused a cutoff at the same remaining depth for the agent whose turn it is
+#    (they are likely to cause a cutoff again)
+# 3- The history table: how often (and how deep) each action caused a cutoff for the agent whose turn it is
+# The remaining ties are broken by the order in which the game returns the actions.
+
+class MoveOrderer:
+    killer_slots: int # The number of killer moves kept for each (turn, remaining depth)
+    killers: Dict[Tuple[int, int], List[Any]] # The killer moves of each (turn, remaining depth) (the most recent first)
+    history: Dict[Tuple[int, Hashable], int] # The history score of each (turn, action)
+
+    def __init__(self, killer_slots: int = 2) -> None:
+        self.killer_slots = killer_slots
+        self.killers = {}
+        self.history = {}
+
+    # Returns the given actions sorted from the most to the least promising
+    def order(self, turn: int, actions: Iterable[Any], max_depth: int, best_action: Optional[Any] = None) -> List[Any]:
+        killers = self.killers.get((turn, max_depth), [])
+        def priority(index_action: Tuple[int, Any]):
+            index, action = index_action
+            killer_rank = len(killers) - killers.index(action) if action in killers else 0
+            return (best_action is not None and action == best_action, killer_rank, self.history.get((turn, action), 0), -index)
+        return [action for _, action in sorted(enumerate(actions), key = priority, reverse = True)]
+
+    # Records that the given action caused a cutoff
+    # The history bonus grows with the remaining depth since a cutoff near the root prunes a larger subtree
+    def cutoff(self, turn: int, action: Any, max_depth: int) -> None:
+        killers = self.killers.setdefault((turn, max_depth), [])
+        if action in killers: killers.remove(action)
+        killers.insert(0, action)
+        del killers[self.killer_slots:]
+        key = (turn, action)
+        self.history[key] = self.history.get(key, 0) + (max_depth * max_depth if max_depth > 0 else 1)
+
+    # Halves the history scores (e.g. before searching a new move) so that recent cutoffs matter more than old ones
+    # The killer moves are cleared since they are specific to the positions around the previous root
+    def age(self) -> None:
+        self.killers.clear()
+        self.history = {key: score // 2 for key, score in self.history.items() if score > 1}
+
+    # Removes everything learned so far
+    def clear(self) -> None:
+        self.killers.clear()
+        self.history.clear()
@@ -1,6 +1,11 @@
 from dungeon import DungeonGame, Direction, DungeonState, DungeonTile, MonsterAgent
-from agents import HumanAgent, SearchAgent, RandomAgent
+from agents import HumanAgent, SearchAgent, RandomAgent, MCTSAgent
+from game import zero_heuristic
 from helpers.utils import fetch_tracked_call_count
+from helpers.mt19937 import RandomGenerator
+from transposition import TranspositionTable
+from ordering import MoveOrderer
+from functools import partial
 import argparse, time
 
 def colored_dungeon(level: str):
@@ -19,15 +24,26 @@ def colored_dungeon(level: str):
 # Return the heuristic selected by the user
 def get_heuristic(name: str):
     if name == "zero":
-        return lambda *_: 0
+        return zero_heuristic
     if name == "heuristic":
         from dungeon import dungeon_heuristic
         return dungeon_heuristic
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
+# If requested, give the search function a transposition table that is kept across all the moves of the game
+def with_transposition_table(search_fn, args: argparse.Namespace):
+    if args.tt_size <= 0: return search_fn
+    return partial(search_fn, transposition_table=TranspositionTable(args.tt_size))
+
+# If requested, give the search function a move orderer (killer moves and history) that is kept across all the moves of the game
+def with_move_orderer(search_fn, args: argparse.Namespace):
+    if args.move_ordering != "history": return search_fn
+    return partial(search_fn, move_orderer=MoveOrderer())
+
 # Create an agent based on the user selections
-def create_agent(args: argparse.Namespace):
+# If a seed is given, it is used by the agents that make random choices (random, mcts and sparse_expectimax) instead of their default seeds
+def create_agent(args: argparse.Namespace, seed: int = None):
     agent_type: str = args.agent
     if agent_type == "human":
         # This function reads the action from the user (human)
@@ -48,7 +64,7 @@ def create_agent(args: argparse.Namespace):
                     print("Invalid Action")
         return HumanAgent(dungeon_user_action)
     if agent_type == "random":
-        return RandomAgent(402)
+        return RandomAgent(402 if seed is None else seed)
     if agent_type == "greedy":
         from search import greedy
         heuristic = get_heuristic(args.heuristic)
@@ -56,19 +72,45 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "minimax":
         from search import minimax
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(minimax, heuristic, args.depth)
+        return SearchAgent(with_transposition_table(minimax, args), heuristic, args.depth)
     if agent_type == "alphabeta":
         from search import alphabeta
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(alphabeta, heuristic, args.depth)
+        return SearchAgent(with_transposition_table(alphabeta, args), heuristic, args.depth)
     if agent_type == "alphabeta_order":
         from search import alphabeta_with_move_ordering
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(alphabeta_with_move_ordering, heuristic, args.depth)
+        return SearchAgent(with_move_orderer(with_transposition_table(alphabeta_with_move_ordering, args), args), heuristic, args.depth)
+    if agent_type == "iterative_deepening":
+        from search import iterative_deepening
+        heuristic = get_heuristic(args.heuristic)
+        search_fn = partial(iterative_deepening, time_limit=args.time_limit)
+        return SearchAgent(with_move_orderer(with_transposition_table(search_fn, args), args), heuristic, args.depth)
+    if agent_type == "pvs":
+        from search import iterative_deepening, principal_variation_search
+        heuristic = get_heuristic(args.heuristic)
+        search_fn = partial(iterative_deepening, time_limit=args.time_limit, search_fn=principal_variation_search, 
+                            aspiration_window=args.aspiration_window)
+        return SearchAgent(with_move_orderer(with_transposition_table(search_fn, args), args), heuristic, args.depth)
+    if agent_type == "alphabeta_parallel":
+        from search import ParallelAlphaBeta
+        heuristic = get_heuristic(args.heuristic)
+        return SearchAgent(ParallelAlphaBeta(args.workers), heuristic, args.depth)
+    if agent_type == "mcts":
+        heuristic = get_heuristic(args.heuristic)
+        return MCTSAgent(heuristic, simulations=args.simulations, time_limit=args.time_limit, rollout_depth=args.rollout_depth,
+                         batch_size=args.batch_size, workers=args.workers, seed=seed or 0)
+    if agent_type == "sparse_expectimax":
+        from search import sparse_expectimax
+        heuristic = get_heuristic(args.heuristic)
+        # The same generator is used at every move, so each move draws new samples
+        search_fn = partial(sparse_expectimax, samples=args.samples, tolerance=args.tolerance, compound=args.compound,
+                            rng=RandomGenerator(seed or 0))
+        return SearchAgent(search_fn, heuristic, args.depth)
     if agent_type == "expectimax":
         from search import expectimax
         heuristic = get_heuristic(args.heuristic)
-        return SearchAgent(expectimax, heuristic, args.depth)
+        return SearchAgent(with_transposition_table(expectimax, args), heuristic, args.depth)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -124,26 +166,56 @@ def main(args: argparse.Namespace):
         print("Step:", step, "/ Turn:", turn, "/ Action:", str(action))
         state_printer(state)
     
+    # Stop the worker processes of the search agents that have any (e.g. the parallel alpha beta agent)
+    for agent in agents:
+        if isinstance(agent, SearchAgent) and hasattr(agent.search_fn, "close"):
+            agent.search_fn.close()
+        if isinstance(agent, MCTSAgent):
+            agent.close()
+
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
 
-if __name__ == "__main__":
-    # Read the arguments from the command line
+# Create the parser of the command line arguments (it is also used by batch_dungeon.py to read the agent configurations)
+def create_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="Play Dungeon as Human or AI")
     parser.add_argument("level", help="path to the dungeon to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'greedy', 'random', 'minimax', 'alphabeta', 'alphabeta_order', 'expectimax'],
-                        help="the agent that will play the game")
+                        choices=['human', 'greedy', 'random', 'minimax', 'alphabeta', 'alphabeta_order', 'alphabeta_parallel', 'iterative_deepening', 'pvs', 'mcts', 'expectimax', 'sparse_expectimax'],
+                        help="the agent that will play the game (alphabeta_parallel is experimental: it has not been measured "
+                             "to be faster than alphabeta on any machine yet)")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "heuristic"],
                         help="choose the heuristic to use")
     parser.add_argument("--depth", "-d", type=int, default=5, help="How deep the algorithms should search")
+    parser.add_argument("--time-limit", "-t", type=float, default=None,
+                        help="The time budget (seconds) of each move for the iterative deepening, pvs and mcts agents")
+    parser.add_argument("--aspiration-window", "-aw", type=float, default=None,
+                        help="The size of the aspiration window (on each side of the previous value) used by the pvs agent (default: full window)")
+    parser.add_argument("--move-ordering", "-mo", default="heuristic", choices=["heuristic", "history"],
+                        help="How the move ordering agents order the actions: by the heuristic value of the successors or by killer moves and history")
+    parser.add_argument("--samples", "-ns", type=int, default=8, help="The number of samples per chance node for the sparse expectimax agent")
+    parser.add_argument("--tolerance", "-tol", type=float, default=None,
+                        help="The sparse expectimax agent stops sampling a chance node once its 95%% confidence interval is within +/- this value")
+    parser.add_argument("--compound", "-c", action="store_true",
+                        help="Merge all the monsters into one chance node for the sparse expectimax agent (the depth counts the player moves)")
+    parser.add_argument("--simulations", "-n", type=int, default=1000, help="The number of simulations per move for the mcts agent")
+    parser.add_argument("--rollout-depth", "-rd", type=int, default=10, help="How many steps each rollout of the mcts agent plays")
+    parser.add_argument("--batch-size", "-b", type=int, default=1,
+                        help="How many rollouts the mcts agent runs at the same time using the worker processes (1 disables them)")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="The number of processes used by the parallel alpha beta (experimental) and mcts agents (default: the number of CPUs)")
+    parser.add_argument("--tt-size", "-tt", type=int, default=0, 
+                        help="The size of the transposition table used by the search agents (0 disables it)")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
                         help="Print the dungeon on the console with ANSI colors (only works on some terminals)")
     parser.add_argument("--sleep", "-s", type=float, default=0, help="How much time (seconds) to wait between actions")
+    return parser
 
-    args = parser.parse_args()
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    args = create_parser().parse_args()
     try:
         main(args)
     except KeyboardInterrupt:
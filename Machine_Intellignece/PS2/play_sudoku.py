@@ -1,5 +1,6 @@
 from sudoku import SudokuProblem
-from CSP_solver import solve
+from CSP_solver import INFERENCES, STRATEGIES, solve
+import DLX_solver
 import argparse, time
 
 # This function requests a solution from the user
@@ -34,7 +35,7 @@ def solve_via_human(problem: SudokuProblem):
 
         assignment[variable] = value
         
-        if problem.check_solution(assignment):
+        if problem.satisfies_constraints(assignment):
             print("Congratulations! This Assignment is a solution. If you don't want to make any further changes, you can quit by entering quit or q.")
         elif problem.is_complete(assignment):
             print("This assignment is complete, but it does not satisfy some constraints. Please re-assign some variables to satisfy the constraints.")
@@ -50,7 +51,9 @@ def main(args: argparse.Namespace):
     if agent_name == "human":
         solve_fn = solve_via_human
     elif agent_name == "backtrack":
-        solve_fn = solve
+        solve_fn = lambda problem: solve(problem, args.propagate, args.inference, args.strategy)
+    elif agent_name == "dlx":
+        solve_fn = DLX_solver.solve
     else:
         print(f"Unknown Agent: {agent_name}. Please select a valid agent.")
         return
@@ -78,8 +81,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Sudoku as Human or AI")
     parser.add_argument("puzzle", help="path to the puzzle to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'backtrack'],
-                        help="the agent that will play the game")
+                        choices=['human', 'backtrack', 'dlx'],
+                        help="the agent that will play the game (dlx: an exact cover solver using Dancing Links)")
+    parser.add_argument("--propagate", "-p", action="store_true",
+                        help="propagate the all-different constraints after forward checking (explores fewer nodes)")
+    parser.add_argument("--inference", "-i", default="fc", choices=INFERENCES,
+                        help="fc: forward checking, ac3: AC-3 before the search then forward checking, mac: maintain arc consistency")
+    parser.add_argument("--strategy", "-s", default="backtrack", choices=STRATEGIES,
+                        help="backtrack: chronological backtracking, cbj: conflict-directed backjumping with nogood learning")
     
     args = parser.parse_args()
     try:
@@ -1,9 +1,12 @@
 import time
 from tree import TreeGame, TreeNode, tree_heuristic
+from compact_tree import CompactTreeGame
 from agents import HumanAgent, SearchAgent, RandomAgent
+from game import zero_heuristic
 from helpers.utils import fetch_recorded_calls
 from helpers.pruned_tree import pruned_tree_string
 from helpers.mt19937 import RandomGenerator
+from functools import partial
 import argparse
 
 seed_gen = RandomGenerator(0)
@@ -11,14 +14,14 @@ seed_gen = RandomGenerator(0)
 # Return the heuristic selected by the user
 def get_heuristic(name: str):
     if name == "zero":
-        return lambda *_: 0
+        return zero_heuristic
     if name == "heuristic":
         return tree_heuristic
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
 # Create an agent based on the user selections
-def create_agent(agent_type: str, heuristic_type: str):
+def create_agent(agent_type: str, heuristic_type: str, time_limit: float = None, workers: int = None):
     if agent_type == "human":
         # This function reads the action from the user (human)
         def tree_user_action(game: TreeGame, state: TreeNode) -> int:
@@ -41,9 +44,19 @@ def create_agent(agent_type: str, heuristic_type: str):
     if agent_type == "alphabeta":
         from search import alphabeta
         return SearchAgent(alphabeta)
+    if agent_type == "alphabeta_parallel":
+        from search import ParallelAlphaBeta
+        return SearchAgent(ParallelAlphaBeta(workers), get_heuristic(heuristic_type))
     if agent_type == "alphabeta_order":
         from search import alphabeta_with_move_ordering
         return SearchAgent(alphabeta_with_move_ordering, get_heuristic(heuristic_type))
+    if agent_type == "iterative_deepening":
+        from search import iterative_deepening
+        return SearchAgent(partial(iterative_deepening, time_limit=time_limit), get_heuristic(heuristic_type))
+    if agent_type == "pvs":
+        from search import iterative_deepening, principal_variation_search
+        search_fn = partial(iterative_deepening, time_limit=time_limit, search_fn=principal_variation_search)
+        return SearchAgent(search_fn, get_heuristic(heuristic_type))
     if agent_type == "expectimax":
         from search import expectimax
         return SearchAgent(expectimax)
@@ -54,7 +67,8 @@ def create_agent(agent_type: str, heuristic_type: str):
 
 def main(args: argparse.Namespace):
     start = time.time() # Track run time
-    game = TreeGame.from_file(args.tree) # create the problem
+    # create the problem (the compact tree is memory-mapped from a cache file which is created next to the tree file if needed)
+    game = CompactTreeGame.from_file(args.tree) if args.compact else TreeGame.from_file(args.tree)
     
     # Get the initial state
     state = game.get_initial_state()
@@ -63,7 +77,7 @@ def main(args: argparse.Namespace):
     
     # create the agents that will play the game
     agent_types = [args.agent, args.adversary]
-    agents = [create_agent(agent_type, args.heuristic) for agent_type in agent_types]
+    agents = [create_agent(agent_type, args.heuristic, args.time_limit, args.workers) for agent_type in agent_types]
     
     step = 0 # This will store the current step
     
@@ -82,9 +96,9 @@ def main(args: argparse.Namespace):
         fetch_recorded_calls(TreeGame.is_terminal) # Clear the recorded calls
         
         # if this is the turn of the first player, increment the step counter
+        turn = game.get_turn(state) # get the current turn
         if turn == 0: step += 1
         
-        turn = game.get_turn(state) # get the current turn
         agent = agents[turn] # get the agent that will play the current turn
         action = agent.act(game, state) # Request an action from the agent
         
@@ -93,8 +107,8 @@ def main(args: argparse.Namespace):
             explored_nodes = [call["args"][1].name for call in list(fetch_recorded_calls(TreeGame.is_terminal))]
             print(f"The agent explored {len(explored_nodes)} Node(s): {', '.join(explored_nodes)}")
             # if drawing the pruned tree is requested and the search function uses alpha beta pruning
-            # draw the pruned tree
-            if args.show_pruning and "alphabeta" in agent_types[turn]:
+            # draw the pruned tree (except for the parallel search since the nodes explored by its workers are not recorded)
+            if args.show_pruning and "alphabeta" in agent_types[turn] and agent_types[turn] != "alphabeta_parallel":
                 print("Pruned Tree:")
                 print(pruned_tree_string(state, explored_nodes))
         
@@ -107,6 +121,11 @@ def main(args: argparse.Namespace):
 
         print()
     
+    # Stop the worker processes of the search agents that have any (e.g. the parallel alpha beta agent)
+    for agent in agents:
+        if isinstance(agent, SearchAgent) and hasattr(agent.search_fn, "close"):
+            agent.search_fn.close()
+
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -115,16 +134,23 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play tree as Human or AI")
     parser.add_argument("tree", help="path to the tree to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'minimax', 'alphabeta', 'alphabeta_order', 'expectimax', 'random'],
-                        help="the agent that will play the game")
+                        choices=['human', 'minimax', 'alphabeta', 'alphabeta_order', 'alphabeta_parallel', 'iterative_deepening', 'pvs', 'expectimax', 'random'],
+                        help="the agent that will play the game (alphabeta_parallel is experimental: it has not been measured "
+                             "to be faster than alphabeta on any machine yet)")
     parser.add_argument("--adversary", "-adv", default="human",
-                        choices=['human', 'minimax', 'alphabeta', 'alphabeta_order', 'expectimax', 'random'],
+                        choices=['human', 'minimax', 'alphabeta', 'alphabeta_order', 'alphabeta_parallel', 'iterative_deepening', 'pvs', 'expectimax', 'random'],
                         help="the agent that will play as your adversary (enemy) the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "heuristic"],
                         help="choose the heuristic to use")
     parser.add_argument("--show-pruning", "-sp", action='store_true', default=False,
                         help="Draw the pruned tree in case the agent uses Alpha Beta pruning")
+    parser.add_argument("--time-limit", "-t", type=float, default=None,
+                        help="The time budget (seconds) of each move for the iterative deepening and pvs agents")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="The number of processes used by the parallel alpha beta agent, which is experimental (default: the number of CPUs)")
+    parser.add_argument("--compact", "-c", action='store_true', default=False,
+                        help="Load the tree as flat arrays (for huge trees); a .ctree cache file is created next to the tree file")
     parser.add_argument("--sleep", "-s", type=float, default=0, help="How much time (seconds) to wait between actions")
 
     args = parser.parse_args()
@@ -1,14 +1,68 @@
-from typing import Tuple
+from typing import Any, Callable, Iterable, List, Optional, Tuple
 from game import HeuristicFunction, Game, S, A
-from helpers.utils import NotImplemented
+from helpers.utils import NotImplemented, fetch_recorded_calls, fetch_tracked_call_count
+from helpers.mt19937 import RandomGenerator
+from transposition import Bound, TranspositionTable
+from ordering import MoveOrderer
 
-import math
+from concurrent.futures import ProcessPoolExecutor
+import math, multiprocessing, os, time
 
 # All search functions take a problem, a state, a heuristic function and the maximum search depth.
 # If the maximum search depth is -1, then there should be no depth cutoff (The expansion should not stop before reaching a terminal state) 
 
 # All the search functions should return the expected tree value and the best action to take based on the search results
 
+# The minimax, alpha beta and expectimax functions can optionally receive a transposition table.
+# If it is given, the value of every searched state is stored in it (keyed by game.get_hash(state)), and when the same state
+# is reached again through a different sequence of actions, the stored value is reused instead of searching the state again.
+# Without a transposition table, the search explores exactly the same nodes as the plain algorithm.
+
+# This exception is raised by a search function when its deadline passes before the search is complete
+class SearchTimeout(Exception):
+    pass
+
+# Counts the depth cutoffs of a search: the states evaluated by the heuristic because the depth limit was reached,
+# and the transposition table entries reused from a depth limited search. If a search finishes without any,
+# it reached a terminal state on every path, so a deeper search would return the same result (see "iterative_deepening").
+class DepthCutoffs:
+    count: int
+
+    def __init__(self) -> None:
+        self.count = 0
+
+# Returns the depth with which the result of a state is stored in the transposition table: -1 (no depth limit)
+# if no depth cutoff happened since the search of the state started (when the count was "count_before"), otherwise max_depth
+def cutoff_depth(max_depth: int, depth_cutoffs: Optional[DepthCutoffs], count_before: int) -> int:
+    return -1 if depth_cutoffs is not None and depth_cutoffs.count == count_before else max_depth
+
+# If a transposition table is given, this function stores the search result of a state in it, then returns the result
+def remember(transposition_table: Optional[TranspositionTable], key: int, max_depth: int, value_action: Tuple[float, A], 
+             bound: Bound = Bound.EXACT) -> Tuple[float, A]:
+    if transposition_table is not None: transposition_table.store(key, max_depth, value_action[0], bound, value_action[1])
+    return value_action
+
+# Returns the bound type of a value found by alpha beta search using the window (alpha, beta)
+def value_bound(value: float, alpha: float, beta: float) -> Bound:
+    if value <= alpha: return Bound.UPPER
+    if value >= beta: return Bound.LOWER
+    return Bound.EXACT
+
+# Looks up a state in the transposition table before an alpha beta search and returns:
+# 1- The stored (value, action) if it can be returned without searching the state, or None otherwise.
+# 2- The window (alpha, beta) narrowed by the stored bound (if any).
+# If the entry was found by a depth limited search, it is counted in "depth_cutoffs" (if given).
+def probe_window(transposition_table: TranspositionTable, key: int, max_depth: int, 
+                 alpha: float, beta: float, depth_cutoffs: Optional[DepthCutoffs] = None) -> Tuple[Optional[Tuple[float, A]], float, float]:
+    entry = transposition_table.probe(key, max_depth)
+    if entry is None: return None, alpha, beta
+    if depth_cutoffs is not None and math.isfinite(entry.depth): depth_cutoffs.count += 1
+    if entry.bound == Bound.EXACT: return (entry.value, entry.action), alpha, beta
+    if entry.bound == Bound.LOWER: alpha = max(alpha, entry.value)
+    else: beta = min(beta, entry.value)
+    if alpha >= beta: return (entry.value, entry.action), alpha, beta
+    return None, alpha, beta
+
 # This is a simple search function that looks 1-step ahead and returns the action that lead to highest heuristic value.
 # This algorithm is bad if the heuristic function is weak. That is why we use minimax search to look ahead for many steps.
 def greedy(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
@@ -28,34 +82,50 @@ def greedy(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth:
 # and if it is > 0, it should be a min node. Also remember that game.is_terminal(s), returns the values
 # for all the agents. So to get the value for the player (which acts at the max nodes), you need to
 # get values[0].
-def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, 
+            transposition_table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    # If the state was already searched at least as deep, reuse its value
+    key = None
+    if transposition_table is not None:
+        key = game.get_hash(state)
+        entry = transposition_table.probe(key, max_depth)
+        if entry is not None: return entry.value, entry.action
+
     is_terminal, terminal_vals = game.is_terminal(state)
 
     # Base cases:
     # if the current state is terminal state, return its tree value
     # if the maximum depth reaches 0, return its heuristic tree  value
-    if is_terminal: return terminal_vals[0], None
-    if max_depth == 0: return heuristic(game, state, 0), None
+    if is_terminal: return remember(transposition_table, key, -1, (terminal_vals[0], None))
+    if max_depth == 0: return remember(transposition_table, key, 0, (heuristic(game, state, 0), None))
     
     # recursivly call the same function for every action avaliable for the current state 
     # and the save the returned values in a list of tuples, each tuple represents the tree value, and the action
-    values_actions = [(minimax(game, game.get_successor(state, action), heuristic, max_depth - 1)[0], action) 
+    values_actions = [(minimax(game, game.get_successor(state, action), heuristic, max_depth - 1, transposition_table)[0], action) 
                         for action in game.get_actions(state)]
 
     # Eventually, get the max or min value-action pair according to the player's turn 
-    
-    return (max(values_actions, key = lambda k: k[0]) if game.get_turn(state) == 0 else min(values_actions, key = lambda k: k[0]))   
-   
+    return remember(transposition_table, key, max_depth, 
+                    max(values_actions, key = lambda k: k[0]) if game.get_turn(state) == 0 else min(values_actions, key = lambda k: k[0]))
 
 # Apply Alpha Beta pruning and return the tree value and the best action
 # Hint: Read the hint for minimax.
-def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, alpha: int = -math.inf, beta: int = math.inf) -> Tuple[float, A]:
+def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, alpha: int = -math.inf, beta: int = math.inf,
+              transposition_table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    # If the state was already searched at least as deep, reuse its value or narrow the window using its bound
+    key = None
+    if transposition_table is not None:
+        key = game.get_hash(state)
+        value_action, alpha, beta = probe_window(transposition_table, key, max_depth, alpha, beta)
+        if value_action is not None: return value_action
+    window = (alpha, beta) # the window used to search this state (needed to know the bound of the result)
+
     is_terminal, terminal_vals = game.is_terminal(state)
     # Base cases:
     # if the current state is terminal state, return its tree value
     # if the maximum depth reaches 0, return its heuristic tree  value
-    if is_terminal: return terminal_vals[0], None
-    if max_depth == 0: return heuristic(game, state, 0), None
+    if is_terminal: return remember(transposition_table, key, -1, (terminal_vals[0], None))
+    if max_depth == 0: return remember(transposition_table, key, 0, (heuristic(game, state, 0), None))
     
     # get successor states for each available action of the current state
     states_actions = [(game.get_successor(state, action), action) for action in game.get_actions(state)]
@@ -65,82 +135,442 @@ def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_dept
     if game.get_turn(state):
         min_value_action = (math.inf, None)
         for state, action in states_actions:
-            value = alphabeta(game, state, heuristic, max_depth - 1, alpha, beta)[0]
+            value = alphabeta(game, state, heuristic, max_depth - 1, alpha, beta, transposition_table)[0]
             if value < min_value_action[0]: min_value_action = (value, action)
 
             # considering the two conditions of alpha and beta. they are used
             # to let alpha has the max value of max nodes and beta the min value of min nodes
-            if min_value_action[0] <= alpha: return min_value_action
+            if min_value_action[0] <= alpha: return remember(transposition_table, key, max_depth, min_value_action, Bound.UPPER)
             if min_value_action[0] < beta: beta = min_value_action[0]
-        return min_value_action
+        return remember(transposition_table, key, max_depth, min_value_action, value_bound(min_value_action[0], *window))
 
     max_value_action = (-math.inf, None)
     for state, action in states_actions:
-        value = alphabeta(game, state, heuristic, max_depth - 1, alpha, beta)[0]
+        value = alphabeta(game, state, heuristic, max_depth - 1, alpha, beta, transposition_table)[0]
         if value > max_value_action[0]: max_value_action = (value, action)
-        if max_value_action[0] >= beta: return max_value_action
+        if max_value_action[0] >= beta: return remember(transposition_table, key, max_depth, max_value_action, Bound.LOWER)
         if max_value_action[0] > alpha: alpha = max_value_action[0]
-    return max_value_action
+    return remember(transposition_table, key, max_depth, max_value_action, value_bound(max_value_action[0], *window))
         
 
-# Apply Alpha Beta pruning with move ordering and return the tree value and the best action
-# Hint: Read the hint for minimax.
-def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, alpha: int = -math.inf, beta: int = math.inf) -> Tuple[float, A]:
+# Returns the successors of a state with the actions leading to them in the order they should be searched
+# Without a move orderer, the successors are sorted descendingly based on their heuristic values for the agent whose turn it is
+# (the root action, if any, is always put first). Each successor is generated once and kept with its heuristic value.
+# With a move orderer, the actions are ordered without evaluating the successors (the root action, or else the best action in the
+# transposition table, is put first), then each successor is generated only when it is about to be searched
+# (so no successor is generated for the actions that are pruned).
+def ordered_successors(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int, root_action: Optional[A],
+                       transposition_table: Optional[TranspositionTable], key: Optional[int], move_orderer: Optional[MoveOrderer]) -> Iterable[Tuple[S, A]]:
+    turn = game.get_turn(state)
+    if move_orderer is None:
+        successors_actions = [(game.get_successor(state, action), action) for action in game.get_actions(state)]
+        heuristics_states_actions = sorted([(heuristic(game, successor, turn), successor, action) for successor, action in successors_actions], 
+                                            key = lambda k: (k[2] == root_action, k[0]), reverse = True)
+        return [(successor, action) for _, successor, action in heuristics_states_actions]
+    best_action = root_action
+    if best_action is None and transposition_table is not None: best_action = transposition_table.best_action(key)
+    actions = move_orderer.order(turn, game.get_actions(state), max_depth, best_action)
+    return ((game.get_successor(state, action), action) for action in actions)
+
+# Alpha Beta pruning with move ordering and Principal Variation Search share this function (see both functions below).
+# They only differ in the windows used to search the children: if "principal_variation" is False, every child is searched with the
+# window of the state, otherwise every child after the first one is searched with a null window first.
+def _ordered_search(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int, alpha: float, beta: float,
+                    transposition_table: Optional[TranspositionTable], deadline: Optional[float], root_action: Optional[A],
+                    move_orderer: Optional[MoveOrderer], depth_cutoffs: Optional[DepthCutoffs], principal_variation: bool) -> Tuple[float, A]:
+    if deadline is not None and time.perf_counter() >= deadline: raise SearchTimeout()
+
+    # If the state was already searched at least as deep, reuse its value or narrow the window using its bound
+    count_before = 0 if depth_cutoffs is None else depth_cutoffs.count
+    key = None
+    if transposition_table is not None:
+        key = game.get_hash(state)
+        value_action, alpha, beta = probe_window(transposition_table, key, max_depth, alpha, beta, depth_cutoffs)
+        if value_action is not None: return value_action
+    window = (alpha, beta) # the window used to search this state (needed to know the bound of the result)
     
     # Base cases:
     # if the current state is terminal state, return its tree value
     # if the maximum depth reaches 0, return its heuristic tree  value
     is_terminal, terminal_vals = game.is_terminal(state)
 
-    if is_terminal: return terminal_vals[0], None
-    if max_depth == 0: return heuristic(game, state, 0), None
+    if is_terminal: return remember(transposition_table, key, -1, (terminal_vals[0], None))
+    if max_depth == 0:
+        if depth_cutoffs is not None: depth_cutoffs.count += 1
+        return remember(transposition_table, key, 0, (heuristic(game, state, 0), None))
     
     # This algorithm is exactly like alpha beta but it sorts the successor states from all available actions
     # descendingly based on the heuristic value of each of them. As the descending order of child nodes
     # will lead to more pruning and more optimization
 
-    # Sort children descendingly based on the heuristic values
-    heuristics_states_actions = sorted([(heuristic(game, game.get_successor(state, action), game.get_turn(state)), game.get_successor(state, action), action) 
-                                        for action in game.get_actions(state)], key = lambda k: k[0], reverse = True)
+    turn = game.get_turn(state)
+    states_actions = ordered_successors(game, state, heuristic, max_depth, root_action, transposition_table, key, move_orderer)
 
-    states_actions = [(state, action) for _, state, action in heuristics_states_actions]
+    # A helper to search a child with the given window
+    search_child = lambda child, alpha, beta: _ordered_search(game, child, heuristic, max_depth - 1, alpha, beta, transposition_table, deadline,
+                                                              None, move_orderer, depth_cutoffs, principal_variation)[0]
     
     # Opponent
-    if game.get_turn(state):
+    if turn:
 
         min_value_action = (math.inf, None)
-        for state, action in states_actions:
-            value = alphabeta_with_move_ordering(game, state, heuristic, max_depth - 1, alpha, beta)[0]
+        for index, (child, action) in enumerate(states_actions):
+            if index == 0 or not principal_variation:
+                value = search_child(child, alpha, beta)
+            else:
+                # The null window (the float just below beta, beta) only checks whether the child is lower than beta
+                value = search_child(child, math.nextafter(beta, -math.inf), beta)
+                # If it is lower (and not low enough for a cutoff), search it again to find its exact value
+                # (the null window search proved that the value is at most "value", so it is used as the upper bound of the window)
+                if alpha < value < beta: value = search_child(child, alpha, value)
             if value < min_value_action[0]: min_value_action = (value, action)
-            if min_value_action[0] <= alpha: return min_value_action
+            if min_value_action[0] <= alpha:
+                if move_orderer is not None: move_orderer.cutoff(turn, action, max_depth)
+                return remember(transposition_table, key, cutoff_depth(max_depth, depth_cutoffs, count_before), min_value_action, Bound.UPPER)
             if min_value_action[0] < beta: beta = min_value_action[0]
-        return min_value_action
+        return remember(transposition_table, key, cutoff_depth(max_depth, depth_cutoffs, count_before), min_value_action, value_bound(min_value_action[0], *window))
             
     max_value_action = (-math.inf, None)
-    for state, action in states_actions:
-        value = alphabeta_with_move_ordering(game, state, heuristic, max_depth - 1, alpha, beta)[0]
+    for index, (child, action) in enumerate(states_actions):
+        if index == 0 or not principal_variation:
+            value = search_child(child, alpha, beta)
+        else:
+            # The null window (alpha, the float just above alpha) only checks whether the child is higher than alpha
+            value = search_child(child, alpha, math.nextafter(alpha, math.inf))
+            # If it is higher (and not high enough for a cutoff), search it again to find its exact value
+            # (the null window search proved that the value is at least "value", so it is used as the lower bound of the window)
+            if alpha < value < beta: value = search_child(child, value, beta)
         if value > max_value_action[0]: max_value_action = (value, action)
-        if max_value_action[0] >= beta: return max_value_action
+        if max_value_action[0] >= beta:
+            if move_orderer is not None: move_orderer.cutoff(turn, action, max_depth)
+            return remember(transposition_table, key, cutoff_depth(max_depth, depth_cutoffs, count_before), max_value_action, Bound.LOWER)
         if max_value_action[0] > alpha: alpha = max_value_action[0]
-    return max_value_action
+    return remember(transposition_table, key, cutoff_depth(max_depth, depth_cutoffs, count_before), max_value_action, value_bound(max_value_action[0], *window))
+
+# Apply Alpha Beta pruning with move ordering and return the tree value and the best action
+# Hint: Read the hint for minimax.
+# The function can optionally receive:
+# - deadline: a time (in the time.perf_counter clock) after which the search is aborted by raising SearchTimeout.
+# - root_action: an action that is searched first at the given state regardless of its heuristic value
+#                (e.g. the best action found by a previous shallower search).
+# - move_orderer: if given, the actions are ordered by the move orderer (killer moves and history) instead of the heuristic
+#                 value of the successors, so the heuristic is only evaluated at the depth cutoff. If a transposition table is
+#                 also given, the best action stored for the state is searched first.
+# - depth_cutoffs: if given, the depth cutoffs are counted in it (see "DepthCutoffs"), and the states searched without any depth
+#                  cutoff below them are stored in the transposition table as searched without a depth limit.
+def alphabeta_with_move_ordering(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, alpha: int = -math.inf, beta: int = math.inf,
+                                 transposition_table: Optional[TranspositionTable] = None, deadline: Optional[float] = None,
+                                 root_action: Optional[A] = None, move_orderer: Optional[MoveOrderer] = None,
+                                 depth_cutoffs: Optional[DepthCutoffs] = None) -> Tuple[float, A]:
+    return _ordered_search(game, state, heuristic, max_depth, alpha, beta, transposition_table, deadline, root_action,
+                           move_orderer, depth_cutoffs, principal_variation = False)
+
+# Apply Principal Variation Search (NegaScout) and return the tree value and the best action
+# It orders the successors like alpha beta with move ordering (and receives the same optional arguments), then it assumes that
+# the first successor is the best one: it searches the first successor with the full window, then it only checks that each of the
+# remaining successors is not better using a null window (a window that contains no values, so the search only proves a bound
+# and prunes much more). If a successor turns out to be better, it is searched again with the full window to get its value.
+def principal_variation_search(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, alpha: int = -math.inf, beta: int = math.inf,
+                               transposition_table: Optional[TranspositionTable] = None, deadline: Optional[float] = None,
+                               root_action: Optional[A] = None, move_orderer: Optional[MoveOrderer] = None,
+                               depth_cutoffs: Optional[DepthCutoffs] = None) -> Tuple[float, A]:
+    return _ordered_search(game, state, heuristic, max_depth, alpha, beta, transposition_table, deadline, root_action,
+                           move_orderer, depth_cutoffs, principal_variation = True)
+
+# Searches a state using an aspiration window: a narrow window around the expected value (e.g. the value found by the previous iteration)
+# which prunes more than the full window as long as the value falls inside it.
+# If the value falls outside the window, the search failed and only found a bound, so the state is searched again
+# with the window opened on the side where the search failed.
+def aspiration_search(search_fn: Callable, game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int, 
+                      expected: float, window: float, **kwargs) -> Tuple[float, A]:
+    alpha, beta = expected - window, expected + window
+    if not math.isfinite(expected): alpha, beta = -math.inf, math.inf
+    while True:
+        value_action = search_fn(game, state, heuristic, max_depth, alpha, beta, **kwargs)
+        if value_action[0] <= alpha and alpha != -math.inf: alpha = -math.inf
+        elif value_action[0] >= beta and beta != math.inf: beta = math.inf
+        else: return value_action
+
+# Apply Alpha Beta pruning with move ordering iteratively with an increasing depth (1, 2, 3, ...) until the maximum depth is reached
+# or the time limit (in seconds) passes, and return the result of the deepest search that was completed.
+# Each iteration searches the best action of the previous iteration first, which usually leads to more pruning.
+# The first iteration is never interrupted, so an action is always returned even if the time limit is very small.
+# If there is no depth limit (max_depth = -1), the iterations continue until the time limit passes,
+# and if there is no time limit either, a single search is done without a depth limit.
+# The iterations also stop as soon as an iteration has no depth cutoff (see "DepthCutoffs"), since it already searched the whole tree.
+# If a move orderer is given, its killer moves and history are shared by all the iterations (and aged before the search starts).
+# The function can optionally receive:
+# - search_fn: the search function used by each iteration (alphabeta_with_move_ordering or principal_variation_search).
+# - aspiration_window: if given, each iteration (except the first) uses an aspiration window of this size (on each side)
+#                      around the value found by the previous iteration.
+def iterative_deepening(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, time_limit: Optional[float] = None,
+                        transposition_table: Optional[TranspositionTable] = None, move_orderer: Optional[MoveOrderer] = None,
+                        search_fn: Callable = alphabeta_with_move_ordering, aspiration_window: Optional[float] = None) -> Tuple[float, A]:
+    if move_orderer is not None: move_orderer.age()
+    if max_depth == 0 or (max_depth < 0 and time_limit is None):
+        return search_fn(game, state, heuristic, max_depth, transposition_table = transposition_table, move_orderer = move_orderer)
+    deadline = None if time_limit is None else time.perf_counter() + time_limit
+    
+    depth = 1
+    depth_cutoffs = DepthCutoffs()
+    value_action = search_fn(game, state, heuristic, depth, transposition_table = transposition_table, move_orderer = move_orderer,
+                             depth_cutoffs = depth_cutoffs)
+    while (max_depth < 0 or depth < max_depth) and depth_cutoffs.count > 0:
+        depth += 1
+        depth_cutoffs = DepthCutoffs()
+        kwargs = dict(transposition_table = transposition_table, deadline = deadline, root_action = value_action[1], move_orderer = move_orderer,
+                      depth_cutoffs = depth_cutoffs)
+        try:
+            if aspiration_window is None:
+                value_action = search_fn(game, state, heuristic, depth, **kwargs)
+            else:
+                value_action = aspiration_search(search_fn, game, state, heuristic, depth, value_action[0], aspiration_window, **kwargs)
+        except SearchTimeout:
+            break
+    return value_action
+
+# The following functions and class implement a root-parallel alpha beta search (Young Brothers Wait):
+# The first action at the root (the eldest brother) is searched alone to get a bound, then the remaining actions
+# (the younger brothers) are searched at the same time by a pool of worker processes.
+# The workers share the best value found so far at the root through a shared memory value, so each task starts with
+# the tightest bound known at the time it starts. The results are then combined such that the returned value and action
+# are exactly the same as the ones returned by the sequential alpha beta search.
+
+# The state of each worker process (set once when the process starts)
+_worker_game: Optional[Game] = None
+_worker_bound = None # The best root value found so far (negated if the root is a min node, so that higher is always better)
+
+def _init_worker(game: Game, bound) -> None:
+    global _worker_game, _worker_bound
+    _worker_game, _worker_bound = game, bound
+
+# Clears the calls of "is_terminal" tracked (counted or recorded) in a worker. They are only read in the main process,
+# so they would otherwise accumulate in the worker for as long as the pool lives.
+def _clear_tracked_calls(game: Game) -> None:
+    is_terminal = type(game).is_terminal
+    calls = getattr(is_terminal, "calls", None)
+    if isinstance(calls, int): fetch_tracked_call_count(is_terminal)
+    elif calls is not None: fetch_recorded_calls(is_terminal)
+
+# Searches a child of the root using the shared bound and returns its value and the bound that was used
+# If "sign * value > bound", the value is exact. Otherwise, it is only an upper bound (sign * true value <= sign * value <= bound)
+def _search_child(state: S, heuristic: HeuristicFunction, max_depth: int, sign: int) -> Tuple[float, float]:
+    _clear_tracked_calls(_worker_game)
+    bound = _worker_bound.value
+    if sign > 0: value = alphabeta(_worker_game, state, heuristic, max_depth, alpha = bound)[0]
+    else: value = alphabeta(_worker_game, state, heuristic, max_depth, beta = -bound)[0]
+    if sign * value > bound:
+        with _worker_bound.get_lock():
+            if sign * value > _worker_bound.value: _worker_bound.value = sign * value
+    return value, bound
+
+# A search function (usable by the SearchAgent) that applies root-parallel alpha beta search
+# The worker processes are kept alive between searches as long as the same game is searched, so it should be closed
+# after use (or used in a "with" block). The heuristic must be picklable (e.g. a function defined at the module level).
+# Note: the nodes explored by the workers are not counted in the calls tracked in this process.
+# Experimental: on the only machine it was measured on (a single CPU), it is slower than "alphabeta" since the workers
+# cannot run at the same time and the bound is shared between processes. It has not been measured on several cores yet.
+class ParallelAlphaBeta:
+    workers: int # The number of worker processes
+    game: Optional[Game] # The game the worker processes were started for
+    executor: Optional[ProcessPoolExecutor]
+    bound: Any # The shared best root value (a multiprocessing.Value)
+
+    def __init__(self, workers: Optional[int] = None) -> None:
+        self.workers = workers or os.cpu_count()
+        self.game = self.executor = self.bound = None
+
+    def __enter__(self) -> 'ParallelAlphaBeta':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    # Start the worker processes (they receive a copy of the game once when they start)
+    def start(self, game: Game) -> None:
+        if self.game is game: return
+        self.close()
+        self.bound = multiprocessing.Value('d', -math.inf)
+        self.executor = ProcessPoolExecutor(self.workers, initializer = _init_worker, initargs = (game, self.bound))
+        self.game = game
+
+    # Stop the worker processes
+    def close(self) -> None:
+        if self.executor is not None: self.executor.shutdown()
+        self.game = self.executor = self.bound = None
+
+    def __call__(self, game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+        is_terminal, terminal_vals = game.is_terminal(state)
+        if is_terminal: return terminal_vals[0], None
+        if max_depth == 0: return heuristic(game, state, 0), None
+
+        # The values are multiplied by the sign so that the root is always a max node
+        sign = -1 if game.get_turn(state) else 1
+        states_actions = [(game.get_successor(state, action), action) for action in game.get_actions(state)]
+
+        # Search the eldest brother alone (its value is exact since it is searched with a full window)
+        values = [alphabeta(game, states_actions[0][0], heuristic, max_depth - 1)[0]]
+        exact = [True]
+        # The sequential search stops if the value cannot be improved
+        if sign * values[0] == math.inf: return values[0], states_actions[0][1]
+        
+        if len(states_actions) > 1:
+            self.start(game)
+            self.bound.value = sign * values[0]
+            futures = [self.executor.submit(_search_child, child, heuristic, max_depth - 1, sign) for child, _ in states_actions[1:]]
+            for future in futures:
+                value, bound = future.result()
+                values.append(value)
+                exact.append(sign * value > bound)
+        
+        best = max(sign * value for value, is_exact in zip(values, exact) if is_exact)
+        # The sequential search only picks an action whose value is better than -infinity
+        if best == -math.inf: return sign * best, None
+        # The sequential search picks the first action that has the best value. An action that failed low may still have
+        # the best value (if its bound was equal to it), so it is searched again with a window that only excludes lower values
+        for (child, action), value, is_exact in zip(states_actions, values, exact):
+            if sign * value != best: continue
+            if not is_exact:
+                if sign > 0: value = alphabeta(game, child, heuristic, max_depth - 1, alpha = math.nextafter(best, -math.inf))[0]
+                else: value = alphabeta(game, child, heuristic, max_depth - 1, beta = -math.nextafter(best, -math.inf))[0]
+                if sign * value != best: continue
+            return sign * best, action
+
+# Apply root-parallel alpha beta search using the given number of worker processes (by default, the number of CPUs)
+# This search is experimental (see ParallelAlphaBeta)
+# It returns the same value and action as "alphabeta"
+def parallel_alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, 
+                       workers: Optional[int] = None) -> Tuple[float, A]:
+    with ParallelAlphaBeta(workers) as search:
+        return search(game, state, heuristic, max_depth)
 
 # Apply Expectimax search and return the tree value and the best action
 # Hint: Read the hint for minimax, but note that the monsters (turn > 0) do not act as min nodes anymore,
 # they now act as chance nodes (they act randomly).
-def expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1) -> Tuple[float, A]:
+def expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, 
+               transposition_table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    # If the state was already searched at least as deep, reuse its value
+    key = None
+    if transposition_table is not None:
+        key = game.get_hash(state)
+        entry = transposition_table.probe(key, max_depth)
+        if entry is not None: return entry.value, entry.action
+
     # Base cases:
     # if the current state is terminal state, return its tree value
     # if the maximum depth reaches 0, return its heuristic tree  value
     is_terminal, terminal_vals = game.is_terminal(state)
 
-    if is_terminal: return terminal_vals[0], None
-    if max_depth == 0: return heuristic(game, state, 0), None
+    if is_terminal: return remember(transposition_table, key, -1, (terminal_vals[0], None))
+    if max_depth == 0: return remember(transposition_table, key, 0, (heuristic(game, state, 0), None))
 
     # you get the all expectimax values of all successor states and then 
     # maximize the values if it is a max node, or average the values if it is not max node (chance node)
-    values_actions = [(expectimax(game, game.get_successor(state, action), heuristic, max_depth - 1)[0], action) 
+    values_actions = [(expectimax(game, game.get_successor(state, action), heuristic, max_depth - 1, transposition_table)[0], action) 
                         for action in game.get_actions(state)]
 
-    return (max(values_actions, key = lambda k: k[0]) 
-            if game.get_turn(state) == 0 
-            else (sum(list(zip(*values_actions))[0]) / len(values_actions), None))
\ No newline at end of file
+    return remember(transposition_table, key, max_depth, 
+                    max(values_actions, key = lambda k: k[0]) 
+                    if game.get_turn(state) == 0 
+                    else (sum(list(zip(*values_actions))[0]) / len(values_actions), None))
+
+# Apply Sparse Sampling Expectimax search and return the tree value and the best action
+# Like expectimax, the monsters (turn > 0) act as chance nodes, but instead of averaging the values of all their actions,
+# the value of a chance node is estimated from a fixed number of sampled actions. So the work per chance node does not grow
+# with the number of actions (and with "compound", not with the number of monsters either).
+# The function can optionally receive:
+# - samples: the maximum number of samples at each chance node. If a chance node has no more outcomes than this number,
+#            all its outcomes are enumerated (so the value is exact and equal to the expectimax value).
+# - tolerance: if given, a chance node stops sampling (after at least 3 samples) once the 95% confidence interval of
+#              its value is within +/- tolerance of the mean.
+# - compound: if True, the actions of all the monsters that play between two player turns are merged into one chance node
+#             whose outcomes are the joint actions of all the monsters. Then the depth counts the player moves (each followed by
+#             the response of all the monsters) instead of plies.
+# - seed: the seed of the random generator used to sample the actions (the search is reproducible for the same seed).
+# - rng: the random generator used to sample the actions. If it is not given, a new generator is created with the seed, so an agent
+#        that searches at every move should pass the same generator each time (otherwise every move draws the same samples).
+# The states of a chance node are generated once (when its outcomes are counted or sampled), and "is_terminal" is called once
+# for each state that is searched, like expectimax does.
+def sparse_expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, samples: int = 8,
+                      tolerance: Optional[float] = None, compound: bool = False, seed: int = 0,
+                      rng: Optional[RandomGenerator] = None) -> Tuple[float, A]:
+    if rng is None: rng = RandomGenerator(seed)
+    Terminal = Tuple[bool, Optional[List[float]]]
+
+    # "terminal" is the result of "is_terminal" for the state if it was already computed
+    def search(state: S, max_depth: int, terminal: Optional[Terminal] = None) -> Tuple[float, A]:
+        is_terminal, terminal_vals = game.is_terminal(state) if terminal is None else terminal
+        if is_terminal: return terminal_vals[0], None
+        if max_depth == 0: return heuristic(game, state, 0), None
+
+        if game.get_turn(state) == 0:
+            # A player move followed by a compound chance node only counts when the chance node is searched
+            # (so the depth cutoff is applied after the monsters respond to the move)
+            def child_value(child: S) -> float:
+                return search(child, max_depth if compound and game.get_turn(child) != 0 else max_depth - 1)[0]
+            return max(((child_value(game.get_successor(state, action)), action) for action in game.get_actions(state)), key = lambda k: k[0])
+        
+        child_depth = max_depth - 1
+        # The states of the chance node are kept by the indices of the actions that lead to them from the chance node (the empty path),
+        # so the states generated while counting the outcomes are reused by the sampling. For each state, the list holds:
+        # the state, its "is_terminal" result (only checked inside a compound chance node, to know if the next monster plays) and its actions
+        nodes = {(): [state, None, None]}
+        def node(path: Tuple[int, ...]) -> list:
+            entry = nodes.get(path)
+            if entry is None:
+                parent = node(path[:-1])
+                child = game.get_successor(parent[0], actions(parent)[path[-1]])
+                entry = nodes[path] = [child, game.is_terminal(child) if compound and game.get_turn(child) != 0 else None, None]
+            return entry
+        def actions(entry: list) -> List[A]:
+            if entry[2] is None: entry[2] = game.get_actions(entry[0])
+            return entry[2]
+        # A state is an outcome of the chance node unless a monster still has to play in the compound chance node
+        def is_outcome(entry: list) -> bool:
+            return entry[1] is None or entry[1][0]
+        def outcome_value(path: Tuple[int, ...]) -> float:
+            entry = node(path)
+            return search(entry[0], child_depth, entry[1])[0]
+
+        # Returns the outcomes of the chance node as a list of (path, outcomes) where "outcomes" is None if the state is a final outcome,
+        # or the outcomes of the next monster if it is a compound chance node and the next monster still has to play
+        # Returns None if there are more than "samples" final outcomes
+        total = 0
+        def expand(path: Tuple[int, ...]) -> Optional[List[Tuple[Tuple[int, ...], Optional[List]]]]:
+            nonlocal total
+            results = []
+            for index in range(len(actions(node(path)))):
+                child = path + (index,)
+                if is_outcome(node(child)):
+                    total += 1
+                    if total > samples: return None
+                    results.append((child, None))
+                else:
+                    nested = expand(child)
+                    if nested is None: return None
+                    results.append((child, nested))
+            return results
+
+        # If there are few outcomes, average all of them (like expectimax does at every monster ply)
+        def average(results: List[Tuple[Tuple[int, ...], Optional[List]]]) -> float:
+            return sum(outcome_value(path) if nested is None else average(nested) for path, nested in results) / len(results)
+        exact = expand(())
+        if exact is not None: return average(exact), None
+
+        # Returns the path of the outcome of a random action of the monster (or a random joint action of all the monsters if compound)
+        def sample() -> Tuple[int, ...]:
+            path = ()
+            while True:
+                path += (rng.int(0, len(actions(node(path)))-1),)
+                if is_outcome(node(path)): return path
+        
+        values = []
+        while len(values) < samples:
+            values.append(outcome_value(sample()))
+            if tolerance is not None and len(values) >= 3:
+                mean = sum(values) / len(values)
+                variance = sum((value - mean) ** 2 for value in values) / (len(values) - 1)
+                if 1.96 * math.sqrt(variance / len(values)) <= tolerance: break
+        return sum(values) / len(values), None
+
+    return search(state, max_depth)
@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Tuple
+from game import HeuristicFunction, Game, S, A
+from transposition import Bound, TranspositionTable
+from search import remember, value_bound, probe_window
+import math
+
+# This file contains versions of minimax, alpha beta and expectimax (from search.py) that keep the path being searched in
+# an explicit stack instead of the Python call stack. So there is no recursion limit on the search depth (e.g. unbounded
+# searches with max_depth = -1 on long games), and no Python function call is paid for each explored node.
+# They return the same values and actions, and they explore the states in the same order as the recursive versions
+# (so the recorded calls to "is_terminal" are the same). They also receive the same optional transposition table.
+
+# Marks the end of the actions of a frame
+_DONE = object()
+
+# A state whose children are being searched
+@dataclass
+class Frame:
+    __slots__ = ('state', 'max_depth', 'key', 'successors', 'action', 'results', 'turn', 'alpha', 'beta', 'window', 'best')
+    state: Any
+    max_depth: int
+    key: Optional[int]
+    successors: Iterator[Tuple[Any, Any]]   # the (successor, action) pairs that are not searched yet
+    action: Any                             # the action of the child being searched
+    results: List[Tuple[float, Any]]        # the (value, action) of each searched child (minimax and expectimax)
+    turn: int
+    alpha: float                            # the window of the state (alpha beta only)
+    beta: float
+    window: Tuple[float, float]             # the window the state was entered with (to know the bound of its value)
+    best: Tuple[float, Any]                 # the best (value, action) found so far (alpha beta only)
+
+# Returns the lazily generated (successor, action) pairs of a state (like the list comprehensions of minimax and expectimax)
+def _lazy_successors(game: Game[S, A], state: S) -> Iterator[Tuple[S, A]]:
+    return ((game.get_successor(state, action), action) for action in game.get_actions(state))
+
+# The shared loop of minimax and expectimax: they only differ in how the values of the children are combined at the other agents' nodes
+def _full_width_search(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int,
+                       transposition_table: Optional[TranspositionTable], chance: bool) -> Tuple[float, A]:
+    stack: List[Frame] = []
+
+    # Returns the result of a state if it needs no search (stored, terminal or at the depth cutoff), otherwise pushes its frame
+    def enter(state: S, max_depth: int) -> Optional[Tuple[float, A]]:
+        key = None
+        if transposition_table is not None:
+            key = game.get_hash(state)
+            entry = transposition_table.probe(key, max_depth)
+            if entry is not None: return entry.value, entry.action
+        is_terminal, terminal_vals = game.is_terminal(state)
+        if is_terminal: return remember(transposition_table, key, -1, (terminal_vals[0], None))
+        if max_depth == 0: return remember(transposition_table, key, 0, (heuristic(game, state, 0), None))
+        stack.append(Frame(state, max_depth, key, _lazy_successors(game, state), None, [], 0, 0, 0, None, None))
+        return None
+
+    result = enter(state, max_depth)
+    while stack:
+        frame = stack[-1]
+        if result is not None: frame.results.append((result[0], frame.action))
+        successor, frame.action = next(frame.successors, (None, _DONE))
+        if frame.action is not _DONE:
+            result = enter(successor, frame.max_depth - 1)
+            continue
+        stack.pop()
+        values_actions = frame.results
+        if game.get_turn(frame.state) == 0:
+            value_action = max(values_actions, key = lambda k: k[0])
+        elif chance:
+            value_action = (sum(list(zip(*values_actions))[0]) / len(values_actions), None)
+        else:
+            value_action = min(values_actions, key = lambda k: k[0])
+        result = remember(transposition_table, frame.key, frame.max_depth, value_action)
+    return result
+
+# Apply Minimax search and return the game tree value and the best action (see "search.minimax")
+def minimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1,
+            transposition_table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    return _full_width_search(game, state, heuristic, max_depth, transposition_table, False)
+
+# Apply Expectimax search and return the tree value and the best action (see "search.expectimax")
+def expectimax(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1,
+               transposition_table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    return _full_width_search(game, state, heuristic, max_depth, transposition_table, True)
+
+# Apply Alpha Beta pruning and return the tree value and the best action (see "search.alphabeta")
+def alphabeta(game: Game[S, A], state: S, heuristic: HeuristicFunction, max_depth: int = -1, alpha: int = -math.inf, beta: int = math.inf,
+              transposition_table: Optional[TranspositionTable] = None) -> Tuple[float, A]:
+    stack: List[Frame] = []
+
+    # Returns the result of a state if it needs no search (stored, terminal or at the depth cutoff), otherwise pushes its frame
+    def enter(state: S, max_depth: int, alpha: float, beta: float) -> Optional[Tuple[float, A]]:
+        key = None
+        if transposition_table is not None:
+            key = game.get_hash(state)
+            value_action, alpha, beta = probe_window(transposition_table, key, max_depth, alpha, beta)
+            if value_action is not None: return value_action
+        is_terminal, terminal_vals = game.is_terminal(state)
+        if is_terminal: return remember(transposition_table, key, -1, (terminal_vals[0], None))
+        if max_depth == 0: return remember(transposition_table, key, 0, (heuristic(game, state, 0), None))
+        # Like the recursive version, all the successors are generated before the first one is searched
+        successors = iter([(game.get_successor(state, action), action) for action in game.get_actions(state)])
+        turn = game.get_turn(state)
+        best = (math.inf, None) if turn else (-math.inf, None)
+        stack.append(Frame(state, max_depth, key, successors, None, None, turn, alpha, beta, (alpha, beta), best))
+        return None
+
+    result = enter(state, max_depth, alpha, beta)
+    while stack:
+        frame = stack[-1]
+        if result is not None:
+            value = result[0]
+            if frame.turn:
+                if value < frame.best[0]: frame.best = (value, frame.action)
+                if frame.best[0] <= frame.alpha:
+                    stack.pop()
+                    result = remember(transposition_table, frame.key, frame.max_depth, frame.best, Bound.UPPER)
+                    continue
+                if frame.best[0] < frame.beta: frame.beta = frame.best[0]
+            else:
+                if value > frame.best[0]: frame.best = (value, frame.action)
+                if frame.best[0] >= frame.beta:
+                    stack.pop()
+                    result = remember(transposition_table, frame.key, frame.max_depth, frame.best, Bound.LOWER)
+                    continue
+                if frame.best[0] > frame.alpha: frame.alpha = frame.best[0]
+        successor, frame.action = next(frame.successors, (None, _DONE))
+        if frame.action is not _DONE:
+            result = enter(successor, frame.max_depth - 1, frame.alpha, frame.beta)
+            continue
+        stack.pop()
+        result = remember(transposition_table, frame.key, frame.max_depth, frame.best, value_bound(frame.best[0], *frame.window))
+    return result
@@ -1,5 +1,5 @@
 from typing import Dict
-from CSP import Assignment, Problem, UnaryConstraint, BinaryConstraint
+from CSP import AllDifferentConstraint, Assignment, Problem, UnaryConstraint
 
 # A class for the sudoku problem which inherits from the generic CSP problem class
 class SudokuProblem(Problem):
@@ -18,10 +18,11 @@ class SudokuProblem(Problem):
         return separator.join('\n'.join(group) for group in group_elements(lines, cell_dim))
 
     # Read a sudoku puzzle from a string
+    # Each row, column and square is an all-different constraint on its empty cells,
+    # and each empty cell has one unary constraint that excludes the clues in its row, column and square.
     @staticmethod
     def from_text(text: str) -> 'SudokuProblem':
-        not_equal_condition = lambda a, b: a != b
-        unary_not_equal_condition = lambda f: (lambda v: v != f)
+        unary_not_in_condition = lambda fixed: (lambda v: v not in fixed)
         
         lines = [line.strip() for line in text.splitlines()]
         lines = [line.replace('| ', '').split() for line in lines if len(line) != 0 and not line.startswith('-')]
@@ -59,17 +60,15 @@ class SudokuProblem(Problem):
         
         constraints = []
 
-        var_fixed_pairs = [
-            (vars_in_rows, fixed_in_rows),
-            (vars_in_cols, fixed_in_cols),
-            (vars_in_sqrs, fixed_in_sqrs)
-        ]
+        for r, line in enumerate(lines):
+            for c, cell in enumerate(line):
+                if cell != '.': continue
+                s = (r//cell_dim) * cell_dim + (c//cell_dim)
+                fixed = {*fixed_in_rows[r], *fixed_in_cols[c], *fixed_in_sqrs[s]}
+                if fixed: constraints.append(UnaryConstraint(str((r, c)), unary_not_in_condition(frozenset(fixed))))
 
-        for pair in var_fixed_pairs:
-            for var_list, fixed_list in zip(*pair):
-                for index, variable in enumerate(var_list):
-                   constraints.extend(UnaryConstraint(variable, unary_not_equal_condition(fixed)) for fixed in fixed_list)
-                   constraints.extend(BinaryConstraint((variable, other), not_equal_condition) for other in var_list[index+1:])
+        for var_lists in (vars_in_rows, vars_in_cols, vars_in_sqrs):
+            constraints.extend(AllDifferentConstraint(var_list) for var_list in var_lists if len(var_list) > 1)
         
         problem = SudokuProblem()
         problem.size = size
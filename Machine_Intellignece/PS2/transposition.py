@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Hashable, Optional
+import math
+
+from helpers.mt19937 import RandomGenerator
+
+# This file contains the tools needed to detect transpositions (the same state reached through different move orders)
+# during adversarial search, so that the value of a state can be reused instead of searching it again.
+
+# Zobrist keys assign a random 64-bit number to every feature a state can have (e.g. "the player is at (3, 4)")
+# The hash of a state is the XOR of the keys of all its features, so when a move changes a few features,
+# the hash can be updated incrementally by XORing out the old features and XORing in the new ones.
+# Keys are generated lazily the first time a feature is requested, so the set of features does not need to be known in advance.
+class ZobristKeys:
+    rng: RandomGenerator # The random generator used to create the keys (seeded so that hashes are reproducible)
+    keys: Dict[Hashable, int] # The key of each feature requested so far
+
+    def __init__(self, seed: int = 0) -> None:
+        self.rng = RandomGenerator(seed)
+        self.keys = {}
+
+    # Returns the key of the given feature (a feature can be any hashable value such as a tuple)
+    def __getitem__(self, feature: Hashable) -> int:
+        key = self.keys.get(feature)
+        if key is None:
+            # Combine two 32-bit numbers to get a 64-bit key
+            key = (self.rng.generate() << 32) | self.rng.generate()
+            self.keys[feature] = key
+        return key
+
+# This enum represents how the stored value relates to the true value of the state
+# EXACT: the stored value is the true value (no cutoff happened while searching the state)
+# LOWER: the true value is >= the stored value (the search failed high, e.g. a beta cutoff at a max node)
+# UPPER: the true value is <= the stored value (the search failed low, e.g. an alpha cutoff at a min node)
+class Bound(str, Enum):
+    EXACT = "exact"
+    LOWER = "lower"
+    UPPER = "upper"
+
+# An entry in the transposition table
+@dataclass
+class TranspositionEntry:
+    value: float    # The value found by the search
+    depth: float    # The remaining search depth below the state when it was searched (math.inf if there was no depth limit)
+    bound: Bound    # How the value relates to the true value
+    action: Any     # The best action found for the state (or None if the state was not expanded)
+
+# Converts a "max_depth" as used by the search functions to the depth stored in the table
+# where a negative max_depth means that the search has no depth limit
+def search_depth(max_depth: int) -> float:
+    return math.inf if max_depth < 0 else max_depth
+
+# A size-bounded transposition table that maps a state hash to the result of searching that state
+# When the table is full, the oldest entry is evicted (dictionaries keep the insertion order)
+class TranspositionTable:
+    capacity: int # The maximum number of entries in the table
+    entries: Dict[int, TranspositionEntry]
+    hits: int # The number of probes that found a usable entry
+    misses: int # The number of probes that did not find a usable entry
+
+    def __init__(self, capacity: int = 1 << 20) -> None:
+        self.capacity = capacity
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    # Returns the entry stored for the given hash if it was searched at least as deep as "max_depth", otherwise returns None
+    def probe(self, key: int, max_depth: int) -> Optional[TranspositionEntry]:
+        entry = self.entries.get(key)
+        if entry is None or entry.depth < search_depth(max_depth):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    # Returns the best action stored for the given hash regardless of the depth it was searched to (or None if there is no entry)
+    def best_action(self, key: int) -> Any:
+        entry = self.entries.get(key)
+        return None if entry is None else entry.action
+
+    # Stores the result of searching a state
+    # An existing entry for the same state is only replaced by a search that is at least as deep
+    def store(self, key: int, max_depth: int, value: float, bound: Bound, action: Any) -> None:
+        depth = search_depth(max_depth)
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.depth > depth: return
+            del self.entries[key] # re-insert it to mark it as the newest entry
+        elif len(self.entries) >= self.capacity:
+            del self.entries[next(iter(self.entries))] # evict the oldest entry
+        self.entries[key] = TranspositionEntry(value, depth, bound, action)
+
+    # Removes all the entries and resets the statistics
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -1,5 +1,5 @@
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from game import Game
 import json
 
@@ -21,35 +21,45 @@ PREPAD_ONE    = lambda l: prepad(l, HORIZONTAL, EMPTY)
 PREPAD_MIDDLE = lambda l: prepad(l, BRANCH_BOTH, CONTINUE_DOWN)
 PREPAD_LAST   = lambda l: prepad(l, BRANCH_END, EMPTY)
 
+# Aggregates of the terminal values in the subtree of a node
+@dataclass
+class TreeStats:
+    mean: float     # The average of the children's means (the value of the node itself if it is terminal)
+    leaves: int     # The number of terminal nodes in the subtree
+    lowest: float   # The lowest terminal value in the subtree
+    highest: float  # The highest terminal value in the subtree
+
+# a function used for drawing the tree (it works for any node that has a "name", "children" and "value")
+def recursive_str(node, is_root: bool) -> List[str]:
+    name = node.name
+    if not is_root:
+        _, name = name.rsplit("/", 1)
+    if node.children is None:
+        return [f'{name}: {node.value}']
+    else:
+        prepads = [PREPAD_MIDDLE] * len(node.children)
+        if len(prepads) == 1:
+            prepads[0] = PREPAD_ONE
+        else:
+            prepads[0] = PREPAD_FIRST
+            prepads[-1] = PREPAD_LAST
+        lines = [line for prepad, child in zip(prepads, node.children.values()) for line in prepad(recursive_str(child, False))]
+        return prepad(lines, name, ' '*len(name))
+
 # A tree node class that store the node name and the following:
 # If the node is nonterminal, the children are stored in "children"
 # If the node is terminal, its value is stored in "value" while "children" will contain None
+# The "stats" of the node are computed the first time the tree heuristic needs them (they are None until then)
 @dataclass
 class TreeNode:
     name: str
     children: Optional[Dict[str, 'TreeNode']]
     value: float
+    stats: Optional[TreeStats] = field(default=None, compare=False, repr=False)
 
-    # a private method used for drawing the tree
-    def __recursive_str(self, is_root: bool):
-        name = self.name
-        if not is_root:
-            _, name = name.rsplit("/", 1)
-        if self.children is None:
-            return [f'{name}: {self.value}']
-        else:
-            prepads = [PREPAD_MIDDLE] * len(self.children)
-            if len(prepads) == 1:
-                prepads[0] = PREPAD_ONE
-            else:
-                prepads[0] = PREPAD_FIRST
-                prepads[-1] = PREPAD_LAST
-            lines = [line for prepad, child in zip(prepads, self.children.values()) for line in prepad(child.__recursive_str(False))]
-            return prepad(lines, name, ' '*len(name))
-    
     # draw a tree as a string
     def __str__(self) -> str:
-        return '\n'.join(self.__recursive_str(True))
+        return '\n'.join(recursive_str(self, True))
     
     # read a tree from a file
     @staticmethod
@@ -105,20 +115,39 @@ class TreeGame(Game[List, str]):
     # Given a state and an action, this function returns the next state 
     def get_successor(self, state: TreeNode, action: str) -> TreeNode:
         return state.children[action]
-    
+
+    # Every node has a unique name (its path from the root), so the name identifies the state
+    def get_hash(self, state: TreeNode) -> int:
+        return hash(state.name)
+
     # create a tree game from a path to a tree file
     @staticmethod
     def from_file(path: str) -> 'TreeGame':
         return TreeGame(TreeNode.from_file(path))
 
+# Computes the stats of every node in the tree in one bottom-up pass (without recursion, so deep trees are supported)
+# The nodes are listed in preorder (every parent before its children), then the list is processed in the reverse order
+# The subtrees whose stats were already computed are skipped
+def compute_stats(root: TreeNode) -> None:
+    nodes, stack = [], [root]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        if node.children is not None: stack.extend(child for child in node.children.values() if child.stats is None)
+    for node in reversed(nodes):
+        if node.children is None:
+            node.stats = TreeStats(node.value, 1, node.value, node.value)
+            continue
+        children = [child.stats for child in node.children.values()]
+        node.stats = TreeStats(sum([child.mean for child in children])/len(children), sum([child.leaves for child in children]),
+                               min([child.lowest for child in children]), max([child.highest for child in children]))
+
 # This heuristic is unrealistic but so is the tree game (we rarely have the whole game tree stored in memory)
 # We will use it for the ordering in Alpha Beta with Move Ordering
+# It returns the mean stored in the node stats (the average of the children's means), which is computed the first time
+# the heuristic is called on the node or one of its ancestors
 def tree_heuristic(game: TreeGame, state: TreeNode, agent: int):
-    def recursive_sum(state: TreeNode):
-        if state.children is None:
-            return state.value
-        else:
-            return sum(recursive_sum(child) for child in state.children.values())/len(state.children)
-    value = recursive_sum(state)
+    if state.stats is None: compute_stats(state)
+    value = state.stats.mean
     if agent != 0: value = -value
     return value
\ No newline at end of file
@@ -2,9 +2,19 @@ from typing import Dict, List, Optional, Set, Tuple
 from mdp import MarkovDecisionProcess
 from environment import Environment
 from mathutils import Point, Direction
-from helpers.mt19937 import RandomGenerator
+from helpers.mt19937 import RandomGenerator, AliasTable
+from dataclasses import dataclass
+from itertools import accumulate
 import json
 
+# The precomputed distribution of the next states for a (state, action) pair
+# It is used by the environment to sample the next state without calling "get_successor" on every step
+@dataclass
+class Transition:
+    next_states: List[Point]    # the possible next states in the same order as "get_successor"
+    cumulative: List[float]     # the cumulative sums of their probabilities (for RandomGenerator.sample_cumulative)
+    alias_table: AliasTable     # an alias table of their probabilities (for RandomGenerator.sample_alias)
+
 # The grid markov decision process similar to the one described in the course book
 class GridMDP(MarkovDecisionProcess[Point, Direction]):
     
@@ -27,6 +37,16 @@ class GridMDP(MarkovDecisionProcess[Point, Direction]):
         self.rewards = rewards
         self.noise = noise
 
+    # The transitions depend on the noise, so they are computed again if the noise changes
+    @property
+    def noise(self) -> float:
+        return self.__noise
+
+    @noise.setter
+    def noise(self, noise: float) -> None:
+        self.__noise = noise
+        self.cache().pop("transitions", None)
+
     # Returns all possible states (where there is no walls)
     def get_states(self) -> List[Point]:
         return list(sorted(self.walkable))
@@ -60,6 +80,22 @@ class GridMDP(MarkovDecisionProcess[Point, Direction]):
             else: states[next_state] = prob
         return states
     
+    # Returns the precomputed transition of a (state, action) pair (it is computed on the first request)
+    def get_transition(self, state: Point, action: Direction) -> Transition:
+        transitions = self.cache().setdefault("transitions", {})
+        transition = transitions.get((state, action))
+        if transition is None:
+            next_states, probabilities = zip(*self.get_successor(state, action).items())
+            transition = transitions[(state, action)] = Transition(list(next_states), list(accumulate(probabilities)), AliasTable(probabilities))
+        return transition
+
+    # Computes the transitions of every action from every nonterminal state
+    def precompute_transitions(self) -> None:
+        for state in self.get_states():
+            if self.is_terminal(state): continue
+            for action in self.get_actions(state):
+                self.get_transition(state, action)
+
     def parse_state(self, string: str) -> Point:
         x, y = eval(string)
         return Point(x, y)
@@ -136,12 +172,16 @@ class GridEnv(Environment[Point, Direction]):
     inital_state: Optional[Point] # The initia state (initial position of the player).
                                   # If None, the player position will be randomly sampled from all possible location on each reset
     current_state: Point # The current state (position) of the player
+    sampler: str # How the next state is sampled: "cumulative" (the same random stream as RandomGenerator.sample) or "alias" (alias tables)
 
-    def __init__(self, mdp: GridMDP, inital_state: Optional[Point] = None) -> None:
+    def __init__(self, mdp: GridMDP, inital_state: Optional[Point] = None, sampler: str = "cumulative") -> None:
         super().__init__()
+        if sampler not in ("cumulative", "alias"): raise ValueError(f"unknown sampler {sampler}")
         self.rng = RandomGenerator()
         self.mdp = mdp
         self.initial_state = inital_state
+        self.sampler = sampler
+        mdp.precompute_transitions()
 
     # resets the environment and returns the current state
     def reset(self, seed: Optional[int] = None) -> Point:
@@ -159,9 +199,12 @@ class GridEnv(Environment[Point, Direction]):
     
     # Updates the current state using the given action
     def step(self, action: Direction) -> Tuple[Point, float, bool, Dict]:
-        next_states, probabilities = zip(*self.mdp.get_successor(self.current_state, action).items())
+        transition = self.mdp.get_transition(self.current_state, action)
         # since we may have more than one possible next state, we use a random generator to sample the next state
-        next_state = next_states[self.rng.sample(probabilities)]
+        if self.sampler == "alias":
+            next_state = transition.next_states[self.rng.sample_alias(transition.alias_table)]
+        else:
+            next_state = transition.next_states[self.rng.sample_cumulative(transition.cumulative)]
         reward = self.mdp.get_reward(self.current_state, action, next_state)
         self.current_state = next_state
         return (
@@ -177,8 +220,8 @@ class GridEnv(Environment[Point, Direction]):
 
     # Creates an environment from a file
     @staticmethod
-    def from_file(path: str, inital_state: Optional[Point] = None) -> 'GridEnv':
-        return GridEnv(GridMDP.from_file(path), inital_state)
+    def from_file(path: str, inital_state: Optional[Point] = None, sampler: str = "cumulative") -> 'GridEnv':
+        return GridEnv(GridMDP.from_file(path), inital_state, sampler)
     
     def parse_state(self, string: str) -> Point:
         return self.mdp.parse_state(string)
@@ -1,12 +1,19 @@
 # This is a Pseudo Random Number Generator using the Mersene Twister Algorithm
+# The whole table is twisted and tempered at once using NumPy (if it is installed), then the numbers are read from the tempered table.
+# This generates exactly the same numbers as twisting and tempering one number at a time.
 from typing import List, Optional
+from bisect import bisect_left
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class RandomGenerator:
     __N = 624
+    __M = 397
 
     def __init__(self, seed: Optional[int] = None) -> None:
-        self.table = [0] * RandomGenerator.__N
         self.index = RandomGenerator.__N+1
         self.seed(seed)
 
@@ -14,33 +21,76 @@ class RandomGenerator:
         if seed is None:
             import time
             seed = time.time_ns()
-        self.table[0] = seed
+        table = [seed & 0xffffffff] # only the lower 32 bits of the seed are used by the twist
+        previous = seed
         for i in range(1, RandomGenerator.__N):
-            temp = 1812433253 * (self.table[i-1] ^ (self.table[i-1] >> 30)) + i
-            self.table[i] = temp & 0xffffffff
+            previous = (1812433253 * (previous ^ (previous >> 30)) + i) & 0xffffffff
+            table.append(previous)
+        self.table = table if np is None else np.array(table, dtype=np.uint32)
+        # If the generator is seeded again in the middle of a table, the rest of the new table is read as is until the next twist
+        self.__tempered = RandomGenerator.__temper(self.table) if self.index < RandomGenerator.__N else None
 
+    # The twist in 3 segments, each segment only reads the values that were already twisted by the previous segments (or not twisted at all):
+    # [0, N-M) reads [M, N), then [N-M, N-1) reads [0, N-M) in chunks of N-M, then N-1 reads M-1
     def __twist(self):
-        for i in range(0, RandomGenerator.__N):
-            x = (self.table[i] & 0x80000000) + (self.table[(i+1) % RandomGenerator.__N] & 0x7FFFFFFF)
-            xA = x >> 1
-            if (x % 2) != 0:
-                xA = xA ^ 0x9908B0DF
-            self.table[i] = self.table[(i + 397) % RandomGenerator.__N] ^ xA
+        N, M = RandomGenerator.__N, RandomGenerator.__M
+        table = self.table
+        if np is None:
+            for i in range(0, N):
+                x = (table[i] & 0x80000000) + (table[(i+1) % N] & 0x7FFFFFFF)
+                xA = x >> 1
+                if (x % 2) != 0:
+                    xA = xA ^ 0x9908B0DF
+                table[i] = table[(i + M) % N] ^ xA
+        else:
+            def mix(current, following, far):
+                x = (current & 0x80000000) | (following & 0x7FFFFFFF)
+                return far ^ (x >> 1) ^ ((x & 1) * np.uint32(0x9908B0DF))
+            table[:N-M] = mix(table[:N-M], table[1:N-M+1], table[M:])
+            for start in range(N-M, N-1, N-M):
+                end = min(start + N-M, N-1)
+                table[start:end] = mix(table[start:end], table[start+1:end+1], table[start-(N-M):end-(N-M)])
+            table[N-1:] = mix(table[N-1:], table[:1], table[M-1:M])
+        self.__tempered = RandomGenerator.__temper(table)
+
+    # Returns the tempered values of the whole table as a list of ints
+    @staticmethod
+    def __temper(table) -> List[int]:
+        if np is None:
+            tempered = []
+            for y in table:
+                y = y ^ ((y >> 11) & 0xFFFFFFFF)
+                y = y ^ ((y << 7) & 0x9D2C5680)
+                y = y ^ ((y << 15) & 0xEFC60000)
+                y = y ^ (y >> 18)
+                tempered.append(y & 0xffffffff)
+            return tempered
+        y = table ^ (table >> 11)
+        y ^= (y << 7) & np.uint32(0x9D2C5680)
+        y ^= (y << 15) & np.uint32(0xEFC60000)
+        y ^= y >> 18
+        return y.tolist()
 
     def generate(self) -> int:
         if self.index >= RandomGenerator.__N:
             self.__twist()
             self.index = 0
+        y = self.__tempered[self.index]
+        self.index += 1
+        return y
 
-        y = self.table[self.index]
-        y = y ^ ((y >> 11) & 0xFFFFFFFF)
-        y = y ^ ((y << 7) & 0x9D2C5680)
-        y = y ^ ((y << 15) & 0xEFC60000)
-        y = y ^ (y >> 18)
+    # Returns the next n numbers (the same numbers that n calls to "generate" would return)
+    def generate_many(self, n: int) -> List[int]:
+        values = []
+        while len(values) < n:
+            if self.index >= RandomGenerator.__N:
+                self.__twist()
+                self.index = 0
+            end = min(RandomGenerator.__N, self.index + n - len(values))
+            values.extend(self.__tempered[self.index:end])
+            self.index = end
+        return values
 
-        self.index += 1
-        return y & 0xffffffff
-    
     def int(self, l: int, u: int) -> int:
         assert l <= u, f"the lower bound must be less then or equal the upper bound, got {l=} nd {u=}"
         if l == u: return l
@@ -58,6 +108,41 @@ class RandomGenerator:
                 return index
         return len(weights)-1
 
+    # The same as "sample" (it returns the same index for the same random number) given the cumulative sums of the weights
+    # The index is found using a binary search instead of summing the weights again
+    def sample_cumulative(self, cumulative: List[float]) -> int:
+        random = self.float(0, cumulative[-1])
+        return min(bisect_left(cumulative, random), len(cumulative)-1)
+
+    # Samples an index from an alias table using one random number: its integer part selects a column of the table
+    # and its fractional part decides between the column and its alias
+    # Note: it returns different indices than "sample" for the same random numbers (but with the same probabilities)
+    def sample_alias(self, table: 'AliasTable') -> int:
+        random = self.generate() * table.scale
+        column = int(random)
+        return column if random - column < table.probabilities[column] else table.aliases[column]
+
+# An alias table (Vose's method) which samples an index of a list of weights in constant time
+# Each column "i" is split between "i" (with a probability of probabilities[i]) and another index aliases[i]
+class AliasTable:
+    probabilities: List[float]
+    aliases: List[int]
+    scale: float # converts a 32-bit random number to a float in [0, the number of columns)
+
+    def __init__(self, weights: List[float]) -> None:
+        count, total = len(weights), sum(weights)
+        self.scale = count / 0x100000000
+        scaled = [weight * count / total for weight in weights]
+        self.probabilities, self.aliases = [1.0] * count, list(range(count))
+        small = [index for index, weight in enumerate(scaled) if weight < 1]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less], self.aliases[less] = scaled[less], more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+        # The remaining columns are full (up to rounding errors)
+
 if __name__ == "__main__":
     rng = RandomGenerator(0)
     prob = [0.8, 0.1, 0.1]
@@ -4,6 +4,7 @@ from grid import GridEnv, GridMDP
 from helpers.rl_utils import ACTION_TO_STR, ACTIONS, Policy, QMap, UtilityMap, WeightMap, extract_policy, extract_q_values, extract_utilities, format_grid, format_policy, format_q_values, format_utilities, format_weights
 
 from mathutils import Direction, Point
+from .mt19937 import AliasTable, RandomGenerator
 from .utils import Result, load_function
 
 # Checks if two floating point numbers are almost equal
@@ -251,4 +252,94 @@ def compare_weights_policy_results(
     if not weights_match: message += "DIAGNOSIS: Weights do not match the expected output\n"
     if not policy_match: message += "DIAGNOSIS: Policy do not match the expected output\n"
 
-    return Result(False, 0, message)
\ No newline at end of file
+    return Result(False, 0, message)
+
+# Generates the first "count" numbers of a seeded generator twice: one by one (with "generate") and in batches (with "generate_many")
+# If "reseed" is given, the generator is seeded again with it in the middle of the sequence (like "GridEnv.reset" does)
+def run_random_generator(seed: int, count: int, batch_size: int, reseed: Optional[int] = None) -> Tuple[List[int], List[int]]:
+    half = count // 2 if reseed is not None else count
+    rng = RandomGenerator(seed)
+    one_by_one = [rng.generate() for _ in range(half)]
+    if reseed is not None: rng.seed(reseed)
+    one_by_one += [rng.generate() for _ in range(count - half)]
+
+    rng = RandomGenerator(seed)
+    batched = []
+    for end in (half, count):
+        while len(batched) < end: batched += rng.generate_many(min(batch_size, end - len(batched)))
+        if reseed is not None and end == half: rng.seed(reseed)
+
+    return one_by_one, batched
+
+# Compare the generated numbers with the numbers of the original generator (which twisted and tempered one number at a time)
+# The expected numbers are given by their positions in the sequence, they include the numbers around each twist (every 624 numbers)
+def compare_random_generator(
+    output: Tuple[List[int], List[int]],
+    expected: Dict[int, int]) -> Result:
+
+    one_by_one, batched = output
+    if len(one_by_one) != len(batched) or any(a != b for a, b in zip(one_by_one, batched)):
+        index = next((i for i, (a, b) in enumerate(zip(one_by_one, batched)) if a != b), min(len(one_by_one), len(batched)))
+        return Result(False, 0, f"generate and generate_many differ at the number {index}")
+    for index, expected_number in expected.items():
+        number = one_by_one[index] if index < len(one_by_one) else None
+        if number != expected_number:
+            return Result(False, 0, f"The number {index} is different - Expected: {expected_number}, Got: {number}")
+
+    return Result(True, 1, "")
+
+# Returns the probability of each index of an alias table (each column holds 1/count of the probability, split between the column and its alias)
+def alias_table_probabilities(table: AliasTable) -> List[float]:
+    count = len(table.probabilities)
+    probabilities = [0.0] * count
+    for column, (probability, alias) in enumerate(zip(table.probabilities, table.aliases)):
+        probabilities[column] += probability / count
+        probabilities[alias] += (1 - probability) / count
+    return probabilities
+
+# Samples the next state of every action from every nonterminal state using the alias sampler of the environment
+# Returns for each (state, action) the probabilities of the next states stored in the alias table and their sampled frequencies
+def run_alias_sampler(env: GridEnv, noise: float, samples: int, seed: int) -> Dict[Tuple[Point, Direction], Tuple[Dict[Point, float], Dict[Point, float]]]:
+    env.mdp.noise = noise
+    env.sampler = "alias"
+    env.reset(seed)
+    results = {}
+    for state in env.mdp.get_states():
+        if env.mdp.is_terminal(state): continue
+        for action in env.mdp.get_actions(state):
+            transition = env.mdp.get_transition(state, action)
+            table = dict(zip(transition.next_states, alias_table_probabilities(transition.alias_table)))
+            frequencies = {next_state: 0.0 for next_state in transition.next_states}
+            for _ in range(samples):
+                env.current_state = state
+                frequencies[env.step(action)[0]] += 1 / samples
+            results[(state, action)] = (table, frequencies)
+    return results
+
+# Compare the alias tables and the sampled frequencies with the probabilities of the MDP
+# The probabilities stored in the alias tables must be exact, while the frequencies must be within the given tolerance
+def compare_alias_sampler(
+    output: Dict[Tuple[Point, Direction], Tuple[Dict[Point, float], Dict[Point, float]]],
+    level_path: str,
+    noise: float,
+    tolerance: float) -> Result:
+
+    mdp = GridMDP.from_file(level_path)
+    mdp.noise = noise
+    nl = '\n'
+    for state in mdp.get_states():
+        if mdp.is_terminal(state): continue
+        for action in mdp.get_actions(state):
+            expected = mdp.get_successor(state, action)
+            if (state, action) not in output:
+                return Result(False, 0, f"Missing the state {state} and the action {action}")
+            table, frequencies = output[(state, action)]
+            message = None
+            if set(table) != set(expected) or any(abs(table[next_state] - probability) > 1e-9 for next_state, probability in expected.items()):
+                message = f"The alias table does not match the probabilities{nl}Expected: {expected}{nl}Got: {table}"
+            elif any(abs(frequencies.get(next_state, 0) - probability) > tolerance for next_state, probability in expected.items()):
+                message = f"The sampled frequencies are not within {tolerance} of the probabilities{nl}Expected: {expected}{nl}Got: {frequencies}"
+            if message is not None:
+                return Result(False, 0, f"Grid:{nl}{mdp}{nl}For the state {state} and the action {action}:{nl}{message}")
+
+    return Result(True, 1, "")
\ No newline at end of file
@@ -111,7 +111,7 @@ def train_sarsa(args: argparse.Namespace):
     agent = SARSALearningAgent(ACTIONS, args.discount, args.epsilon, args.learning_rate, args.seed)
     
     # Create the environment and override the default action noise if requested
-    env = GridEnv.from_file(args.level)
+    env = GridEnv.from_file(args.level, sampler=args.sampler)
     if args.noise is not None:
         env.mdp.noise = args.noise
     
@@ -149,7 +149,7 @@ def train_q_learning(args: argparse.Namespace):
         exit(-1)
 
     # Create the environment and override the default action noise if requested
-    env = GridEnv.from_file(args.level)
+    env = GridEnv.from_file(args.level, sampler=args.sampler)
     if args.noise is not None:
         env.mdp.noise = args.noise
     
@@ -207,6 +207,8 @@ if __name__ == "__main__":
                         help="the epsilon value of the e-greedy q-learning agent (For SARSA & Q-Learning Only)")
     parser.add_argument("--learning-rate", "-lr", type=float, default=0.05, help="the learning rate (For SARSA & Q-Learning Only)")
     parser.add_argument("--noise", "-n", type=float, help="the action noise (if set, overrides the original value from level file)")
+    parser.add_argument("--sampler", "-sm", default="cumulative", choices=["cumulative", "alias"],
+                        help="how the environment samples the next state (the default keeps the random stream of the previous versions)")
     parser.add_argument("--seed", "-s", type=int, default=time.time_ns(), help="the seed value used for training (To ensure reproducibility)")
     parser.add_argument("--verbosity", "-v", type=int, default=0, help="How often to display the training results (0 will display at the end only)")
     parser.add_argument("--sleep", type=float, default=0, help="How much time (seconds) to wait between iterations")